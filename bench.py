@@ -0,0 +1,812 @@
+import argparse
+import contextlib
+import cProfile
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import pstats
+import random
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import CORPORA, generate, parse_size
+from scanner import (KEYWORD_WORDS, InputFileReader, KeywordSet, LexicalAnalyzer, MmapFileReader,
+                     SymbolTable)
+from scanner_with_dfa import DFALexicalAnalyzer
+from scanner_with_regex import Lexer as RegexLexer, lexer as regex_lexer, tok_regex
+from firstFollow import (GrammarAnalysis, compute_first, compute_first_naive, compute_follow,
+                         compute_follow_naive)
+from firstFollow import grammar as expression_grammar
+from grammar_cache import cached_analysis
+from incremental_lexer import IncrementalLexer
+from lexgen import generate_lexer, to_source as lexgen_source
+from lexers import BACKENDS, choose_backend, make_lexer
+from line_index import LineIndex
+from ll1 import LL1Table
+from parallel_lexer import lex_files, lex_text_parallel
+from scanner_stats import ScannerStats
+from symbol_snapshot import load_snapshot, save_snapshot
+
+
+def drain(analyzer):
+    count = 0
+    token = analyzer.getNextToken()
+    while token is not None:
+        count += 1
+        token = analyzer.getNextToken()
+    return count
+
+
+def bench_symbol_table(sizes=(10_000, 100_000, 1_000_000)):
+    results = []
+    for n in sizes:
+        lexemes = [f"id{i}" for i in range(n)]
+        table = SymbolTable()
+
+        start = time.perf_counter()
+        for lexeme in lexemes:
+            table.installID(lexeme)
+        insert_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for lexeme in lexemes:
+            table.installID(lexeme)
+        lookup_time = time.perf_counter() - start
+
+        results.append({
+            "identifiers": n,
+            "insert_s": insert_time,
+            "lookup_s": lookup_time,
+            "insert_ns_per_id": insert_time / n * 1e9,
+            "lookup_ns_per_id": lookup_time / n * 1e9,
+        })
+        print(f"{n:>9} ids  insert {insert_time:8.3f}s ({insert_time / n * 1e9:6.0f} ns/id)"
+              f"  lookup {lookup_time:8.3f}s ({lookup_time / n * 1e9:6.0f} ns/id)")
+    return results
+
+
+def bench_engines(size=2_000_000):
+    source = generate("mixed", size)
+    megabytes = len(source.encode()) / 1e6
+    results = []
+    for name, engine in (("chain", LexicalAnalyzer), ("dfa", DFALexicalAnalyzer)):
+        start = time.perf_counter()
+        tokens = drain(engine(source))
+        elapsed = time.perf_counter() - start
+        results.append({"engine": name, "tokens": tokens, "seconds": elapsed,
+                        "mb_per_s": megabytes / elapsed})
+        print(f"{name:>6}  {tokens} tokens  {elapsed:7.3f}s  {megabytes / elapsed:6.2f} MB/s")
+    print(f"speedup {results[0]['seconds'] / results[1]['seconds']:.1f}x")
+    return results
+
+
+def peak_rss_kb():
+    # VmHWM is reset by exec, unlike ru_maxrss which children inherit
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _readAll(reader_name, path):
+    if reader_name == "mmap":
+        reader = MmapFileReader(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            reader = InputFileReader(f.read())
+    start = time.perf_counter()
+    chars = 0
+    while reader.getNextChar() is not None:
+        chars += 1
+    elapsed = time.perf_counter() - start
+    reader.close()
+    return chars, elapsed, peak_rss_kb()
+
+
+def reset_peak_rss():
+    # writing 5 to clear_refs resets VmHWM; False where that is unsupported
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def in_fresh_process(fn, *args):
+    # peak RSS is per process, so every measurement gets its own interpreter
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def bench_reader(size=20_000_000):
+    baseline = in_fresh_process(peak_rss_kb)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "input.src")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate("mixed", size))
+        megabytes = os.path.getsize(path) / 1e6
+        for name in ("string", "mmap"):
+            chars, elapsed, max_rss = in_fresh_process(_readAll, name, path)
+            extra = (max_rss - baseline) / 1024
+            results.append({"reader": name, "chars": chars, "seconds": elapsed,
+                            "peak_rss_over_baseline_mb": extra})
+            print(f"{name:>6}  {megabytes:.1f} MB file  {elapsed:7.3f}s"
+                  f"  peak RSS +{extra:.1f} MB over interpreter baseline")
+    return results
+
+
+def _tokenList(source):
+    analyzer = DFALexicalAnalyzer(source)
+    tokens = []
+    token = analyzer.getNextToken()
+    while token is not None:
+        tokens.append(token)
+        token = analyzer.getNextToken()
+    return tokens
+
+
+def _regexStrings(source):
+    # lexer() prints every mismatch, keep that out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return regex_lexer(source)
+
+
+def _retained(build, source):
+    # bytes still allocated once the result is built, source excluded
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(source)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_token_memory(size=1_000_000):
+    source = generate("mixed", size)
+    results = []
+    for name, build in (("Token list", _tokenList),
+                        ("regex strings", _regexStrings),
+                        ("TokenBuffer", lambda text: DFALexicalAnalyzer(text).tokenBuffer())):
+        tokens, retained = _retained(build, source)
+        per_token = retained / len(tokens)
+        results.append({"store": name, "tokens": len(tokens), "bytes": retained,
+                        "bytes_per_token": per_token})
+        print(f"{name:>14}  {len(tokens)} tokens  {retained / 1e6:7.2f} MB  {per_token:6.1f} bytes/token")
+    return results
+
+
+def bench_parallel_files(files=32, size=200_000, max_jobs=None):
+    max_jobs = max_jobs or os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp, f"file{i}.src")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(generate("mixed", size, seed=i))
+            paths.append(path)
+
+        jobs = 1
+        while True:
+            start = time.perf_counter()
+            lex_files(paths, jobs)
+            elapsed = time.perf_counter() - start
+            results.append({"jobs": jobs, "seconds": elapsed})
+            speedup = results[0]["seconds"] / elapsed
+            print(f"jobs {jobs:>3}  {elapsed:7.3f}s  speedup {speedup:5.2f}x")
+            if jobs >= max_jobs:
+                break
+            jobs = min(jobs * 2, max_jobs)
+    return results
+
+
+def bench_split_file(size=5_000_000, max_jobs=None):
+    # tests/test_parallel_lexer.py checks the stitched output against
+    # the sequential lexer; this only times it
+    max_jobs = max_jobs or os.cpu_count() or 1
+    source = generate("mixed", size)
+    results = []
+    jobs = 1
+    while True:
+        start = time.perf_counter()
+        lex_text_parallel(source, jobs)
+        elapsed = time.perf_counter() - start
+        results.append({"jobs": jobs, "seconds": elapsed})
+        print(f"jobs {jobs:>3}  {elapsed:7.3f}s  speedup {results[0]['seconds'] / elapsed:5.2f}x")
+        if jobs >= max_jobs:
+            break
+        jobs = min(jobs * 2, max_jobs)
+    return results
+
+
+def bench_incremental(lines=50_000, edits=2_000):
+    source = "\n".join(generate("mixed", lines * 40).split("\n")[:lines])
+    start = time.perf_counter()
+    lexer = IncrementalLexer(source)
+    build = time.perf_counter() - start
+    print(f"initial lex of {lines} lines: {build:.3f}s")
+
+    rnd = random.Random(0)
+    results = []
+    for name, edit in (
+        ("insert char", lambda at: (at, at, "x")),
+        ("delete char", lambda at: (at, at + 1, "")),
+        ("insert line", lambda at: (at, at, "int k = 1;\n")),
+        ("join lines", lambda at: (at, at + 40, "")),
+    ):
+        latencies = []
+        for _ in range(edits):
+            at = rnd.randrange(len(lexer) - 40)
+            start = time.perf_counter()
+            lexer.apply_edit(*edit(at))
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        mean = sum(latencies) / len(latencies)
+        p99 = latencies[int(len(latencies) * 0.99)]
+        results.append({"edit": name, "mean_ms": mean * 1e3, "p99_ms": p99 * 1e3})
+        print(f"{name:>12}  mean {mean * 1e3:6.3f} ms  p99 {p99 * 1e3:6.3f} ms")
+    return results
+
+
+def synthetic_grammar(nonterminals, terminals=128):
+    # FIRST flows from A(i+1) to A(i) and FOLLOW from A(i) to A(i-1), both
+    # against declaration order, which is the worst case for full sweeps
+    grammar = {}
+    for i in range(nonterminals):
+        productions = ["ε"]
+        if i + 1 < nonterminals:
+            productions.append(f"A{i + 1} t{i % terminals}")
+        if i > 0:
+            productions.append(f"u{i % terminals} A{i - 1}")
+        grammar[f"A{i}"] = productions
+    return grammar
+
+
+def _benchBitsets(grammar, row):
+    start = time.perf_counter()
+    analysis = GrammarAnalysis(grammar)
+    analysis.solve_follow(next(iter(grammar)))
+    elapsed = time.perf_counter() - start
+    memory = sum(sys.getsizeof(mask) for mask in analysis.first_bits + analysis.follow_bits)
+    row["bitset"] = {"seconds": elapsed, "terminals": len(analysis.terminals),
+                     "mask_bytes": memory}
+    print(f"{len(grammar):>6} nonterminals  {'bitset':>8}  {elapsed:8.3f}s  "
+          f"{len(analysis.terminals)} terminals, masks {memory / 1e3:.0f} kB (no set conversion)")
+
+
+def bench_first_follow(sizes=(200, 1_000, 5_000), naive_limit=1_000):
+    results = []
+    for n in sizes:
+        grammar = synthetic_grammar(n)
+        row = {"nonterminals": n}
+        _benchBitsets(grammar, row)
+        solvers = [("dict API", compute_first, compute_follow)]
+        if n <= naive_limit:
+            solvers.append(("naive", compute_first_naive, compute_follow_naive))
+        for name, first_solver, follow_solver in solvers:
+            first_stats = {}
+            follow_stats = {}
+            start = time.perf_counter()
+            first = first_solver(grammar, first_stats)
+            follow_solver(grammar, first, "A0", follow_stats)
+            elapsed = time.perf_counter() - start
+            # counted as the solvers run: only the naive one sweeps, the
+            # bitset one finishes each component of the graph once
+            work = {key: first_stats.get(key, 0) + follow_stats.get(key, 0)
+                    for key in ("production_visits", "unions", "components", "edges")}
+            row[name] = {"seconds": elapsed, **work}
+            detail = f"components {work['components']}  edges relaxed {work['edges']}"
+            if "sweeps" in first_stats:
+                row[name]["first_sweeps"] = first_stats["sweeps"]
+                row[name]["follow_sweeps"] = follow_stats["sweeps"]
+                detail = f"sweeps first/follow {first_stats['sweeps']}/{follow_stats['sweeps']}"
+            print(f"{n:>6} nonterminals  {name:>8}  {elapsed:8.3f}s  production visits "
+                  f"{work['production_visits']:>9}  unions {work['unions']:>9}  {detail}")
+        results.append(row)
+
+    # thousands of terminals as well as nonterminals
+    for n in sizes:
+        row = {"nonterminals": n, "distinct_terminals": True}
+        _benchBitsets(synthetic_grammar(n, terminals=n), row)
+        results.append(row)
+    return results
+
+
+def expression_source(terms, seed=0):
+    rnd = random.Random(seed)
+    parts = ["x0"]
+    depth = 0
+    for i in range(1, terms):
+        parts.append(rnd.choice("+*"))
+        if rnd.random() < 0.2:
+            parts.append("(")
+            depth += 1
+        parts.append(f"x{i % 500}")
+        if depth and rnd.random() < 0.2:
+            parts.append(")")
+            depth -= 1
+    parts.append(")" * depth)
+    return " ".join(parts)
+
+
+def bench_ll1(terms=200_000):
+    start = time.perf_counter()
+    table = LL1Table(expression_grammar)
+    build = time.perf_counter() - start
+    tokens = _tokenList(expression_source(terms))
+    start = time.perf_counter()
+    derivation = table.parse(tokens)
+    elapsed = time.perf_counter() - start
+    rate = len(tokens) / elapsed
+    print(f"table built in {build * 1e3:.2f} ms, LL(1): {table.isLL1()}")
+    print(f"parsed {len(tokens)} tokens ({len(derivation)} productions) in {elapsed:.3f}s"
+          f"  {rate:,.0f} tokens/s")
+    return {"tokens": len(tokens), "seconds": elapsed, "tokens_per_s": rate}
+
+
+def bench_grammar_cache(nonterminals=20_000, terminals=128):
+    grammar = synthetic_grammar(nonterminals, terminals)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in ("cold", "warm"):
+            start = time.perf_counter()
+            analysis = cached_analysis(grammar, cache_dir=cache_dir)
+            results[f"{name}_s"] = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(cache_dir, entry)) for entry in os.listdir(cache_dir))
+    results["cache_bytes"] = size
+    print(f"{nonterminals} nonterminals, {len(analysis.terminals)} terminals")
+    print(f"cold (solve + write) {results['cold_s'] * 1e3:8.2f} ms")
+    print(f"warm (hash + read)   {results['warm_s'] * 1e3:8.2f} ms   cache file {size / 1e6:.2f} MB")
+    return results
+
+
+def _uncompiledLexer(code):
+    # lexer() as it was: the raw pattern string goes through re's cache on
+    # every call and every token is formatted
+    import re
+    tokens = []
+    for mo in re.finditer(tok_regex, code):
+        kind = mo.lastgroup
+        if kind not in ('NEWLINE', 'SKIP', 'MISMATCH'):
+            tokens.append(f'{kind.lower()}({mo.group()})')
+    return tokens
+
+
+def bench_regex_snippets(calls=100_000):
+    snippet = "if (count >= 10) total = total + count * 2.5 // running sum"
+    lexer = RegexLexer()
+    results = []
+    for name, run in (("per-call finditer", _uncompiledLexer),
+                      ("Lexer.scan", lexer.scan)):
+        start = time.perf_counter()
+        for _ in range(calls):
+            run(snippet)
+        elapsed = time.perf_counter() - start
+        results.append({"variant": name, "calls_per_s": calls / elapsed})
+        print(f"{name:>18}  {calls / elapsed:10,.0f} calls/s  {elapsed / calls * 1e6:6.2f} us/call")
+    return results
+
+
+def bench_char_classes(size=2_000_000):
+    results = []
+    for corpus in ("whitespace", "identifier"):
+        source = generate(corpus, size)
+        for name, engine in (("chain", LexicalAnalyzer), ("dfa", DFALexicalAnalyzer)):
+            start = time.perf_counter()
+            tokens = drain(engine(source))
+            elapsed = time.perf_counter() - start
+            results.append({"corpus": corpus, "engine": name, "tokens": tokens,
+                            "seconds": elapsed, "mb_per_s": len(source) / 1e6 / elapsed})
+            print(f"{corpus:>10} {name:>5}  {tokens:8} tokens  {elapsed:7.3f}s"
+                  f"  {len(source) / 1e6 / elapsed:6.2f} MB/s")
+    return results
+
+
+def bench_runs(size=2_000_000):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for corpus in ("comment", "minified"):
+            source = generate(corpus, size)
+            path = os.path.join(directory, corpus)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(source)
+            for reader, make in (("str", lambda: LexicalAnalyzer(source)),
+                                 ("mmap", lambda: LexicalAnalyzer.fromFile(path))):
+                analyzer = make()
+                start = time.perf_counter()
+                tokens = drain(analyzer)
+                elapsed = time.perf_counter() - start
+                analyzer.close()
+                results.append({"corpus": corpus, "reader": reader, "tokens": tokens,
+                                "seconds": elapsed, "mb_per_s": len(source) / 1e6 / elapsed})
+                print(f"{corpus:>8} {reader:>4}  {tokens:8} tokens  {elapsed:7.3f}s"
+                      f"  {len(source) / 1e6 / elapsed:6.2f} MB/s")
+    return results
+
+
+def _drainUnpositioned(analyzer):
+    # getNextToken without stamping the position, for the overhead baseline
+    count = 0
+    while analyzer.recognizeToken() is not None:
+        count += 1
+    return count
+
+
+def bench_positions(size=2_000_000, lookups=1_000_000):
+    source = generate("mixed", size)
+    results = {}
+
+    # interleaved best-of runs, so drift in machine load hits both sides
+    variants = (("without positions", _drainUnpositioned), ("with positions", drain))
+    timings = {}
+    for _ in range(5):
+        for name, run in variants:
+            analyzer = LexicalAnalyzer(source)
+            start = time.perf_counter()
+            run(analyzer)
+            elapsed = time.perf_counter() - start
+            timings[name] = min(timings.get(name, elapsed), elapsed)
+    for name, _ in variants:
+        print(f"{name:>18}  {timings[name]:7.3f}s")
+    lex = timings["without positions"]
+    results["position_overhead"] = timings["with positions"] / lex - 1
+
+    start = time.perf_counter()
+    index = LineIndex(source)
+    build = time.perf_counter() - start
+    results["index_build_s"] = build
+    results["index_build_fraction"] = build / lex
+
+    rnd = random.Random(0)
+    offsets = [rnd.randrange(len(source)) for _ in range(lookups)]
+    lineCol = index.lineCol
+    start = time.perf_counter()
+    for offset in offsets:
+        lineCol(offset)
+    elapsed = time.perf_counter() - start
+    results["lookups_per_s"] = lookups / elapsed
+
+    print(f"position stamping  {results['position_overhead'] * 100:+6.1f}% of lexing")
+    print(f"line index build   {build * 1e3:7.2f} ms for {len(index)} lines "
+          f"({build / lex * 100:.2f}% of lexing)")
+    print(f"line/col lookup    {lookups / elapsed:12,.0f} lookups/s  {elapsed / lookups * 1e9:6.0f} ns each")
+    return results
+
+
+def _lexWith(source, recover, maxErrors):
+    analyzer = DFALexicalAnalyzer(source, recover=recover, maxErrors=maxErrors)
+    return analyzer.tokenBuffer(), analyzer
+
+
+def bench_recovery(size=1_000_000, max_errors=1000):
+    # timed without tracemalloc, then measured again under it for memory
+    results = []
+    for corpus in ("mixed", "garbage"):
+        source = generate(corpus, size)
+        for mode, recover, cap in (("default", False, None), ("recover", True, max_errors)):
+            start = time.perf_counter()
+            tokens, analyzer = _lexWith(source, recover, cap)
+            elapsed = time.perf_counter() - start
+            _, retained = _retained(lambda text: _lexWith(text, recover, cap), source)
+            results.append({"corpus": corpus, "mode": mode, "tokens": len(tokens),
+                            "errors": analyzer.errorCount(), "errors_kept": len(analyzer.errors),
+                            "mb_per_s": len(source) / 1e6 / elapsed, "retained_mb": retained / 1e6})
+            print(f"{corpus:>8} {mode:>8}  {len(tokens):8} tokens  {analyzer.errorCount():7} errors"
+                  f" ({len(analyzer.errors)} kept)  {len(source) / 1e6 / elapsed:6.2f} MB/s"
+                  f"  retains {retained / 1e6:6.1f} MB")
+    return results
+
+
+def bench_keywords(size=2_000_000, dialect_size=128):
+    # a large keyword dialect must cost the identifier path nothing extra
+    source = generate("mixed", size)
+    dialect = KeywordSet(KEYWORD_WORDS + tuple(f"kw_{i}" for i in range(dialect_size - len(KEYWORD_WORDS))))
+    results = []
+    for name, keywords in (("default", None), (f"{len(dialect)} keywords", dialect)):
+        start = time.perf_counter()
+        tokens = DFALexicalAnalyzer(source, keywords).tokenBuffer()
+        elapsed = time.perf_counter() - start
+        results.append({"keywords": name, "tokens": len(tokens), "tokens_per_s": len(tokens) / elapsed})
+        print(f"{name:>13}  {len(tokens)} tokens  {elapsed:7.3f}s  {len(tokens) / elapsed:12,.0f} tokens/s")
+    return results
+
+
+def _lexChain(source):
+    return drain(LexicalAnalyzer(source))
+
+
+def _lexDFA(source):
+    return len(DFALexicalAnalyzer(source).tokenBuffer())
+
+
+def _lexRegex(source):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return len(regex_lexer(source))
+
+
+CORPUS_ENGINES = {"chain": _lexChain, "dfa": _lexDFA, "regex": _lexRegex}
+SUITE_CORPORA = ("identifier", "numeric", "operator", "comment", "mixed")
+PROFILED_MODULES = ("scanner.py", "scanner_with_dfa.py", "scanner_with_regex.py", "char_classes.py")
+
+
+def recognizer_breakdown(profiler, top=15):
+    # time per function of the scanner modules, most expensive first
+    rows = []
+    for (filename, _, name), (_, calls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        if os.path.basename(filename) in PROFILED_MODULES:
+            rows.append({"function": name, "calls": calls, "tottime_s": tottime, "cumtime_s": cumtime})
+    rows.sort(key=lambda row: row["tottime_s"], reverse=True)
+    return rows[:top]
+
+
+def _lexCorpus(engine, kind, size, seed, profile):
+    source = generate(kind, size, seed)
+    # peak RSS counts from here, so it covers lexing and not the corpus itself
+    measured = reset_peak_rss()
+    before = peak_rss_kb()
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    tokens = CORPUS_ENGINES[engine](source)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_kb()
+
+    megabytes = len(source.encode("utf-8", "surrogateescape")) / 1e6
+    result = {"engine": engine, "corpus": kind, "seed": seed, "chars": len(source),
+              "mb": megabytes, "tokens": tokens, "seconds": elapsed,
+              "tokens_per_s": tokens / elapsed, "mb_per_s": megabytes / elapsed,
+              "peak_rss_mb": peak / 1024,
+              "lexing_rss_mb": (peak - before) / 1024 if measured else None,
+              "profiled": profile}
+    if profiler is not None:
+        result["recognizers"] = recognizer_breakdown(profiler)
+    return result
+
+
+def bench_corpora(sizes=("256KB",), corpora=SUITE_CORPORA, engines=("chain", "dfa", "regex"),
+                  seed=0, profile=False):
+    # every run gets a fresh interpreter so peak RSS belongs to that run alone
+    results = []
+    for size in sizes:
+        chars = parse_size(size) if isinstance(size, str) else size
+        for kind in corpora:
+            for engine in engines:
+                result = in_fresh_process(_lexCorpus, engine, kind, chars, seed, profile)
+                results.append(result)
+                rss = result["lexing_rss_mb"]
+                print(f"{kind:>10} {engine:>5} {result['mb']:8.2f} MB  {result['tokens']:9} tokens"
+                      f"  {result['tokens_per_s']:11,.0f} tokens/s  {result['mb_per_s']:6.2f} MB/s"
+                      f"  peak RSS {result['peak_rss_mb']:7.1f} MB"
+                      + (f" (+{rss:.1f} lexing)" if rss is not None else ""))
+                for row in result.get("recognizers", ())[:8]:
+                    print(f"{'':>18}{row['function']:>24} {row['calls']:9} calls"
+                          f"  {row['tottime_s']:7.3f}s own  {row['cumtime_s']:7.3f}s total")
+    return results
+
+
+def bench_backends(sizes=(6_000, 1_000_000), repeats=3):
+    # tests/test_lexers.py checks that the backends agree; this times them
+    # and shows what auto picks
+    results = []
+    for size in sizes:
+        for kind in CORPORA:
+            source = generate(kind, size)
+            timings = {}
+            for backend, analyzer in BACKENDS.items():
+                timings[backend] = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    tokens = len(analyzer(source).tokenBuffer())
+                    timings[backend] = min(timings[backend], time.perf_counter() - start)
+            fastest = min(timings, key=timings.get)
+            chosen = choose_backend(source)
+            results.append({"corpus": kind, "size": size, "tokens": tokens, "chosen": chosen,
+                            "fastest": fastest,
+                            "mb_per_s": {backend: len(source) / 1e6 / elapsed
+                                         for backend, elapsed in timings.items()}})
+            print(f"{size:>8} {kind:>10}  {tokens:8} tokens  "
+                  + "  ".join(f"{backend} {len(source) / 1e6 / elapsed:6.2f} MB/s"
+                              for backend, elapsed in timings.items())
+                  + f"  auto: {chosen}, fastest: {fastest}")
+    return results
+
+
+def bench_lexgen(size=500_000, corpora=("mixed", "identifier", "operator", "comment", "numeric")):
+    # generating tables, then loading them from the cache, a table file and
+    # a generated module; each corpus is lexed by the chain's getNextToken,
+    # the generated lexer and the re-based Lexer it stands in for
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        generated = generate_lexer(cache_dir=directory)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        generate_lexer(cache_dir=directory)
+        warm = time.perf_counter() - start
+        module = os.path.join(directory, "generated_lexer.py")
+        with open(module, "w", encoding="utf-8") as f:
+            f.write(lexgen_source(generated.tables))
+        start = time.perf_counter()
+        namespace = runpy.run_path(module)
+        loaded = time.perf_counter() - start
+        generated = namespace["lexer"]
+    print(f"generate {cold * 1e3:8.1f} ms  cached {warm * 1e3:6.2f} ms  module {loaded * 1e3:6.2f} ms")
+    results = {"generate_ms": cold * 1e3, "cached_ms": warm * 1e3, "module_ms": loaded * 1e3,
+               "runs": []}
+    reference = RegexLexer()
+    for kind in corpora:
+        source = generate(kind, size)
+        timings = {}
+        for name, lex in (("chain", _lexChain), ("generated", generated.scan),
+                          ("re", reference.scan)):
+            start = time.perf_counter()
+            lex(source)
+            timings[name] = time.perf_counter() - start
+        results["runs"].append({"corpus": kind, "mb_per_s": {name: len(source) / 1e6 / elapsed
+                                                             for name, elapsed in timings.items()}})
+        print(f"{kind:>10}  " + "  ".join(f"{name} {len(source) / 1e6 / elapsed:6.2f} MB/s"
+                                          for name, elapsed in timings.items())
+              + f"  {timings['chain'] / timings['generated']:5.1f}x the chain")
+    return results
+
+
+def bench_stats(size=500_000, repeats=3):
+    # instrumentation swaps wrappers onto one analyzer, so "off" is the
+    # plain class code; runs alternate to share the machine's noise
+    source = generate("mixed", size)
+    results = []
+    for backend in BACKENDS:
+        best = {"off": float("inf"), "on": float("inf")}
+        for _ in range(repeats):
+            for mode in best:
+                stats = ScannerStats() if mode == "on" else None
+                start = time.perf_counter()
+                make_lexer(source, backend, stats=stats).tokenBuffer()
+                best[mode] = min(best[mode], time.perf_counter() - start)
+        overhead = best["on"] / best["off"] - 1
+        results.append({"backend": backend, "off_s": best["off"], "on_s": best["on"],
+                        "overhead": overhead})
+        print(f"{backend:>6}  off {best['off']:7.3f}s  on {best['on']:7.3f}s  overhead {overhead:7.1%}")
+    return results
+
+
+def bench_snapshot(identifiers=1_000_000, lookups=200_000, size=2_000_000):
+    table = SymbolTable()
+    for i in range(identifiers):
+        table.installID(f"id{i}")
+    keys = [f"id{i}" for i in random.Random(0).sample(range(identifiers), lookups)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "symtab.bin")
+        start = time.perf_counter()
+        save_snapshot(table, path)
+        results["save_s"] = time.perf_counter() - start
+        results["snapshot_bytes"] = os.path.getsize(path)
+        results["pickle_bytes"] = len(pickle.dumps((table.lexemes, table.types, table.index)))
+        start = time.perf_counter()
+        mapped = load_snapshot(path)
+        results["open_s"] = time.perf_counter() - start
+        with mapped:
+            start = time.perf_counter()
+            for key in keys:
+                mapped.address(key)
+            results["mapped_lookup_ns"] = (time.perf_counter() - start) / lookups * 1e9
+        start = time.perf_counter()
+        for key in keys:
+            table.index.get(key)
+        results["dict_lookup_ns"] = (time.perf_counter() - start) / lookups * 1e9
+    # id tokens take the table's interned lexeme, so each name is one object
+    buffer = DFALexicalAnalyzer(generate("identifier", size)).tokenBuffer()
+    ids = [buffer.attribute(i) for i in range(len(buffer)) if buffer.kindName(i) == "id"]
+    results["id_tokens"] = len(ids)
+    results["id_strings"] = len({id(lexeme) for lexeme in ids})
+    print(f"{identifiers} ids  save {results['save_s'] * 1e3:8.1f} ms  "
+          f"open {results['open_s'] * 1e6:8.1f} us")
+    print(f"snapshot {results['snapshot_bytes'] / 1e6:6.2f} MB   pickle {results['pickle_bytes'] / 1e6:6.2f} MB")
+    print(f"lookup   mapped {results['mapped_lookup_ns']:6.0f} ns   dict {results['dict_lookup_ns']:6.0f} ns")
+    print(f"{results['id_tokens']} id tokens share {results['id_strings']} string objects")
+    return results
+
+
+BENCHMARKS = {
+    "symtab": bench_symbol_table,
+    "engines": bench_engines,
+    "reader": bench_reader,
+    "tokenmem": bench_token_memory,
+    "files": bench_parallel_files,
+    "split": bench_split_file,
+    "incremental": bench_incremental,
+    "firstfollow": bench_first_follow,
+    "ll1": bench_ll1,
+    "grammarcache": bench_grammar_cache,
+    "regex": bench_regex_snippets,
+    "keywords": bench_keywords,
+    "classes": bench_char_classes,
+    "runs": bench_runs,
+    "positions": bench_positions,
+    "recovery": bench_recovery,
+    "corpora": bench_corpora,
+    "backends": bench_backends,
+    "lexgen": bench_lexgen,
+    "stats": bench_stats,
+    "snapshot": bench_snapshot,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _names(text, known, what, parser):
+    names = [name for name in text.split(",") if name]
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        parser.error(f"unknown {what}: {', '.join(unknown)} (choose from {', '.join(known)})")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scanner benchmarks")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--json", metavar="PATH", default=None,
+                        help="also write every result to PATH as JSON")
+    corpora = parser.add_argument_group("corpora benchmark")
+    corpora.add_argument("--sizes", default="256KB",
+                         help="comma separated corpus sizes, e.g. 64KB,10MB,1GB")
+    corpora.add_argument("--corpora", default=",".join(SUITE_CORPORA),
+                         help=f"comma separated corpus kinds from {', '.join(CORPORA)}")
+    corpora.add_argument("--engines", default=",".join(CORPUS_ENGINES),
+                         help="comma separated engines: chain, dfa, regex")
+    corpora.add_argument("--seed", type=int, default=0)
+    corpora.add_argument("--profile", action="store_true",
+                         help="profile each run and report time per recognizer")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(",") if size]
+    except ValueError as error:
+        parser.error(str(error))
+    options = {"corpora": {"sizes": sizes,
+                           "corpora": _names(args.corpora, CORPORA, "corpus kind(s)", parser),
+                           "engines": _names(args.engines, CORPUS_ENGINES, "engine(s)", parser),
+                           "seed": args.seed, "profile": args.profile}}
+
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name}")
+        results[name] = BENCHMARKS[name](**options.get(name, {}))
+
+    if args.json is not None:
+        report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "commit": _commit(),
+                  "python": platform.python_version(), "platform": platform.platform(),
+                  "results": results}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
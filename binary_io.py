@@ -0,0 +1,45 @@
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+
+
+# Shared by the on-disk formats: grammar_cache, lexgen tables, symbol
+# table snapshots and TokenBuffer frames.
+
+
+@contextmanager
+def atomic_writer(path, prefix=".tmp-"):
+    # yields a binary file beside path that is renamed over it on success,
+    # so readers, and processes that mapped the old file, never see a
+    # half-written one; on any error the temp file is removed
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    import tempfile
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=prefix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def column_bytes(column):
+    # columns are stored little-endian whatever the machine's byte order
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def column_from_bytes(typecode, data):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
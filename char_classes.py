@@ -0,0 +1,63 @@
+import re
+
+
+# character classes; whitespace classes come first so "cls <= C_NL" means blank
+(C_WS, C_NL, C_OTHER, C_LETTER, C_E, C_DIGIT, C_DOT, C_PLUS, C_MINUS, C_STAR,
+ C_SLASH, C_LT, C_GT, C_EQ, C_BANG, C_LPAREN, C_RPAREN, C_LBRACKET, C_RBRACKET,
+ C_LCURLY, C_RCURLY, C_SEMICOLON, C_COMMA, C_COLON) = range(24)
+CLASS_COUNT = 24
+
+_SINGLE_CHARS = {
+    " ": C_WS, "\t": C_WS, "\r": C_WS, "\n": C_NL,
+    "e": C_E, ".": C_DOT, "+": C_PLUS, "-": C_MINUS, "*": C_STAR, "/": C_SLASH,
+    "<": C_LT, ">": C_GT, "=": C_EQ, "!": C_BANG,
+    "(": C_LPAREN, ")": C_RPAREN, "[": C_LBRACKET, "]": C_RBRACKET,
+    "{": C_LCURLY, "}": C_RCURLY, ";": C_SEMICOLON, ",": C_COMMA, ":": C_COLON,
+}
+
+
+class CharClassMap(dict):
+    # classes follow str.isdigit/isalpha, the tests LexicalAnalyzer always
+    # used, so non-ASCII digits and letters are classified on first sight
+    # and cached
+    def __missing__(self, ch):
+        if ch in _SINGLE_CHARS:
+            cls = _SINGLE_CHARS[ch]
+        elif ch.isdigit():
+            cls = C_DIGIT
+        elif ch.isalpha():
+            cls = C_LETTER
+        else:
+            cls = C_OTHER
+        self[ch] = cls
+        return cls
+
+
+class OrdinalClassMap(dict):
+    # the same classes keyed by code point, the form str.translate looks up
+    def __missing__(self, code):
+        cls = self[code] = CHAR_CLASSES[chr(code)]
+        return cls
+
+
+CHAR_CLASSES = CharClassMap()
+for _code in range(128):
+    CHAR_CLASSES[chr(_code)]
+ORDINAL_CLASSES = OrdinalClassMap()
+
+# bytes.translate table for ASCII text
+ASCII_CLASS_TABLE = bytes(CHAR_CLASSES[chr(code)] for code in range(128)) + bytes([C_OTHER]) * 128
+
+# runs over a classified buffer
+BLANK_RUN = re.compile(rb"[\x00\x01]*")
+WORD_RUN = re.compile(rb"[\x03\x04\x05]*")
+DIGIT_RUN = re.compile(rb"\x05*")
+# characters that cannot start any token
+INVALID_RUN = re.compile(rb"[\x02\x06]*")
+
+
+def classify(text):
+    # one class byte per character of text, so classes[i] is the class of text[i]
+    if text.isascii():
+        return text.encode("ascii").translate(ASCII_CLASS_TABLE)
+    return text.translate(ORDINAL_CLASSES).encode("latin-1")
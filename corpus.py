@@ -0,0 +1,189 @@
+import argparse
+import random
+import re
+import sys
+
+from char_classes import C_DOT, C_OTHER, CHAR_CLASSES
+
+
+# Deterministic synthetic inputs for the benchmarks. Every corpus is an
+# endless stream of pieces drawn from random.Random(seed), cut once the
+# requested size is reached, so the same (kind, size, seed) always gives
+# the same text and sizes from kilobytes to gigabytes can be streamed.
+
+STATEMENTS = [
+    "int {a} = {b} + {n};",
+    "if ({a} >= {n}) {{ {b} = {a} * {f}; }}",
+    "while ({a} != {b}) {{ {a} = {a} - 1; }}",
+    "float {a} = {f}e-{d};",
+    "// {a} is updated by {b}",
+    "return ({a} <= {b}) == ({b} < {n});",
+    "{a}[{n}] = {b} / {f};",
+]
+
+CHUNK_SIZE = 1 << 20
+
+
+def mixed_lines(rnd, statements=STATEMENTS):
+    names = [f"v{i}" for i in range(1000)]
+    while True:
+        yield rnd.choice(statements).format(
+            a=rnd.choice(names), b=rnd.choice(names), n=rnd.randrange(1000),
+            f=f"{rnd.randrange(100)}.{rnd.randrange(100)}", d=rnd.randrange(1, 9))
+
+
+def minified_lines(rnd):
+    # statements for a program on one line, so no comments
+    return mixed_lines(rnd, [statement for statement in STATEMENTS if not statement.startswith("//")])
+
+
+def identifier_lines(rnd):
+    # long identifiers and keywords separated by single blanks
+    letters = "abcdefghijklmnopqrstuvwxyz0123456789"
+    words = ["if", "while", "return"] + [
+        rnd.choice("abcdefghij") + "".join(rnd.choice(letters) for _ in range(rnd.randrange(8, 40)))
+        for _ in range(500)]
+    while True:
+        yield " ".join(rnd.choice(words) for _ in range(rnd.randrange(4, 16)))
+
+
+def _number(rnd):
+    digits = str(rnd.randrange(1, 100000))
+    form = rnd.randrange(5)
+    if form == 0:
+        return digits
+    if form == 1:
+        return f"{digits}.{rnd.randrange(1000)}"
+    if form == 2:
+        return f"{digits}e{rnd.randrange(1, 300)}"
+    sign = "+" if form == 3 else "-"
+    return f"{digits}.{rnd.randrange(1000)}e{sign}{rnd.randrange(1, 300)}"
+
+
+def numeric_lines(rnd):
+    # numbers with fractions and signed exponents
+    while True:
+        numbers = [_number(rnd) for _ in range(rnd.randrange(2, 10))]
+        yield f"x{rnd.randrange(100)} = " + " * ".join(numbers) + ";"
+
+
+def operator_lines(rnd):
+    # operators and punctuation between one-letter operands
+    operators = ["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!=", "=",
+                 "(", ")", "[", "]", "{", "}", ";", ",", ":"]
+    while True:
+        yield "a" + "".join(rnd.choice(operators) + rnd.choice("abxy1")
+                            for _ in range(rnd.randrange(10, 60)))
+
+
+def comment_lines(rnd):
+    # long comment lines between short statements
+    words = ["update", "the", "running", "total", "before", "x", "returns", "42", "+", "(see", "above)"]
+    while True:
+        if rnd.random() < 0.8:
+            yield "// " + " ".join(rnd.choice(words) for _ in range(rnd.randrange(20, 200)))
+        else:
+            yield "x = x + 1;"
+
+
+def whitespace_lines(rnd):
+    # short statements padded with long runs of blanks and blank lines
+    while True:
+        yield rnd.choice(("x = 1;", "y(z);", "a < b")) + " " * rnd.randrange(8, 64) + \
+            "\t" * rnd.randrange(4) + "\n" * rnd.randrange(3)
+
+
+# lone surrogates stand for raw bytes: written with surrogateescape they
+# make a garbage file invalid UTF-8
+RAW_BYTES = "".join(chr(0xDC00 + byte) for byte in range(0x80, 0x100))
+
+
+def garbage_lines(rnd):
+    # binary-looking text: mostly characters no token starts with, some
+    # letters, digits and blanks scattered through
+    alphabet = "".join(ch for ch in map(chr, range(0x100))
+                       if CHAR_CLASSES[ch] in (C_OTHER, C_DOT) and ch not in "\r\n") + RAW_BYTES
+    while True:
+        yield "".join(
+            "".join(rnd.choice(alphabet) for _ in range(rnd.randrange(1, 64)))
+            + rnd.choice(("a", "9", " ", "=", "x1"))
+            for _ in range(rnd.randrange(1, 8)))
+
+
+# kind -> (piece generator, separator written after each piece)
+CORPORA = {
+    "identifier": (identifier_lines, "\n"),
+    "numeric": (numeric_lines, "\n"),
+    "operator": (operator_lines, "\n"),
+    "comment": (comment_lines, "\n"),
+    "mixed": (mixed_lines, "\n"),
+    "whitespace": (whitespace_lines, "\n"),
+    "minified": (minified_lines, " "),
+    "garbage": (garbage_lines, "\n"),
+}
+
+
+def iter_corpus(kind, size, seed=0, chunkSize=CHUNK_SIZE):
+    # yields str chunks totalling at least size characters, whole pieces only
+    pieces, separator = CORPORA[kind]
+    chunk = []
+    length = 0
+    total = 0
+    for piece in pieces(random.Random(seed)):
+        if total >= size:
+            break
+        chunk.append(piece)
+        chunk.append(separator)
+        length += len(piece) + len(separator)
+        total += len(piece) + len(separator)
+        if length >= chunkSize:
+            yield "".join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def generate(kind, size, seed=0):
+    return "".join(iter_corpus(kind, size, seed))
+
+
+def write_corpus(path, kind, size, seed=0):
+    # streams the corpus, so gigabyte files never sit in memory
+    written = 0
+    with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        for chunk in iter_corpus(kind, size, seed):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+_SIZE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", re.IGNORECASE)
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text):
+    # "512", "64KB", "10MB", "1.5G" -> characters
+    match = _SIZE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"bad size {text!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic lexer corpus")
+    parser.add_argument("kind", choices=list(CORPORA))
+    parser.add_argument("size", type=parse_size, help="e.g. 64KB, 10MB, 1GB")
+    parser.add_argument("-o", "--output", default=None, help="file to write (default: stdout)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.output is None:
+        for chunk in iter_corpus(args.kind, args.size, args.seed):
+            sys.stdout.buffer.write(chunk.encode("utf-8", "surrogateescape"))
+    else:
+        write_corpus(args.output, args.kind, args.size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,286 @@
-def compute_first(grammar):
+EPSILON = 'ε'
+
+
+def compile_grammar(grammar):
+    # productions become (lhs, symbols) with integer symbols: ids below
+    # len(nonterminals) are nonterminals, the rest index into terminals.
+    # 'ε' contributes nothing to FIRST or FOLLOW, so it is dropped here.
+    nonterminals = list(grammar)
+    index = {nt: i for i, nt in enumerate(nonterminals)}
+    terminals = []
+    terminal_index = {}
+    productions = []
+    n = len(nonterminals)
+    for nt in nonterminals:
+        for production in grammar[nt]:
+            symbols = []
+            for sym in production.split():
+                if sym == EPSILON:
+                    continue
+                if sym in index:
+                    symbols.append(index[sym])
+                    continue
+                t = terminal_index.get(sym)
+                if t is None:
+                    t = terminal_index[sym] = len(terminals)
+                    terminals.append(sym)
+                symbols.append(n + t)
+            productions.append((index[nt], tuple(symbols)))
+    return nonterminals, terminals, productions
+
+
+def _count(stats, **counts):
+    # adds work counters into a caller's stats dict, if there is one
+    if stats is not None:
+        for key, value in counts.items():
+            stats[key] = stats.get(key, 0) + value
+
+
+def compute_nullable(n, productions, stats=None):
+    # worklist: a production becomes nullable once all its symbols are
+    nullable = [False] * n
+    visits = 0
+    remaining = []
+    users = [[] for _ in range(n)]
+    queue = []
+    for p, (lhs, symbols) in enumerate(productions):
+        visits += 1
+        if any(sym >= n for sym in symbols):
+            remaining.append(-1)
+            continue
+        remaining.append(len(symbols))
+        for sym in symbols:
+            users[sym].append(p)
+        if not symbols and not nullable[lhs]:
+            nullable[lhs] = True
+            queue.append(lhs)
+    while queue:
+        nt = queue.pop()
+        visits += len(users[nt])
+        for p in users[nt]:
+            remaining[p] -= 1
+            if remaining[p] == 0:
+                lhs = productions[p][0]
+                if not nullable[lhs]:
+                    nullable[lhs] = True
+                    queue.append(lhs)
+    _count(stats, production_visits=visits)
+    return nullable
+
+
+def propagate(init, edges, stats=None):
+    # least solution of value[v] = init[v] | value[w] for every edge v -> w,
+    # with values as integer bitmasks.
+    # Tarjan's algorithm finishes strongly connected components in reverse
+    # topological order, so one pass over the components is enough.
+    n = len(init)
+    value = [None] * n
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    components = 0
+    relaxed = 0
+    unions = 0
+    for root in range(n):
+        if order[root] >= 0:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(edges[root]))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if order[w] < 0:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(edges[w])))
+                    break
+                if on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == order[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    total = 0
+                    for w in component:
+                        total |= init[w]
+                        unions += 1
+                        for x in edges[w]:
+                            relaxed += 1
+                            if value[x] is not None:
+                                total |= value[x]
+                                unions += 1
+                    for w in component:
+                        value[w] = total
+                    components += 1
+    _count(stats, components=components, edges=relaxed, unions=unions)
+    return value
+
+
+def members(mask, names):
+    # bit i of mask stands for names[i]
+    bits = bin(mask)[:1:-1]
+    return {names[i] for i, bit in enumerate(bits) if bit == '1'}
+
+
+class GrammarAnalysis:
+    # FIRST and FOLLOW as integer bitmasks over interned terminals, with
+    # ε kept apart in nullable; sets of strings only appear in first_sets
+    # and follow_sets
+    def __init__(self, grammar, first=None, stats=None):
+        # stats, a dict, collects counts of the work done by the solvers
+        self.stats = stats
+        self.nonterminals, self.terminals, self.productions = compile_grammar(grammar)
+        self.terminal_index = {t: i for i, t in enumerate(self.terminals)}
+        self.follow_bits = None
+        self.first_override = first
+        if first is None:
+            self.nullable = compute_nullable(len(self.nonterminals), self.productions, stats)
+            self.first_bits = self.solve_first()
+        else:
+            self.nullable = [EPSILON in first[nt] for nt in self.nonterminals]
+            self.first_bits = [self.mask(first[nt]) for nt in self.nonterminals]
+
+    @classmethod
+    def from_parts(cls, nonterminals, terminals, productions, nullable, first_bits, follow_bits=None):
+        # rebuilds a finished analysis, e.g. one loaded from grammar_cache
+        analysis = cls.__new__(cls)
+        analysis.nonterminals = nonterminals
+        analysis.terminals = terminals
+        analysis.productions = productions
+        analysis.terminal_index = {t: i for i, t in enumerate(terminals)}
+        analysis.nullable = nullable
+        analysis.first_bits = first_bits
+        analysis.follow_bits = follow_bits
+        analysis.first_override = None
+        analysis.stats = None
+        return analysis
+
+    def intern(self, terminal):
+        t = self.terminal_index.get(terminal)
+        if t is None:
+            t = self.terminal_index[terminal] = len(self.terminals)
+            self.terminals.append(terminal)
+        return t
+
+    def mask(self, terminals):
+        result = 0
+        for terminal in terminals:
+            if terminal != EPSILON:
+                result |= 1 << self.intern(terminal)
+        return result
+
+    def solve_first(self):
+        n = len(self.nonterminals)
+        nullable = self.nullable
+        init = [0] * n
+        edges = [[] for _ in range(n)]
+        visits = 0
+        for lhs, symbols in self.productions:
+            visits += 1
+            for sym in symbols:
+                if sym >= n:
+                    init[lhs] |= 1 << (sym - n)
+                    break
+                edges[lhs].append(sym)
+                if not nullable[sym]:
+                    break
+        _count(self.stats, production_visits=visits)
+        return propagate(init, edges, self.stats)
+
+    def symbol_first(self, sym):
+        # -> (FIRST mask, nullable) of one compiled symbol
+        n = len(self.nonterminals)
+        if sym < n:
+            return self.first_bits[sym], self.nullable[sym]
+        if self.first_override is not None:
+            # compute_follow honours FIRST sets given for terminals as well
+            name = self.terminals[sym - n]
+            if name in self.first_override:
+                f = self.first_override[name]
+                return self.mask(f), EPSILON in f
+        return 1 << (sym - n), False
+
+    def first_of_symbols(self, symbols):
+        mask = 0
+        for sym in symbols:
+            f, sym_nullable = self.symbol_first(sym)
+            mask |= f
+            if not sym_nullable:
+                return mask, False
+        return mask, True
+
+    def solve_follow(self, start_symbol):
+        n = len(self.nonterminals)
+        end_marker = 1 << self.intern('$')
+        init = [0] * n
+        init[self.nonterminals.index(start_symbol)] = end_marker
+        edges = [[] for _ in range(n)]
+        visits = 0
+        unions = 0
+        for lhs, symbols in self.productions:
+            visits += 1
+            # walk right to left, carrying FIRST of the suffix after each symbol
+            trail = 0
+            trail_nullable = True
+            for sym in reversed(symbols):
+                if sym < n:
+                    init[sym] |= trail
+                    unions += 1
+                    if trail_nullable:
+                        edges[sym].append(lhs)
+                f, sym_nullable = self.symbol_first(sym)
+                if sym_nullable:
+                    trail |= f
+                else:
+                    trail = f
+                    trail_nullable = False
+        _count(self.stats, production_visits=visits, unions=unions)
+        self.follow_bits = propagate(init, edges, self.stats)
+        return self.follow_bits
+
+    def first_sets(self):
+        first = {}
+        for i, nt in enumerate(self.nonterminals):
+            first[nt] = members(self.first_bits[i], self.terminals)
+            if self.nullable[i]:
+                first[nt].add(EPSILON)
+        return first
+
+    def follow_sets(self):
+        return {nt: members(self.follow_bits[i], self.terminals)
+                for i, nt in enumerate(self.nonterminals)}
+
+
+def compute_first(grammar, stats=None):
+    analysis = GrammarAnalysis(grammar, stats=stats)
+    return analysis.first_sets()
+
+
+def compute_follow(grammar, first, start_symbol, stats=None):
+    analysis = GrammarAnalysis(grammar, first)
+    analysis.stats = stats
+    analysis.solve_follow(start_symbol)
+    return analysis.follow_sets()
+
+
+def compute_first_naive(grammar, stats=None):
     first = {nt: set() for nt in grammar}
 
     def first_of(symbol):
@@ -6,17 +288,23 @@ def compute_first(grammar):
             return {symbol}
         return first[symbol]
 
+    sweeps = 0
+    visits = 0
+    unions = 0
     changed = True
     while changed:
         changed = False
+        sweeps += 1
         for nt in grammar:
             for production in grammar[nt]:
+                visits += 1
                 symbols = production.split()
                 can_epsilon = True
+                before = len(first[nt])
                 for sym in symbols:
                     f = first_of(sym)
-                    before = len(first[nt])
                     first[nt].update(f - {'ε'})
+                    unions += 1
                     if 'ε' not in f:
                         can_epsilon = False
                         break
@@ -24,10 +312,11 @@ def compute_first(grammar):
                     first[nt].add('ε')
                 if len(first[nt]) != before:
                     changed = True
+    _count(stats, sweeps=sweeps, production_visits=visits, unions=unions)
     return first
 
 
-def compute_follow(grammar, first, start_symbol):
+def compute_follow_naive(grammar, first, start_symbol, stats=None):
     follow = {nt: set() for nt in grammar}
     follow[start_symbol].add('$')
 
@@ -41,11 +330,16 @@ def compute_follow(grammar, first, start_symbol):
         result.add('ε')
         return result
 
+    sweeps = 0
+    visits = 0
+    unions = 0
     changed = True
     while changed:
         changed = False
+        sweeps += 1
         for nt in grammar:
             for production in grammar[nt]:
+                visits += 1
                 symbols = production.split()
                 for i, sym in enumerate(symbols):
                     if sym in grammar:
@@ -53,10 +347,13 @@ def compute_follow(grammar, first, start_symbol):
                         f = first_of_string(after)
                         before = len(follow[sym])
                         follow[sym].update(f - {'ε'})
+                        unions += 1
                         if 'ε' in f or not after:
                             follow[sym].update(follow[nt])
+                            unions += 1
                         if len(follow[sym]) != before:
                             changed = True
+    _count(stats, sweeps=sweeps, production_visits=visits, unions=unions)
     return follow
 
 
@@ -69,14 +366,19 @@ grammar = {
 }
 
 
-start_symbol = next(iter(grammar))
-first = compute_first(grammar)
-follow = compute_follow(grammar, first, start_symbol)
+def main():
+    start_symbol = next(iter(grammar))
+    first = compute_first(grammar)
+    follow = compute_follow(grammar, first, start_symbol)
+
+    print("FIRST sets:")
+    for nt in first:
+        print(f"first({nt}): {first[nt]}")
+
+    print("\nFOLLOW sets:")
+    for nt in follow:
+        print(f"follow({nt}): {follow[nt]}")
 
-print("FIRST sets:")
-for nt in first:
-    print(f"first({nt}): {first[nt]}")
 
-print("\nFOLLOW sets:")
-for nt in follow:
-    print(f"follow({nt}): {follow[nt]}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import marshal
+import os
+import struct
+
+from binary_io import atomic_writer
+from firstFollow import GrammarAnalysis
+
+
+CACHE_MAGIC = b"FFCACHE\0"
+# bump when the layout of the cached analysis changes
+CACHE_VERSION = 1
+_HEADER = struct.Struct("<8sHH32s")
+
+
+def default_cache_dir():
+    return os.environ.get("FIRSTFOLLOW_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "firstFollow"))
+
+
+def grammar_hash(grammar, start_symbol):
+    # production order matters for the cached production indexes, so the
+    # grammar is hashed as written rather than with sorted keys
+    payload = json.dumps([start_symbol, [[nt, list(grammar[nt])] for nt in grammar]],
+                         ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+def save_analysis(path, analysis, key):
+    payload = marshal.dumps((analysis.nonterminals, analysis.terminals, analysis.productions,
+                             analysis.nullable, analysis.first_bits, analysis.follow_bits))
+    with atomic_writer(path, ".ffcache-") as f:
+        f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, marshal.version, key))
+        f.write(payload)
+
+
+def load_analysis(path, key):
+    # returns None for a missing, stale or unreadable cache file
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, marshal_version, stored_key = _HEADER.unpack_from(data)
+    if (magic, version, marshal_version, stored_key) != (CACHE_MAGIC, CACHE_VERSION,
+                                                        marshal.version, key):
+        return None
+    try:
+        parts = marshal.loads(data[_HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return GrammarAnalysis.from_parts(*parts)
+
+
+def cached_analysis(grammar, start_symbol=None, cache_dir=None):
+    if start_symbol is None:
+        start_symbol = next(iter(grammar))
+    key = grammar_hash(grammar, start_symbol)
+    path = os.path.join(cache_dir or default_cache_dir(), key.hex() + ".ffc")
+
+    analysis = load_analysis(path, key)
+    if analysis is not None:
+        return analysis
+
+    analysis = GrammarAnalysis(grammar)
+    analysis.solve_follow(start_symbol)
+    try:
+        save_analysis(path, analysis, key)
+    except OSError:
+        # an unwritable cache only costs the next start its warm path
+        pass
+    return analysis
+
+
+def cached_first_follow(grammar, start_symbol=None, cache_dir=None):
+    analysis = cached_analysis(grammar, start_symbol, cache_dir)
+    return analysis.first_sets(), analysis.follow_sets()
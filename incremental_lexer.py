@@ -0,0 +1,202 @@
+from char_classes import classify
+from scanner import LexicalError, SymbolTable, Token
+from scanner_with_dfa import K_COMMENT, K_ID, K_KEYWORD, K_UNKNOWN, TOKEN_KINDS, scanToken
+
+
+# lines per block; locating an offset walks the blocks, then one block's lines
+BLOCK_LINES = 256
+
+
+def split_lines(text):
+    # every line keeps its "\n"; the last one has none and may be empty
+    parts = text.split("\n")
+    return [part + "\n" for part in parts[:-1]] + [parts[-1]]
+
+
+class _Block:
+    __slots__ = ("lines", "tokens", "length", "count")
+
+    def __init__(self, lines, tokens):
+        self.lines = lines
+        # per line, a list of (kind, attribute, start, end) relative to the line
+        self.tokens = tokens
+        self.length = sum(map(len, lines))
+        self.count = sum(map(len, tokens))
+
+
+class IncrementalLexer:
+    # No token spans a line break, so a line always starts at a token
+    # boundary and lexes the same wherever it sits in the buffer. An edit
+    # re-lexes the lines it touches and the old stream resynchronizes at
+    # the first untouched line.
+    def __init__(self, text="", symbolTable=None):
+        self.symbolTable = symbolTable if symbolTable is not None else SymbolTable()
+        # id reference counts, indexed by symbol table address
+        self.references = []
+        lines = split_lines(text)
+        tokens = [self.lexLine(line) for line in lines]
+        self.blocks = [_Block(lines[i:i + BLOCK_LINES], tokens[i:i + BLOCK_LINES])
+                       for i in range(0, len(lines), BLOCK_LINES)]
+
+    def lexLine(self, line):
+        table = self.symbolTable
+        references = self.references
+        tokens = []
+        classes = classify(line)
+        pos = 0
+        while True:
+            result = scanToken(line, pos, True, classes)
+            if result is None:
+                return tokens
+            kind, start, pos = result
+            lexeme = line[start:pos]
+            if kind == K_ID:
+                keyword = table.keyword(lexeme)
+                if keyword is not None:
+                    table.addKeyword(keyword)
+                    lexeme = keyword
+                    kind = K_KEYWORD
+                else:
+                    address = table.installID(lexeme)
+                    lexeme = table.lexemes[address]
+                    while len(references) <= address:
+                        references.append(0)
+                    references[address] += 1
+            elif kind == K_COMMENT:
+                lexeme = lexeme.strip()
+            tokens.append((kind, lexeme, start, pos))
+
+    def release(self, lineTokens):
+        index = self.symbolTable.index
+        references = self.references
+        for tokens in lineTokens:
+            for kind, lexeme, start, end in tokens:
+                if kind == K_ID:
+                    references[index[lexeme]] -= 1
+
+    def referenceCount(self, lexeme):
+        address = self.symbolTable.index.get(lexeme)
+        if address is None or address >= len(self.references):
+            return 0
+        return self.references[address]
+
+    def locate(self, offset):
+        # -> (block index, line index, line start offset, index of the line's first token)
+        blocks = self.blocks
+        blockStart = 0
+        tokenBase = 0
+        last = len(blocks) - 1
+        for blockIndex, block in enumerate(blocks):
+            if offset < blockStart + block.length or blockIndex == last:
+                break
+            blockStart += block.length
+            tokenBase += block.count
+
+        lineStart = blockStart
+        lines = block.lines
+        tokens = block.tokens
+        last = len(lines) - 1
+        for lineIndex, line in enumerate(lines):
+            if offset < lineStart + len(line) or lineIndex == last:
+                break
+            lineStart += len(line)
+            tokenBase += len(tokens[lineIndex])
+        return blockIndex, lineIndex, lineStart, tokenBase
+
+    def apply_edit(self, start, end, new_text):
+        # replaces text[start:end] with new_text and returns the changed
+        # token range (first, oldStop, newStop): tokens[first:oldStop] of
+        # the old stream became tokens[first:newStop]
+        if not 0 <= start <= end <= len(self):
+            raise ValueError(f"edit range {start}:{end} outside buffer of length {len(self)}")
+
+        firstBlock, firstLine, regionStart, firstToken = self.locate(start)
+        lastBlock, lastLine, _, _ = self.locate(end)
+        blocks = self.blocks
+
+        oldLines = []
+        oldTokens = []
+        for blockIndex in range(firstBlock, lastBlock + 1):
+            block = blocks[blockIndex]
+            lo = firstLine if blockIndex == firstBlock else 0
+            hi = lastLine + 1 if blockIndex == lastBlock else len(block.lines)
+            oldLines.extend(block.lines[lo:hi])
+            oldTokens.extend(block.tokens[lo:hi])
+
+        oldText = "".join(oldLines)
+        newText = oldText[:start - regionStart] + new_text + oldText[end - regionStart:]
+        newLines = split_lines(newText)
+        if oldLines[-1].endswith("\n"):
+            # the region is followed by more lines, not by the end of the buffer
+            newLines.pop()
+        newTokens = [self.lexLine(line) for line in newLines]
+        self.release(oldTokens)
+
+        head = blocks[firstBlock]
+        tail = blocks[lastBlock]
+        lines = head.lines[:firstLine] + newLines + tail.lines[lastLine + 1:]
+        tokens = head.tokens[:firstLine] + newTokens + tail.tokens[lastLine + 1:]
+        blocks[firstBlock:lastBlock + 1] = self.rebalance(lines, tokens)
+
+        return self.changedRange(firstToken, oldLines, oldTokens, newLines, newTokens)
+
+    def rebalance(self, lines, tokens):
+        if len(lines) <= 2 * BLOCK_LINES:
+            return [_Block(lines, tokens)]
+        return [_Block(lines[i:i + BLOCK_LINES], tokens[i:i + BLOCK_LINES])
+                for i in range(0, len(lines), BLOCK_LINES)]
+
+    @staticmethod
+    def _flatten(lines, lineTokens):
+        flat = []
+        offset = 0
+        for line, tokens in zip(lines, lineTokens):
+            for kind, lexeme, start, end in tokens:
+                flat.append((kind, lexeme, start + offset, end + offset))
+            offset += len(line)
+        return flat, offset
+
+    def changedRange(self, firstToken, oldLines, oldTokens, newLines, newTokens):
+        old, oldLength = self._flatten(oldLines, oldTokens)
+        new, newLength = self._flatten(newLines, newTokens)
+
+        prefix = 0
+        limit = min(len(old), len(new))
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+
+        # tokens after the edit compare by their distance from the region end
+        shift = newLength - oldLength
+        suffix = 0
+        while suffix < limit - prefix:
+            kind, lexeme, start, end = old[-1 - suffix]
+            if new[-1 - suffix] != (kind, lexeme, start + shift, end + shift):
+                break
+            suffix += 1
+
+        return (firstToken + prefix,
+                firstToken + len(old) - suffix,
+                firstToken + len(new) - suffix)
+
+    def __len__(self):
+        return sum(block.length for block in self.blocks)
+
+    @property
+    def text(self):
+        return "".join(line for block in self.blocks for line in block.lines)
+
+    @property
+    def tokenCount(self):
+        return sum(block.count for block in self.blocks)
+
+    def tokens(self):
+        offset = 0
+        for block in self.blocks:
+            for line, lineTokens in zip(block.lines, block.tokens):
+                for kind, lexeme, start, end in lineTokens:
+                    yield Token(TOKEN_KINDS[kind], lexeme, offset + start)
+                offset += len(line)
+
+    def getLexicalErrors(self):
+        return [LexicalError(token.attribute, token.position)
+                for token in self.tokens() if token.name == TOKEN_KINDS[K_UNKNOWN]]
@@ -0,0 +1,201 @@
+import glob
+import io
+import json
+import os
+import struct
+import sys
+from functools import partial
+
+from line_index import LineIndex
+from lexers import BACKENDS, make_lexer
+from parallel_lexer import merge_symbol_table
+from scanner import SymbolTable, symbol_table_lines
+from scanner_stats import ScannerStats
+from token_buffer import TokenBuffer
+
+
+ENGINES = ("auto",) + tuple(BACKENDS)
+FORMATS = ("jsonl", "binary")
+WRITE_BUFFER = 1 << 20
+# binary output: per input, the path then one TokenBuffer frame
+_PATH_LENGTH = struct.Struct("<I")
+
+
+def expand_inputs(patterns):
+    # "-" is stdin; anything that is not an existing file is a glob
+    paths = []
+    for pattern in patterns:
+        if pattern == "-" or os.path.isfile(pattern):
+            paths.append(pattern)
+            continue
+        matches = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        if not matches:
+            raise FileNotFoundError(f"no input matches {pattern!r}")
+        paths.extend(matches)
+    return paths
+
+
+def read_input(path):
+    # offsets count characters of the text exactly as stored, "\r\n" included
+    if path == "-":
+        data = sys.stdin.buffer.read()
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    return data.decode("utf-8", "replace")
+
+
+def jsonl_payload(path, buffer, lines):
+    # each attribute and kind is JSON-encoded once, not once per token;
+    # tokens come in offset order, so the line is found by walking forward
+    prefix = '{"file":' + json.dumps(path, ensure_ascii=False) + ',"kind":'
+    kinds = [json.dumps(name) for name in buffer.kindNames]
+    attributes = [json.dumps(attribute, ensure_ascii=False) for attribute in buffer.attributeTable]
+    starts = lines.starts
+    lastLine = len(starts) - 1
+    line = 0
+    records = []
+    append = records.append
+    for kind, attribute, start, end in zip(buffer.kinds, buffer.attributes, buffer.starts, buffer.ends):
+        while line < lastLine and starts[line + 1] <= start:
+            line += 1
+        append(f'{prefix}{kinds[kind]},"attribute":{attributes[attribute]},'
+               f'"start":{start},"end":{end},"line":{line + 1},"column":{start - starts[line] + 1}}}\n')
+    return "".join(records).encode("utf-8")
+
+
+def binary_payload(path, buffer):
+    stream = io.BytesIO()
+    encoded = path.encode("utf-8")
+    stream.write(_PATH_LENGTH.pack(len(encoded)))
+    stream.write(encoded)
+    buffer.write(stream)
+    return stream.getvalue()
+
+
+def read_token_file(stream):
+    # yields (path, TokenBuffer) back from --format binary output
+    while True:
+        header = stream.read(_PATH_LENGTH.size)
+        if not header:
+            return
+        (length,) = _PATH_LENGTH.unpack(header)
+        path = stream.read(length).decode("utf-8")
+        buffer = TokenBuffer.read(stream)
+        if buffer is None:
+            raise ValueError("truncated token file")
+        yield path, buffer
+
+
+def lex_source(path, engine, outputFormat, recover, maxErrors, text=None, collectStats=False):
+    # runs in a worker: lexes one input and formats its output there, so
+    # the parent only concatenates bytes and merges symbol tables
+    if text is None:
+        text = read_input(path)
+    name = "<stdin>" if path == "-" else path
+    stats = ScannerStats() if collectStats else None
+    analyzer = make_lexer(text, engine, recover=recover, maxErrors=maxErrors, stats=stats)
+    buffer = analyzer.tokenBuffer()
+    errors, dropped, symbolTable = analyzer.errors, analyzer.droppedErrors, analyzer.symbolTable
+    lines = LineIndex(text)
+    if outputFormat == "jsonl":
+        payload = jsonl_payload(name, buffer, lines)
+    else:
+        payload = binary_payload(name, buffer)
+    diagnostics = [f"{name}:{line}:{column}: {error}"
+                   for error in errors for line, column in (lines.lineCol(error.position),)]
+    return (name, payload, len(buffer), diagnostics, dropped, symbolTable.lexemes, symbolTable.types,
+            stats)
+
+
+def lex_inputs(paths, engine="auto", outputFormat="jsonl", jobs=1, recover=False, maxErrors=None,
+               collectStats=False):
+    # yields lex_source results in input order
+    lex = partial(lex_source, engine=engine, outputFormat=outputFormat,
+                  recover=recover, maxErrors=maxErrors, collectStats=collectStats)
+    if jobs <= 1 or len(paths) <= 1 or "-" in paths:
+        yield from map(lex, paths)
+        return
+    # imported here, so single-process runs skip loading multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(lex, paths)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Lex files, globs or stdin in batch")
+    parser.add_argument("inputs", nargs="*", metavar="INPUT",
+                        help="files or glob patterns, '-' for stdin (default: stdin)")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="jsonl",
+                        help="JSON Lines, one token per line, or TokenBuffer frames")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default="auto",
+                        help="lexer backend; auto picks regex for comment-heavy input, else dfa")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for multiple inputs (0: CPU count)")
+    parser.add_argument("--symbol-table", action="store_true",
+                        help="print the merged symbol table when done")
+    parser.add_argument("--recover", action="store_true",
+                        help="report each run of invalid characters as one error")
+    parser.add_argument("--max-errors", type=int, default=None,
+                        help="errors kept per input; the rest are only counted")
+    parser.add_argument("--snapshot", default=None, metavar="PATH",
+                        help="save the merged symbol table as an mmap-loadable snapshot")
+    parser.add_argument("--stats", default=None, metavar="PATH",
+                        help="write scanner counters in Prometheus text format ('-': stderr)")
+    args = parser.parse_args(argv)
+
+    try:
+        paths = expand_inputs(args.inputs) or ["-"]
+    except FileNotFoundError as error:
+        parser.error(str(error))
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.output is None:
+        sys.stdout.flush()
+        out = open(sys.stdout.fileno(), "wb", buffering=WRITE_BUFFER, closefd=False)
+        report = sys.stderr
+    else:
+        out = open(args.output, "wb", buffering=WRITE_BUFFER)
+        report = sys.stdout
+
+    symbolTable = SymbolTable()
+    stats = ScannerStats()
+    errorCount = 0
+    try:
+        with out:
+            for name, payload, _, diagnostics, dropped, lexemes, types, fileStats in lex_inputs(
+                    paths, args.engine, args.format, jobs, args.recover, args.max_errors,
+                    args.stats is not None):
+                out.write(payload)
+                if fileStats is not None:
+                    stats.merge(fileStats)
+                merge_symbol_table(symbolTable, lexemes, types)
+                errorCount += len(diagnostics) + dropped
+                for diagnostic in diagnostics:
+                    print(diagnostic, file=sys.stderr)
+                if dropped:
+                    print(f"{name}: ... {dropped} more lexical errors", file=sys.stderr)
+    except BrokenPipeError:
+        # the reader went away, e.g. "| head"; nothing left to report
+        sys.stderr.close()
+        return 1
+
+    if args.symbol_table:
+        print("Symbol Table:", file=report)
+        for line in symbol_table_lines(symbolTable):
+            print(line, file=report)
+    if args.snapshot is not None:
+        from symbol_snapshot import save_snapshot
+        save_snapshot(symbolTable, args.snapshot)
+    if args.stats == "-":
+        sys.stderr.write(stats.prometheus())
+    elif args.stats is not None:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            f.write(stats.prometheus())
+    return 1 if errorCount else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
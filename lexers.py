@@ -0,0 +1,81 @@
+import re
+import time
+
+from scanner import LexicalAnalyzer, MmapFileReader
+from scanner_with_dfa import DFALexicalAnalyzer
+from scanner_with_regex import RegexLexicalAnalyzer
+from scanner_stats import instrument
+
+
+# Every backend is a LexicalAnalyzer: built as
+# Backend(code, keywords=None, recover=False, maxErrors=None), it returns
+# Tokens from getNextToken(), lexes the rest of the input into a
+# TokenBuffer over TOKEN_KINDS with tokenBuffer(), and fills symbolTable,
+# errors and droppedErrors. All of them produce the same tokens
+# (tests/test_lexers.py checks it), so callers can switch backends
+# without other changes.
+BACKENDS = {
+    "chain": LexicalAnalyzer,
+    "dfa": DFALexicalAnalyzer,
+    "regex": RegexLexicalAnalyzer,
+}
+
+# Measured with bench backends: on code the DFA and regex backends run
+# within about 10% of each other at every size (the compiled pattern is
+# cached per process), with the DFA ahead on short mixed inputs. Regex
+# takes a whole comment in one match where the DFA steps through it, so
+# it wins once comments are about half the text and is 5-8x faster on
+# comment-heavy files. The share is estimated on a prefix of the input.
+COMMENT_SHARE = 0.5
+SAMPLE_SIZE = 1 << 16
+_COMMENT = re.compile(r"//[^\n]*")
+
+
+def comment_share(text):
+    sample = text[:SAMPLE_SIZE]
+    if not sample:
+        return 0.0
+    return sum(map(len, _COMMENT.findall(sample))) / len(sample)
+
+
+def choose_backend(text, mapped=False):
+    # mapped: the input is a MmapFileReader, which only the chain scanner
+    # reads without loading the whole file into memory
+    if mapped:
+        return "chain"
+    if comment_share(text) >= COMMENT_SHARE:
+        return "regex"
+    return "dfa"
+
+
+def make_lexer(code, backend="auto", keywords=None, recover=False, maxErrors=None, stats=None):
+    # code is the program text or an open reader, as for LexicalAnalyzer;
+    # a ScannerStats in stats gets the analyzer instrumented into it
+    mapped = not isinstance(code, str) and code.classes is None
+    if backend == "auto":
+        backend = choose_backend(code if isinstance(code, str) else code.content, mapped)
+    elif mapped and backend != "chain":
+        raise ValueError(f"the {backend} backend cannot lex a mapped file")
+    if stats is None:
+        return BACKENDS[backend](code, keywords, recover, maxErrors)
+    start = time.perf_counter()
+    analyzer = BACKENDS[backend](code, keywords, recover, maxErrors)
+    stats.phases["setup"] += time.perf_counter() - start
+    instrument(analyzer, stats)
+    return analyzer
+
+
+def open_lexer(path, backend="auto", keywords=None, recover=False, maxErrors=None, mapped=False,
+               stats=None):
+    # mapped lexes the file through mmap instead of reading it into memory
+    if mapped:
+        reader = MmapFileReader(path)
+        try:
+            return make_lexer(reader, backend, keywords, recover, maxErrors, stats)
+        except BaseException:
+            # e.g. a backend that cannot lex a mapped file; the analyzer
+            # would have owned the mapping, so release it here
+            reader.close()
+            raise
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        return make_lexer(f.read(), backend, keywords, recover, maxErrors, stats)
@@ -0,0 +1,642 @@
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_right
+
+from binary_io import atomic_writer, column_bytes
+from scanner import KeywordSet
+from scanner_with_regex import keywords, token_specification
+from token_buffer import TokenBuffer
+
+
+# Generates table-driven lexers from (name, regex) rules such as
+# token_specification: the rules become one Thompson NFA, the subset
+# construction turns it into a DFA over character classes, and Moore's
+# partition refinement minimizes it. Scanning takes the longest match,
+# the earliest rule winning ties, so a keyword rule placed before the
+# identifier rule needs no lookahead.
+
+CACHE_MAGIC = b"LEXGEN\0\0"
+# bump when the table layout or the generator's output changes
+TABLE_VERSION = 1
+_HEADER = struct.Struct("<8sHH32s")
+
+MAX_CODE = 0x10FFFF
+
+
+def default_cache_dir():
+    return os.environ.get("LEXGEN_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "lexgen"))
+
+
+# character sets are sorted lists of disjoint inclusive (lo, hi) ranges
+
+def _normalize(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            if hi > merged[-1][1]:
+                merged[-1] = (merged[-1][0], hi)
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _negate(ranges):
+    result = []
+    following = 0
+    for lo, hi in ranges:
+        if lo > following:
+            result.append((following, lo - 1))
+        following = hi + 1
+    if following <= MAX_CODE:
+        result.append((following, MAX_CODE))
+    return result
+
+
+_CATEGORIES = {}
+
+
+def _category(letter):
+    # \d, \w and \s exactly as the re module reads them in str patterns.
+    # All three come from one string of every code point, a local that is
+    # freed once their ranges are cached; decoding it from UTF-32 keeps the
+    # peak to a few copies of 4.4 MB instead of a list of a million chars
+    if not _CATEGORIES:
+        codes = column_bytes(array("I", range(MAX_CODE + 1)))
+        everything = codes.decode("utf-32-le", "surrogatepass")
+        del codes
+        for name in "dws":
+            _CATEGORIES[name] = [(match.start(), match.end() - 1)
+                                 for match in re.finditer(rf"\{name}+", everything)]
+    return _CATEGORIES[letter]
+
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v", "a": "\a", "0": "\0"}
+
+
+class _Parser:
+    # the subset of re syntax token rules use: literals, escapes, '.',
+    # [classes], groups, '|', and the greedy quantifiers * + ? {m,n}.
+    # Nodes are tuples: ("set", ranges), ("cat", nodes), ("alt", nodes),
+    # ("repeat", node, low, high) with high None for no bound.
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.position = 0
+
+    def error(self, message):
+        return ValueError(f"{message} at position {self.position} in {self.pattern!r}")
+
+    def peek(self):
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def next(self):
+        ch = self.peek()
+        if ch is None:
+            raise self.error("unexpected end of pattern")
+        self.position += 1
+        return ch
+
+    def parse(self):
+        node = self.parseAlternation()
+        if self.position < len(self.pattern):
+            raise self.error("unbalanced ')'")
+        return node
+
+    def parseAlternation(self):
+        branches = [self.parseSequence()]
+        while self.peek() == "|":
+            self.position += 1
+            branches.append(self.parseSequence())
+        return branches[0] if len(branches) == 1 else ("alt", branches)
+
+    def parseSequence(self):
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            items.append(self.parseRepeat())
+        return items[0] if len(items) == 1 else ("cat", items)
+
+    def parseRepeat(self):
+        node = self.parseAtom()
+        while True:
+            ch = self.peek()
+            if ch == "*":
+                bounds = (0, None)
+            elif ch == "+":
+                bounds = (1, None)
+            elif ch == "?":
+                bounds = (0, 1)
+            elif ch == "{" and re.match(r"\{\d*(,\d*)?\}", self.pattern[self.position:]):
+                end = self.pattern.index("}", self.position)
+                low, _, high = self.pattern[self.position + 1:end].partition(",")
+                low = int(low or 0)
+                if "," not in self.pattern[self.position:end]:
+                    high = low
+                else:
+                    high = int(high) if high else None
+                if high is not None and high < low:
+                    raise self.error("bad repeat bounds")
+                self.position = end
+                bounds = (low, high)
+            else:
+                return node
+            self.position += 1
+            if self.peek() in ("?", "+"):
+                raise self.error("lazy and possessive quantifiers are not supported")
+            node = ("repeat", node) + bounds
+
+    def parseAtom(self):
+        ch = self.next()
+        if ch == "(":
+            if self.peek() == "?":
+                if self.pattern.startswith("?:", self.position):
+                    self.position += 2
+                elif self.pattern.startswith("?P<", self.position):
+                    self.position = self.pattern.index(">", self.position) + 1
+                else:
+                    raise self.error("lookarounds and inline flags are not supported")
+            node = self.parseAlternation()
+            if self.peek() != ")":
+                raise self.error("missing ')'")
+            self.position += 1
+            return node
+        if ch == "[":
+            return ("set", self.parseClass())
+        if ch == ".":
+            return ("set", _negate([(10, 10)]))
+        if ch == "\\":
+            return ("set", self.parseEscape())
+        if ch in "^$":
+            raise self.error("anchors are not supported")
+        if ch in "*+?)":
+            raise self.error(f"nothing to repeat or close with {ch!r}")
+        return ("set", [(ord(ch), ord(ch))])
+
+    def parseEscape(self):
+        ch = self.next()
+        if ch in "dws":
+            return _category(ch)
+        if ch in "DWS":
+            return _negate(_category(ch.lower()))
+        if ch in _ESCAPES:
+            code = ord(_ESCAPES[ch])
+        elif ch in "xuU":
+            width = {"x": 2, "u": 4, "U": 8}[ch]
+            digits = self.pattern[self.position:self.position + width]
+            if len(digits) != width or not all(d in "0123456789abcdefABCDEF" for d in digits):
+                raise self.error(f"bad \\{ch} escape")
+            self.position += width
+            code = int(digits, 16)
+        elif ch.isalnum():
+            raise self.error(f"unsupported escape \\{ch}")
+        else:
+            code = ord(ch)
+        return [(code, code)]
+
+    def parseClass(self):
+        negated = self.peek() == "^"
+        if negated:
+            self.position += 1
+        ranges = []
+        first = True
+        while True:
+            ch = self.next()
+            if ch == "]" and not first:
+                break
+            first = False
+            if ch == "\\":
+                part = self.parseEscape()
+                if len(part) != 1 or part[0][0] != part[0][1]:
+                    ranges.extend(part)
+                    continue
+                lo = part[0][0]
+            else:
+                lo = ord(ch)
+            if self.peek() == "-" and self.pattern[self.position + 1:self.position + 2] not in ("]", ""):
+                self.position += 1
+                ch = self.next()
+                hi = self.parseEscape()[0][0] if ch == "\\" else ord(ch)
+                if hi < lo:
+                    raise self.error("bad character range")
+                ranges.append((lo, hi))
+            else:
+                ranges.append((lo, lo))
+        ranges = _normalize(ranges)
+        return _negate(ranges) if negated else ranges
+
+
+def _collectSets(node, sets):
+    if node[0] == "set":
+        sets.setdefault(tuple(node[1]), len(sets))
+    elif node[0] in ("cat", "alt"):
+        for child in node[1]:
+            _collectSets(child, sets)
+    else:
+        _collectSets(node[1], sets)
+
+
+def _partition(sets):
+    # splits the code space into classes of characters that every set
+    # either wholly contains or wholly excludes; returns the class of each
+    # set's members, and (bounds, classes) with classes[i] covering the
+    # code points from bounds[i] up to bounds[i + 1]
+    points = {0}
+    for ranges in sets:
+        for lo, hi in ranges:
+            points.add(lo)
+            if hi < MAX_CODE:
+                points.add(hi + 1)
+    points = sorted(points)
+    starts = [[lo for lo, _ in ranges] for ranges in sets]
+    signatures = {(): 0}
+    bounds = []
+    intervalClasses = []
+    members = [set() for _ in sets]
+    for point in points:
+        signature = tuple(index for index, ranges in enumerate(sets)
+                          if ranges and bisect_right(starts[index], point)
+                          and point <= ranges[bisect_right(starts[index], point) - 1][1])
+        cls = signatures.setdefault(signature, len(signatures))
+        for index in signature:
+            members[index].add(cls)
+        if intervalClasses and intervalClasses[-1] == cls:
+            continue
+        bounds.append(point)
+        intervalClasses.append(cls)
+    return [frozenset(classes) for classes in members], bounds, intervalClasses, len(signatures)
+
+
+class _NFA:
+    def __init__(self):
+        self.epsilon = []
+        self.edges = []
+        self.accept = {}
+
+    def state(self):
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.edges) - 1
+
+    def build(self, node, setClasses, setIndex):
+        # returns (entry, exit) of a fragment for node with fresh states
+        kind = node[0]
+        if kind == "set":
+            entry, exit = self.state(), self.state()
+            self.edges[entry].append((setClasses[setIndex[tuple(node[1])]], exit))
+            return entry, exit
+        if kind == "cat":
+            entry = exit = self.state()
+            for child in node[1]:
+                childEntry, childExit = self.build(child, setClasses, setIndex)
+                self.epsilon[exit].append(childEntry)
+                exit = childExit
+            return entry, exit
+        if kind == "alt":
+            entry, exit = self.state(), self.state()
+            for child in node[1]:
+                childEntry, childExit = self.build(child, setClasses, setIndex)
+                self.epsilon[entry].append(childEntry)
+                self.epsilon[childExit].append(exit)
+            return entry, exit
+        _, child, low, high = node
+        entry = exit = self.state()
+        for _ in range(low):
+            childEntry, childExit = self.build(child, setClasses, setIndex)
+            self.epsilon[exit].append(childEntry)
+            exit = childExit
+        if high is None:
+            childEntry, childExit = self.build(child, setClasses, setIndex)
+            self.epsilon[exit].append(childEntry)
+            self.epsilon[childExit].append(childEntry)
+            end = self.state()
+            self.epsilon[exit].append(end)
+            self.epsilon[childExit].append(end)
+            return entry, end
+        end = self.state()
+        for _ in range(high - low):
+            self.epsilon[exit].append(end)
+            childEntry, childExit = self.build(child, setClasses, setIndex)
+            self.epsilon[exit].append(childEntry)
+            exit = childExit
+        self.epsilon[exit].append(end)
+        return entry, end
+
+    def closure(self, states):
+        result = set(states)
+        stack = list(states)
+        while stack:
+            for target in self.epsilon[stack.pop()]:
+                if target not in result:
+                    result.add(target)
+                    stack.append(target)
+        return frozenset(result)
+
+
+def _determinize(nfa, start, classCount):
+    # subset construction; -1 is the dead state
+    startSet = nfa.closure([start])
+    ids = {startSet: 0}
+    sets = [startSet]
+    delta = []
+    accept = []
+    for states in sets:
+        row = [-1] * classCount
+        moves = {}
+        for state in states:
+            for classes, target in nfa.edges[state]:
+                for cls in classes:
+                    moves.setdefault(cls, set()).add(target)
+        for cls, targets in moves.items():
+            closed = nfa.closure(targets)
+            target = ids.get(closed)
+            if target is None:
+                target = ids[closed] = len(sets)
+                sets.append(closed)
+            row[cls] = target
+        delta.append(row)
+        rules = [nfa.accept[state] for state in states if state in nfa.accept]
+        accept.append(min(rules) if rules else -1)
+    return delta, accept
+
+
+def _minimize(delta, accept):
+    # Moore: split blocks by accepted rule, then by the blocks each class
+    # leads to, until nothing splits; the start state stays 0
+    # blocks are numbered from 0, so they never collide with dead -1
+    block = [rule + 1 for rule in accept]
+    count = len(set(block))
+    while True:
+        signatures = {}
+        refined = [signatures.setdefault((block[state], tuple(-1 if target < 0 else block[target]
+                                                                for target in row)),
+                                         len(signatures))
+                   for state, row in enumerate(delta)]
+        if len(signatures) == count:
+            break
+        block, count = refined, len(signatures)
+    # renumber so the start state's block is 0, in order of first use
+    order = {}
+    for state in range(len(delta)):
+        order.setdefault(refined[state], len(order))
+    states = len(order)
+    newDelta = [None] * states
+    newAccept = [None] * states
+    for state, row in enumerate(delta):
+        target = order[refined[state]]
+        if newDelta[target] is None:
+            newDelta[target] = [-1 if to < 0 else order[refined[to]] for to in row]
+            newAccept[target] = accept[state]
+    return newDelta, newAccept
+
+
+def build_tables(specification):
+    # (kinds, classCount, bounds, intervalClasses, delta, accept, selfLoops)
+    # as plain lists, ready for marshal or repr
+    specification = list(specification)
+    trees = [_Parser(pattern).parse() for _, pattern in specification]
+    setIndex = {}
+    for tree in trees:
+        _collectSets(tree, setIndex)
+    sets = sorted(setIndex, key=setIndex.get)
+    setClasses, bounds, intervalClasses, classCount = _partition([list(ranges) for ranges in sets])
+    if classCount > 256:
+        raise ValueError(f"{classCount} character classes; at most 256 fit the class bytes")
+
+    nfa = _NFA()
+    start = nfa.state()
+    for rule, tree in enumerate(trees):
+        entry, exit = nfa.build(tree, setClasses, setIndex)
+        nfa.epsilon[start].append(entry)
+        nfa.accept[exit] = rule
+    delta, accept = _determinize(nfa, start, classCount)
+    if accept[0] >= 0:
+        raise ValueError(f"rule {specification[accept[0]][0]!r} matches the empty string")
+    delta, accept = _minimize(delta, accept)
+    selfLoops = [bytes(cls for cls, target in enumerate(row) if target == state)
+                 for state, row in enumerate(delta)]
+    flat = [target for row in delta for target in row]
+    return ([name for name, _ in specification], classCount, bounds, intervalClasses,
+            flat, accept, selfLoops)
+
+
+class _ClassMap(dict):
+    # code point -> class for str.translate, filled on first sight
+    def __init__(self, bounds, intervalClasses):
+        self.bounds = bounds
+        self.intervalClasses = intervalClasses
+
+    def __missing__(self, code):
+        cls = self[code] = self.intervalClasses[bisect_right(self.bounds, code) - 1]
+        return cls
+
+
+class GeneratedLexer:
+    # Runs tables from build_tables with the interface of
+    # scanner_with_regex.Lexer: scan() returns (kind, start, end) with
+    # kind codes indexing self.kinds. Characters no rule matches become
+    # one-character mismatch tokens, or are skipped without a mismatch rule.
+    def __init__(self, tables, keywords=keywords, skip=('NEWLINE', 'SKIP'), mismatch='MISMATCH'):
+        kinds, classCount, bounds, intervalClasses, delta, accept, selfLoops = tables
+        self.tables = tables
+        if not isinstance(keywords, KeywordSet):
+            keywords = KeywordSet(keywords or ())
+        self.keywords = keywords
+        self.kinds = list(kinds)
+        self.codes = {name: code for code, name in enumerate(self.kinds)}
+        self.skip = frozenset(self.codes[name] for name in skip if name in self.codes)
+        self.mismatch = self.codes.get(mismatch)
+        self.classCount = classCount
+        self.delta = delta
+        self.accept = accept
+        self.classMap = _ClassMap(bounds, intervalClasses)
+        self.asciiClasses = bytes(self.classMap[code] for code in range(128)) + bytes(128)
+        # within a run of its self-loop classes a state stays put, so the
+        # whole run is skipped by one regex match
+        self.runs = [re.compile(b"[" + b"".join(re.escape(bytes([cls])) for cls in loop) + b"]+").match
+                     if loop else None for loop in selfLoops]
+
+    def classify(self, code):
+        if code.isascii():
+            return code.encode("ascii").translate(self.asciiClasses)
+        return code.translate(self.classMap).encode("latin-1")
+
+    def scan(self, code):
+        classes = self.classify(code)
+        delta = self.delta
+        accept = self.accept
+        runs = self.runs
+        width = self.classCount
+        skip = self.skip
+        mismatch = self.mismatch
+        tokens = []
+        append = tokens.append
+        n = len(classes)
+        pos = 0
+        while pos < n:
+            # maximal munch: walk until the DFA dies, then cut the token at
+            # the last accepting state passed
+            state = 0
+            i = pos
+            kind = -1
+            end = pos
+            while True:
+                run = runs[state]
+                if run is not None:
+                    match = run(classes, i)
+                    if match is not None:
+                        i = match.end()
+                if accept[state] >= 0:
+                    kind = accept[state]
+                    end = i
+                if i == n:
+                    break
+                state = delta[state * width + classes[i]]
+                if state < 0:
+                    break
+                i += 1
+            if kind < 0:
+                if mismatch is not None:
+                    append((mismatch, pos, pos + 1))
+                pos += 1
+                continue
+            if kind not in skip:
+                append((kind, pos, end))
+            pos = end
+        return tokens
+
+    def tokenize(self, code):
+        # columnar result with the lexemes as attributes
+        buffer = TokenBuffer(self.kinds, 'I' if len(code) < 1 << 32 else 'Q')
+        keyword = self.codes.get('KEYWORD')
+        canonical = self.keywords.get
+        for kind, start, end in self.scan(code):
+            lexeme = code[start:end]
+            if kind == keyword:
+                lexeme = canonical(lexeme)
+            buffer.append(kind, start, end, lexeme)
+        return buffer
+
+
+def with_keywords(specification, keywords, identifier='ID'):
+    # the keyword rule goes right before the identifier rule; maximal munch
+    # then lets identifiers that merely start with a keyword win
+    specification = list(specification)
+    names = [name for name, _ in specification]
+    if keywords and identifier in names:
+        words = '|'.join(re.escape(word) for word in sorted(keywords, key=len, reverse=True))
+        specification.insert(names.index(identifier), ('KEYWORD', words))
+    return specification
+
+
+def spec_hash(specification):
+    # \d, \w and \s follow the interpreter's Unicode database, so its
+    # version is part of the key
+    payload = json.dumps([unicodedata.unidata_version, [list(rule) for rule in specification]],
+                         ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+def save_tables(path, tables, key):
+    with atomic_writer(path, ".lexgen-") as f:
+        f.write(_HEADER.pack(CACHE_MAGIC, TABLE_VERSION, marshal.version, key))
+        f.write(marshal.dumps(tables))
+
+
+def load_tables(path, key=None):
+    # returns None for a missing, stale or unreadable table file; key None
+    # accepts tables for any spec
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, marshal_version, stored_key = _HEADER.unpack_from(data)
+    if (magic, version, marshal_version) != (CACHE_MAGIC, TABLE_VERSION, marshal.version):
+        return None
+    if key is not None and stored_key != key:
+        return None
+    try:
+        return marshal.loads(data[_HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def cached_tables(specification, cache_dir=None):
+    key = spec_hash(specification)
+    path = os.path.join(cache_dir or default_cache_dir(), key.hex() + ".lxt")
+    tables = load_tables(path, key)
+    if tables is None:
+        tables = build_tables(specification)
+        try:
+            save_tables(path, tables, key)
+        except OSError:
+            # an unwritable cache only costs the next start a rebuild
+            pass
+    return tables
+
+
+def generate_lexer(specification=token_specification, keywords=keywords, identifier='ID',
+                   skip=('NEWLINE', 'SKIP'), mismatch='MISMATCH', cache_dir=None):
+    # the generated counterpart of scanner_with_regex.Lexer
+    tables = cached_tables(with_keywords(specification, keywords, identifier), cache_dir)
+    return GeneratedLexer(tables, keywords, skip, mismatch)
+
+
+def to_source(tables, keywords=keywords, skip=('NEWLINE', 'SKIP'), mismatch='MISMATCH'):
+    # a module that rebuilds the lexer from literal tables, with no
+    # generator run or cache lookup at import
+    kinds, classCount, bounds, intervalClasses, delta, accept, selfLoops = tables
+    return (f"# generated by lexgen.py; regenerate instead of editing\n"
+            f"from lexgen import GeneratedLexer\n\n"
+            f"KINDS = {kinds!r}\n"
+            f"CLASS_COUNT = {classCount!r}\n"
+            f"BOUNDS = {bounds!r}\n"
+            f"INTERVAL_CLASSES = {intervalClasses!r}\n"
+            f"DELTA = {delta!r}\n"
+            f"ACCEPT = {accept!r}\n"
+            f"SELF_LOOPS = {selfLoops!r}\n\n"
+            f"lexer = GeneratedLexer((KINDS, CLASS_COUNT, BOUNDS, INTERVAL_CLASSES, DELTA, ACCEPT,"
+            f" SELF_LOOPS),\n"
+            f"                       {sorted(keywords)!r}, {tuple(skip)!r}, {mismatch!r})\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a table-driven lexer from a token spec")
+    parser.add_argument("spec", nargs="?", default=None,
+                        help="JSON list of [name, regex] pairs (default: token_specification)")
+    parser.add_argument("--source", default=None, help="write a Python module here")
+    parser.add_argument("--table", default=None, help="write a serialized table file here")
+    parser.add_argument("--no-keywords", action="store_true", help="do not add the KEYWORD rule")
+    args = parser.parse_args()
+
+    if args.spec is None:
+        specification = token_specification
+    else:
+        with open(args.spec, encoding="utf-8") as f:
+            specification = [tuple(rule) for rule in json.load(f)]
+    if not args.no_keywords:
+        specification = with_keywords(specification, keywords)
+    tables = build_tables(specification)
+    kinds, classCount, _, _, delta, accept, _ = tables
+    print(f"{len(kinds)} rules, {classCount} character classes, {len(accept)} states",
+          file=sys.stderr)
+    if args.table is not None:
+        save_tables(args.table, tables, spec_hash(specification))
+    if args.source is not None:
+        with open(args.source, "w", encoding="utf-8") as f:
+            f.write(to_source(tables, () if args.no_keywords else keywords))
+    elif args.table is None:
+        sys.stdout.write(to_source(tables, () if args.no_keywords else keywords))
+
+
+if __name__ == "__main__":
+    main()
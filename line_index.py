@@ -0,0 +1,37 @@
+import re
+from array import array
+from bisect import bisect_right
+
+
+_NEWLINE = re.compile("\n")
+_NEWLINE_BYTES = re.compile(b"\n")
+
+
+class LineIndex:
+    # offsets where each line starts, built in one pass over the input;
+    # offsets are characters for str input and bytes for bytes-like input
+    # such as MmapFileReader.content, and columns count the same units
+    def __init__(self, text):
+        newline = _NEWLINE if isinstance(text, str) else _NEWLINE_BYTES
+        self.length = len(text)
+        self.starts = array("I" if self.length < 1 << 32 else "Q", [0])
+        self.starts.extend(match.end() for match in newline.finditer(text))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def lineOf(self, offset):
+        # 0-based line holding offset
+        return bisect_right(self.starts, offset) - 1
+
+    def lineCol(self, offset):
+        # 1-based (line, column), as editors and compilers print them
+        line = bisect_right(self.starts, offset) - 1
+        return line + 1, offset - self.starts[line] + 1
+
+    def lineSpan(self, line):
+        # (start, end) of 1-based line, end excluding its newline
+        start = self.starts[line - 1]
+        if line < len(self.starts):
+            return start, self.starts[line] - 1
+        return start, self.length
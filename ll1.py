@@ -0,0 +1,120 @@
+from array import array
+
+from firstFollow import GrammarAnalysis
+
+
+class ParseError(Exception):
+    def __init__(self, message, token=None):
+        super().__init__(message)
+        self.token = token
+
+
+def token_terminal(token):
+    # maps a scanner Token to a grammar terminal; None skips the token
+    if token.name == "comment":
+        return None
+    if token.name in ("id", "num"):
+        return token.name
+    return token.attribute
+
+
+def analyzer_tokens(analyzer):
+    token = analyzer.getNextToken()
+    while token is not None:
+        yield token
+        token = analyzer.getNextToken()
+
+
+class LL1Table:
+    def __init__(self, grammar, start_symbol=None, analysis=None):
+        # analysis may be a finished GrammarAnalysis, e.g. from grammar_cache
+        self.start_symbol = start_symbol if start_symbol is not None else next(iter(grammar))
+        if analysis is None:
+            analysis = GrammarAnalysis(grammar)
+            analysis.solve_follow(self.start_symbol)
+        self.analysis = analysis
+        self.nonterminals = analysis.nonterminals
+        self.terminals = analysis.terminals
+        self.terminal_index = analysis.terminal_index
+        self.productions = analysis.productions
+        self.production_text = [production for nt in grammar for production in grammar[nt]]
+
+        n = len(self.nonterminals)
+        width = len(self.terminals)
+        self.width = width
+        # table[nt * width + terminal] -> production index, -1 for an error entry
+        self.table = array("i", [-1]) * (n * width)
+        # right-hand sides reversed, ready to be pushed on the parse stack
+        self.pushes = [tuple(reversed(symbols)) for _, symbols in self.productions]
+        self.conflicts = []
+
+        table = self.table
+        for p, (lhs, symbols) in enumerate(self.productions):
+            mask, nullable = analysis.first_of_symbols(symbols)
+            if nullable:
+                mask |= analysis.follow_bits[lhs]
+            bits = bin(mask)[:1:-1]
+            for t, bit in enumerate(bits):
+                if bit != "1":
+                    continue
+                cell = lhs * width + t
+                if table[cell] < 0:
+                    table[cell] = p
+                elif table[cell] != p:
+                    self.conflicts.append((self.nonterminals[lhs], self.terminals[t], table[cell], p))
+
+    def isLL1(self):
+        return not self.conflicts
+
+    def describeConflicts(self):
+        return [f"conflict at [{nt}, {terminal}]: "
+                f"{nt} -> {self.production_text[kept]} | {nt} -> {self.production_text[other]}"
+                for nt, terminal, kept, other in self.conflicts]
+
+    def entry(self, nonterminal, terminal):
+        p = self.table[self.nonterminals.index(nonterminal) * self.width
+                       + self.terminal_index[terminal]]
+        return None if p < 0 else p
+
+    def parse(self, tokens, terminal_of=token_terminal):
+        # non-recursive predictive parse; returns the production indexes of
+        # the leftmost derivation
+        n = len(self.nonterminals)
+        width = self.width
+        table = self.table
+        pushes = self.pushes
+        terminal_index = self.terminal_index
+        end = terminal_index["$"]
+
+        def next_terminal():
+            for token in tokens:
+                terminal = terminal_of(token)
+                if terminal is None:
+                    continue
+                t = terminal_index.get(terminal)
+                if t is None or t == end:
+                    raise ParseError(f"unexpected token {token}", token)
+                return t, token
+            return end, None
+
+        tokens = iter(tokens)
+        lookahead, token = next_terminal()
+        stack = [n + end, self.nonterminals.index(self.start_symbol)]
+        derivation = []
+        while stack:
+            top = stack.pop()
+            if top < n:
+                p = table[top * width + lookahead]
+                if p < 0:
+                    found = "end of input" if token is None else str(token)
+                    raise ParseError(f"unexpected {found} while parsing {self.nonterminals[top]}", token)
+                derivation.append(p)
+                stack.extend(pushes[p])
+            elif top - n == lookahead:
+                if lookahead == end:
+                    return derivation
+                lookahead, token = next_terminal()
+            else:
+                found = "end of input" if token is None else str(token)
+                raise ParseError(f"expected '{self.terminals[top - n]}' but found {found}", token)
+        return derivation
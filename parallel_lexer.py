@@ -0,0 +1,158 @@
+import os
+from array import array
+from functools import partial
+
+from scanner import SymbolTable
+from scanner_with_dfa import TOKEN_KINDS, DFALexicalAnalyzer
+from token_buffer import TokenBuffer
+
+
+class FileResult:
+    def __init__(self, path, tokens, errors, addresses, droppedErrors=0):
+        self.path = path
+        self.tokens = tokens
+        self.errors = errors
+        # local symbol table address -> address in the merged table
+        self.addresses = addresses
+        # errors past the analyzer's maxErrors, counted but not kept
+        self.droppedErrors = droppedErrors
+
+
+def read_source(path):
+    # newline="" keeps offsets identical to the bytes on disk for ASCII input
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        return f.read()
+
+
+def lex_text(text, recover=False, maxErrors=None):
+    analyzer = DFALexicalAnalyzer(text, recover=recover, maxErrors=maxErrors)
+    tokens = analyzer.tokenBuffer()
+    table = analyzer.symbolTable
+    return tokens, analyzer.errors, table.lexemes, table.types, analyzer.droppedErrors
+
+
+def lex_file(path, recover=False, maxErrors=None):
+    return (path,) + lex_text(read_source(path), recover, maxErrors)
+
+
+def merge_symbol_table(merged, lexemes, types):
+    # rows are merged in input order, so the result matches lexing every
+    # file in sequence with one shared table, however the work was scheduled
+    addresses = array("I")
+    for lexeme, type in zip(lexemes, types):
+        address = merged.index.get(lexeme)
+        if address is None:
+            address = merged.append(lexeme, type)
+        addresses.append(address)
+    return addresses
+
+
+def lex_files(paths, jobs=None, recover=False, maxErrors=None):
+    paths = list(paths)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    lex = partial(lex_file, recover=recover, maxErrors=maxErrors)
+
+    if jobs <= 1 or len(paths) <= 1:
+        outputs = map(lex, paths)
+        return _merge(outputs)
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    # imported here: it pulls in multiprocessing, which callers that lex
+    # in one process never need
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return _merge(pool.map(lex, paths, chunksize=chunksize))
+
+
+def _merge(outputs):
+    symbolTable = SymbolTable()
+    results = []
+    for path, tokens, errors, lexemes, types, dropped in outputs:
+        addresses = merge_symbol_table(symbolTable, lexemes, types)
+        results.append(FileResult(path, tokens, errors, addresses, dropped))
+    return results, symbolTable
+
+
+def split_segments(text, segments):
+    # cut right after a newline: no token spans a line break and every
+    # state of the scanner stops at one, so segments lex independently
+    bounds = [0]
+    step = max(1, len(text) // max(1, segments))
+    while len(bounds) < segments:
+        cut = text.find("\n", bounds[-1] + step)
+        if cut < 0 or cut + 1 >= len(text):
+            break
+        bounds.append(cut + 1)
+    bounds.append(len(text))
+    return bounds
+
+
+def lex_text_parallel(text, jobs=None, segments=None, recover=False):
+    # recovery mode never joins invalid runs across a segment boundary;
+    # boundaries sit after newlines, which end every run anyway
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    bounds = split_segments(text, segments or jobs)
+    pieces = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    lex = partial(lex_text, recover=recover)
+
+    if jobs <= 1 or len(pieces) <= 1:
+        outputs = map(lex, pieces)
+        return _stitch(bounds, outputs, len(text))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return _stitch(bounds, pool.map(lex, pieces), len(text))
+
+
+def _stitch(bounds, outputs, length):
+    tokens = TokenBuffer(TOKEN_KINDS, "I" if length < 1 << 32 else "Q")
+    errors = []
+    symbolTable = SymbolTable()
+    for offset, (part, partErrors, lexemes, types, _) in zip(bounds, outputs):
+        tokens.extend(part, offset)
+        errors.extend(error.shifted(offset) for error in partErrors)
+        merge_symbol_table(symbolTable, lexemes, types)
+    return tokens, errors, symbolTable
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Lex many files in parallel")
+    parser.add_argument("paths", nargs="+", help="source files")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--split", action="store_true",
+                        help="also split each file at line boundaries across the workers")
+    parser.add_argument("--recover", action="store_true",
+                        help="report each run of invalid characters as one error")
+    parser.add_argument("--max-errors", type=int, default=None,
+                        help="errors kept per file; the rest are only counted")
+    args = parser.parse_args()
+
+    if args.split:
+        symbolTable = SymbolTable()
+        results = []
+        for path in args.paths:
+            tokens, errors, table = lex_text_parallel(read_source(path), args.jobs,
+                                                      recover=args.recover)
+            addresses = merge_symbol_table(symbolTable, table.lexemes, table.types)
+            dropped = 0
+            if args.max_errors is not None and len(errors) > args.max_errors:
+                dropped = len(errors) - args.max_errors
+                del errors[args.max_errors:]
+            results.append(FileResult(path, tokens, errors, addresses, dropped))
+    else:
+        results, symbolTable = lex_files(args.paths, args.jobs, args.recover, args.max_errors)
+    for result in results:
+        print(f"{result.path}: {len(result.tokens)} tokens, "
+              f"{len(result.errors) + result.droppedErrors} errors")
+        for error in result.errors:
+            print(f"  {error}")
+        if result.droppedErrors:
+            print(f"  ... {result.droppedErrors} more")
+    print(f"\nSymbol Table: {len(symbolTable.lexemes)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,28 @@
+import mmap
+import os
+import re
+import sys
+
+from char_classes import (BLANK_RUN, C_DIGIT, C_DOT, C_E, C_LETTER, C_NL, C_OTHER, CHAR_CLASSES,
+                          DIGIT_RUN, INVALID_RUN, WORD_RUN, classify)
+from line_index import LineIndex
+
+
+# every token name a scanner produces; TokenBuffer kind codes index this
+TOKEN_KINDS = (
+    "comment", "opParenthes", "clParenthes", "opBracket", "clBracket",
+    "opCurlyBracket", "clCurlyBracket", "semicolon", "comma", "colon",
+    "relOp", "arithOp", "assignOp", "num", "id", "keyword", "unknown",
+)
+TOKEN_CODES = {name: code for code, name in enumerate(TOKEN_KINDS)}
+
+
 class Token:
-    def __init__(self, name=None, attribute=None):
+    def __init__(self, name=None, attribute=None, position=None):
         self.name = name
         self.attribute = attribute
+        # offset of the first character in the input (bytes for MmapFileReader)
+        self.position = position
     
     def setName(self, name):
         self.name = name
@@ -14,60 +35,164 @@ class Token:
             return f"{self.name}({self.attribute})"
         return f"{self.name}"
 
+class LexicalError:
+    # kept unformatted; str() gives the message the scanners always printed.
+    # In recovery mode character holds a whole run of invalid characters
+    __slots__ = ("character", "position")
+
+    # longest run quoted in full by str()
+    PREVIEW = 40
+
+    def __init__(self, character, position=None):
+        self.character = character
+        self.position = position
+
+    def __str__(self):
+        if len(self.character) == 1:
+            return f"Lexical error: Unknown character '{self.character}'"
+        if len(self.character) > self.PREVIEW:
+            return (f"Lexical error: {len(self.character)} unknown characters "
+                    f"'{self.character[:self.PREVIEW]}...'")
+        return f"Lexical error: Unknown characters '{self.character}'"
+
+    def __repr__(self):
+        return f"LexicalError({self.character!r}, {self.position!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, LexicalError):
+            return NotImplemented
+        return self.character == other.character and self.position == other.position
+
+    def __hash__(self):
+        return hash((self.character, self.position))
+
+    def shifted(self, offset):
+        return LexicalError(self.character, self.position + offset)
+
+class SymbolRow:
+    __slots__ = ("lexeme", "type", "address")
+
+    def __init__(self, lexeme, type, address):
+        self.lexeme = lexeme
+        self.type = type
+        self.address = address
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+class SymbolRows:
+    # read-only view over the parallel arrays of a SymbolTable;
+    # rows are materialized on access so row["lexeme"] keeps working
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table.lexemes)
+
+    def __getitem__(self, address):
+        if isinstance(address, slice):
+            return [self[i] for i in range(*address.indices(len(self)))]
+        if address < 0:
+            address += len(self)
+        return SymbolRow(self.table.lexemes[address], self.table.types[address], address)
+
+    def __iter__(self):
+        table = self.table
+        for address, lexeme in enumerate(table.lexemes):
+            yield SymbolRow(lexeme, table.types[address], address)
+
+KEYWORD_WORDS = ("if", "else", "while", "return", "int", "float", "bool", "for")
+
+class KeywordSet:
+    # compiled once per language: every keyword maps to one interned
+    # canonical string, so keyword tokens share it instead of holding
+    # their own lexeme, and a lookup is one hash probe however many
+    # keywords the dialect has
+    def __init__(self, words=KEYWORD_WORDS):
+        self.canonical = {}
+        for word in words:
+            word = sys.intern(word)
+            self.canonical[word] = word
+        self.words = frozenset(self.canonical)
+        self.get = self.canonical.get
+
+    def __contains__(self, lexeme):
+        return lexeme in self.canonical
+
+    def __iter__(self):
+        return iter(self.canonical)
+
+    def __len__(self):
+        return len(self.canonical)
+
+DEFAULT_KEYWORDS = KeywordSet()
+
 class SymbolTable:
-    def __init__(self):
-        self.rows = []
+    def __init__(self, keywords=None):
+        # keywords is a KeywordSet or any iterable of words
+        if keywords is None:
+            keywords = DEFAULT_KEYWORDS
+        elif not isinstance(keywords, KeywordSet):
+            keywords = KeywordSet(keywords)
+        self.keywords = keywords
+        self.keyword = keywords.get
+        # lexeme -> address, with the row data kept in parallel arrays
+        self.index = {}
+        self.lexemes = []
+        self.types = []
         # self.addKeywordsToSymbolTable()
+
+    @property
+    def rows(self):
+        return SymbolRows(self)
+
+    def append(self, lexeme, type):
+        # one interned string per lexeme, shared by the table, the id
+        # tokens that take it from lexemes[address], and other tables
+        lexeme = sys.intern(lexeme)
+        address = len(self.lexemes)
+        self.index.setdefault(lexeme, address)
+        self.lexemes.append(lexeme)
+        self.types.append(type)
+        return address
     
     def addKeywordsToSymbolTable(self):
-        keywords = ["if", "while", "for", "return", "int", "float", "bool"]
-        for keyword in keywords:
-            self.rows.append({
-                "lexeme": keyword,
-                "type": "keyword",
-                "address": len(self.rows)
-            })
+        for keyword in self.keywords:
+            self.addKeyword(keyword)
     
     def addKeyword(self, keyword):
-        if not any(row["lexeme"] == keyword for row in self.rows):
-            self.rows.append({
-                "lexeme": keyword,
-                "type": "keyword", 
-                "address": len(self.rows)
-            })
+        if keyword not in self.index:
+            self.append(keyword, "keyword")
     
     def installID(self, lexeme):
-        for idx, row in enumerate(self.rows):
-            if row["lexeme"] == lexeme:
-                return idx
-            
-        self.rows.append({
-            "lexeme": lexeme,
-            "type": "id",
-            "address": len(self.rows)
-        })
-        return len(self.rows) - 1
+        address = self.index.get(lexeme)
+        if address is not None:
+            return address
+        return self.append(lexeme, "id")
     
     def getTokenName(self, lexeme):
-        for row in self.rows:
-            if row["lexeme"] == lexeme:
-                return row['type']
-        return None
+        address = self.index.get(lexeme)
+        if address is None:
+            return None
+        return self.types[address]
     
     def isKeyword(self, lexeme):
-        keywords = ["if", "else", "while", "return", "int", "float", "bool", "for"]
-        return lexeme in keywords
+        return lexeme in self.keywords.canonical
 
 class InputFileReader:
     def __init__(self, user_code):
         self.content = user_code
+        # classes[i] is the character class of content[i]
+        self.classes = classify(user_code)
         self.position = 0
     
     def getNextChar(self):
-        if self.position < len(self.content):
-            char = self.content[self.position]
-            self.position += 1
-            return char
+        # reading past the end still advances the position, so a
+        # recognizer that retracts after seeing EOF lands where it started
+        position = self.position
+        self.position = position + 1
+        if position < len(self.content):
+            return self.content[position]
         return None
     
     def retract(self, backwardSteps=1):
@@ -76,32 +201,207 @@ class InputFileReader:
     def isEOF(self):
         return self.position >= len(self.content)
     
+    def lexeme(self, start, end=None):
+        return self.content[start:self.position if end is None else end]
+    
+    def peek(self, position):
+        if position < len(self.content):
+            return self.content[position]
+        return None
+    
+    # end of the run of blanks, letters and digits, or digits at position
+    def blankEnd(self, position):
+        return BLANK_RUN.match(self.classes, position).end()
+    
+    def wordEnd(self, position):
+        return WORD_RUN.match(self.classes, position).end()
+    
+    def digitEnd(self, position):
+        return DIGIT_RUN.match(self.classes, position).end()
+    
+    def invalidEnd(self, position):
+        return INVALID_RUN.match(self.classes, position).end()
+    
+    def lineEnd(self, position):
+        # offset of the next "\n", or the end of the input
+        end = self.content.find("\n", position)
+        return len(self.content) if end < 0 else end
+    
     def close(self):
         pass
 
+_ASCII_CHARS = [chr(code) for code in range(128)]
+
+# ASCII parts of the runs; non-ASCII letters and digits are decoded one by one
+_ASCII_BLANKS = re.compile(rb"[ \t\r\n]*")
+_ASCII_WORD = re.compile(rb"[A-Za-z0-9]*")
+_ASCII_DIGITS = re.compile(rb"[0-9]*")
+_WORD_CLASSES = frozenset((C_LETTER, C_E, C_DIGIT))
+_DIGIT_CLASSES = frozenset((C_DIGIT,))
+_INVALID_CLASSES = frozenset((C_OTHER, C_DOT))
+_ASCII_INVALID = re.compile(b"[" + b"".join(re.escape(bytes([code])) for code in range(128)
+                                             if CHAR_CLASSES[chr(code)] in _INVALID_CLASSES) + b"]*")
+
+def _utf8Length(lead):
+    if lead >= 0xF0:
+        return 4
+    if lead >= 0xE0:
+        return 3
+    if lead >= 0xC0:
+        return 2
+    return 1
+
+class MmapFileReader:
+    # same contract as InputFileReader, but positions are byte offsets into
+    # a read-only mapping of the file and nothing is decoded up front
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.content = memoryview(self.map)
+        else:
+            self.map = None
+            self.content = memoryview(b"")
+        # byte offsets do not line up with characters, so no class pre-pass
+        self.classes = None
+        self.position = 0
+    
+    def getNextChar(self):
+        position = self.position
+        if position >= self.size:
+            self.position = position + 1
+            return None
+        byte = self.content[position]
+        if byte < 0x80:
+            self.position = position + 1
+            return _ASCII_CHARS[byte]
+        char, self.position = self._decode(position)
+        return char
+    
+    def _decode(self, position):
+        # -> (character, offset after it) for the non-ASCII lead byte at position
+        content = self.content
+        end = position + 1
+        limit = min(position + _utf8Length(content[position]), self.size)
+        while end < limit and content[end] & 0xC0 == 0x80:
+            end += 1
+        char = str(content[position:end], "utf-8", "replace")
+        if len(char) != 1:
+            # not even a valid prefix, e.g. C0 80: like the "replace"
+            # handler, the lead byte alone becomes U+FFFD
+            return "\ufffd", position + 1
+        return char, end
+    
+    def _charStart(self, end):
+        # start of the character getNextChar read ending at end; a lead byte
+        # owns only the continuation bytes _decode gave it, so a stray
+        # continuation byte is undone as the one character it was read as
+        content = self.content
+        start = end - 1
+        while start > 0 and end - start < 4 and content[start] & 0xC0 == 0x80:
+            start -= 1
+        if start < end - 1 and self._decode(start)[1] != end:
+            return end - 1
+        return start
+
+    def retract(self, backwardSteps=1):
+        # step back whole characters, as getNextChar read them
+        position = self.position
+        content = self.content
+        for _ in range(backwardSteps):
+            if position <= 0:
+                break
+            if position > self.size or content[position - 1] < 0x80:
+                position -= 1
+            else:
+                position = self._charStart(position)
+        self.position = position
+    
+    def isEOF(self):
+        return self.position >= self.size
+    
+    def lexeme(self, start, end=None):
+        end = self.position if end is None else end
+        return str(self.content[start:end], "utf-8", "replace")
+    
+    def peek(self, position):
+        if position >= self.size:
+            return None
+        byte = self.content[position]
+        if byte < 0x80:
+            return _ASCII_CHARS[byte]
+        return self._decode(position)[0]
+    
+    def _runEnd(self, run, position, classes):
+        content = self.content
+        while True:
+            position = run.match(content, position).end()
+            if position >= self.size or content[position] < 0x80:
+                return position
+            char, end = self._decode(position)
+            if CHAR_CLASSES[char] not in classes:
+                return position
+            position = end
+    
+    def blankEnd(self, position):
+        return _ASCII_BLANKS.match(self.content, position).end()
+    
+    def wordEnd(self, position):
+        return self._runEnd(_ASCII_WORD, position, _WORD_CLASSES)
+    
+    def digitEnd(self, position):
+        return self._runEnd(_ASCII_DIGITS, position, _DIGIT_CLASSES)
+    
+    def invalidEnd(self, position):
+        return self._runEnd(_ASCII_INVALID, position, _INVALID_CLASSES)
+    
+    def lineEnd(self, position):
+        end = self.map.find(b"\n", position) if self.map is not None else -1
+        return self.size if end < 0 else end
+    
+    def close(self):
+        self.content.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
 class LexicalAnalyzer:
-    def __init__(self, user_code):
-        self.inputFile = InputFileReader(user_code)
-        self.symbolTable = SymbolTable()
+    def __init__(self, user_code, keywords=None, recover=False, maxErrors=None):
+        # user_code is either the program text or an already open reader
+        if isinstance(user_code, str):
+            self.inputFile = InputFileReader(user_code)
+        else:
+            self.inputFile = user_code
+        self.symbolTable = SymbolTable(keywords)
         self.errors = []
+        # recovery mode reports a run of invalid characters as one unknown
+        # token and one error; past maxErrors errors are only counted
+        self.recover = recover
+        self.maxErrors = maxErrors
+        self.droppedErrors = 0
+        # built on the first location() call
+        self.lines = None
+    
+    @classmethod
+    def fromFile(cls, path):
+        return cls(MmapFileReader(path))
+    
+    def close(self):
+        self.inputFile.close()
     
     def isDigit(self, ch):
-        return ch is not None and ch.isdigit()
+        return ch is not None and CHAR_CLASSES[ch] == C_DIGIT
     
     def isLetter(self, ch):
-        return ch is not None and ch.isalpha()
+        return ch is not None and C_LETTER <= CHAR_CLASSES[ch] <= C_E
     
     def isDelimiter(self, ch):
-        return ch is not None and ch in [' ', '\t', '\n', '\r']
+        return ch is not None and CHAR_CLASSES[ch] <= C_NL
     
     def eatWS(self):
-        while True:
-            ch = self.inputFile.getNextChar()
-            if ch is None:
-                break
-            if not self.isDelimiter(ch):
-                self.inputFile.retract(1)
-                break
+        if not self.inputFile.isEOF():
+            self.inputFile.position = self.inputFile.blankEnd(self.inputFile.position)
             
     def opParenthesToken(self):
         ch = self.inputFile.getNextChar()
@@ -167,23 +467,14 @@ class LexicalAnalyzer:
         return None
 
     def commentToken(self):
-        ch = self.inputFile.getNextChar()
-        if ch == '/':
-            ch2 = self.inputFile.getNextChar()
-            if ch2 == '/':
-                comment_text = "//"
-                while True:
-                    ch = self.inputFile.getNextChar()
-                    if ch is None or ch == '\n':
-                        break
-                    comment_text += ch
-                return Token("comment", comment_text.strip())
-            else:
-                self.inputFile.retract(2)
-                return None
-        else:
-            self.inputFile.retract(1)
+        start = self.inputFile.position
+        if self.inputFile.peek(start) != '/' or self.inputFile.peek(start + 1) != '/':
             return None
+        end = self.inputFile.lineEnd(start + 2)
+        # the newline is consumed with the comment; at the end of the input
+        # this lands one past it, as getNextChar would
+        self.inputFile.position = end + 1
+        return Token("comment", self.inputFile.lexeme(start, end).strip())
         
     def arithOpToken(self):
         state = 0
@@ -311,156 +602,92 @@ class LexicalAnalyzer:
                 return token
     
     def numberToken(self):
-        state = 1
-        value = ""
-        token = Token("num")
-        
-        while True:
+        # digits [ "." digits ] [ "e" [ "+" | "-" ] digits ], each part found
+        # with one span. A "." or "e" not followed by what it needs gives the
+        # digits up and leaves the input at that character; the end of the
+        # input accepts whatever was read so far.
+        reader = self.inputFile
+        start = reader.position
+        end = start
+        if reader.peek(end) in ("+", "-"):
+            end += 1
+            if reader.peek(end) is None:
+                return self.acceptNumber(start, end)
+        digits = reader.digitEnd(end)
+        if digits == end:
+            return None
+        end = digits
 
-            if self.inputFile.isEOF():
-                if value: 
-                    token.setAttribute(value)
-                    return token
-                else:
-                    return None
-            
-            if state == 1:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                    state = 3
-                elif (ch == "+") or (ch == "-"):
-                    value += ch
-                    state = 2
-                else:
-                    self.inputFile.retract(1)
-                    return None
-            
-            elif state ==2:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                    state = 3
-                else:
-                    self.inputFile.retract(2)
-                    return None
+        ch = reader.peek(end)
+        if ch == ".":
+            if reader.peek(end + 1) is None:
+                return self.acceptNumber(start, end + 1)
+            digits = reader.digitEnd(end + 1)
+            if digits == end + 1:
+                reader.position = end
+                return None
+            end = digits
+            ch = reader.peek(end)
 
-            elif state == 3:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                elif ch == ".":
-                    value += ch
-                    state = 4
-                elif ch == "e":
-                    value += ch
-                    state = 6
-                else:
-                    self.inputFile.retract(1)
-                    token.setAttribute(value)
-                    state = 10
-                    return token
-                
-            elif state == 4:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                    state = 5
-                else:
-                    self.inputFile.retract(2)
-                    return None
-                
-            elif state == 5:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                elif ch == "e":
-                    value += ch
-                    state = 6
-                else:
-                    self.inputFile.retract(1)
-                    token.setAttribute(value)
-                    state = 11
-                    return token
-                
-            elif state == 6:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                    state = 8
-                elif (ch == "+") or (ch == "-"):
-                    value += ch
-                    state = 7
-                else:
-                    self.inputFile.retract(2)
-                    return None
-                
-            elif state == 7:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                    state = 8
-                else:
-                    self.inputFile.retract(3)
-                    return None
-                
-            elif state == 8:
-                ch = self.inputFile.getNextChar()
-                if self.isDigit(ch):
-                    value += ch
-                else:
-                    self.inputFile.retract(1)
-                    token.setAttribute(value)
-                    state = 9
-                    return token
+        if ch == "e":
+            exponent = end + 1
+            ch = reader.peek(exponent)
+            if ch is None:
+                return self.acceptNumber(start, exponent)
+            if ch in ("+", "-"):
+                exponent += 1
+                if reader.peek(exponent) is None:
+                    return self.acceptNumber(start, exponent)
+            digits = reader.digitEnd(exponent)
+            if digits == exponent:
+                reader.position = end
+                return None
+            end = digits
+        return self.acceptNumber(start, end)
+
+    def acceptNumber(self, start, end):
+        self.inputFile.position = end
+        return Token("num", self.inputFile.lexeme(start, end))
     
     def idAndKeywordToken(self):
-        state = 0
-        lexeme = ""
-        token = None
-        
-        while True:
-            if state == 0:
-                ch = self.inputFile.getNextChar()
-                if self.isLetter(ch):
-                    lexeme += ch
-                    state = 1
-                else:
-                    self.inputFile.retract(1)
-                    return None
-            
-            elif state == 1:
-                ch = self.inputFile.getNextChar()
-                if self.isLetter(ch) or self.isDigit(ch):
-                    lexeme += ch
-                else:
-                    self.inputFile.retract(1)
-                    state = 2
-            
-            elif state == 2:
-                if self.symbolTable.isKeyword(lexeme):
-                    token = Token("keyword", lexeme)
-                    self.symbolTable.addKeyword(lexeme)
-                    return token
-
-                # token_name = self.symbolTable.getTokenName(lexeme)
-                # if token_name:
-                #     if token_name == "keyword":
-                #         token = Token("keyword", lexeme)
-                #     else:
-                #         token = Token("id", lexeme)
-                #     return token
-                else:
-                    token = Token("id", lexeme)
-                    self.symbolTable.installID(lexeme)
-                    return token
+        start = self.inputFile.position
+        if not self.isLetter(self.inputFile.peek(start)):
+            return None
+        end = self.inputFile.wordEnd(start)
+        self.inputFile.position = end
+        return self.idOrKeyword(self.inputFile.lexeme(start, end))
+
+    def idOrKeyword(self, lexeme):
+        keyword = self.symbolTable.keyword(lexeme)
+        if keyword is not None:
+            token = Token("keyword", keyword)
+            self.symbolTable.addKeyword(keyword)
+            return token
+
+        # token_name = self.symbolTable.getTokenName(lexeme)
+        # if token_name:
+        #     if token_name == "keyword":
+        #         token = Token("keyword", lexeme)
+        #     else:
+        #         token = Token("id", lexeme)
+        #     return token
+        else:
+            address = self.symbolTable.installID(lexeme)
+            return Token("id", self.symbolTable.lexemes[address])
     
     def getNextToken(self):
+        token = self.recognizeToken()
+        if token is not None:
+            token.position = self.tokenStart
+        return token
+
+    def recognizeToken(self):
         self.eatWS()
 
         if self.inputFile.isEOF():
             return None
 
+        self.tokenStart = self.inputFile.position
         token = self.commentToken()
         if token: return token
 
@@ -503,24 +730,80 @@ class LexicalAnalyzer:
         token = self.numberToken()
         if token: return token
         
+        # numberToken may give up after consuming digits, as on "1.x"
+        self.tokenStart = self.inputFile.position
         token = self.idAndKeywordToken()
         if token: return token
 
         ch = self.inputFile.getNextChar()
         if ch is not None:
+            if self.recover:
+                self.inputFile.position = self.inputFile.invalidEnd(self.inputFile.position)
+                ch = self.inputFile.lexeme(self.tokenStart)
             error_token = Token("unknown", ch)
-            self.errors.append(f"Lexical error: Unknown character '{ch}'")
+            self.reportError(LexicalError(ch, self.tokenStart))
             return error_token
         
         return None
     
+    def tokenBuffer(self):
+        # lexes the rest of the input into a TokenBuffer over TOKEN_KINDS;
+        # subclasses fill the buffer directly instead of making Tokens
+        from token_buffer import TokenBuffer
+        reader = self.inputFile
+        length = len(reader.content)
+        buffer = TokenBuffer(TOKEN_KINDS, "I" if length < 1 << 32 else "Q")
+        token = self.getNextToken()
+        while token is not None:
+            # a comment ending the input leaves the reader one past its end
+            buffer.append(TOKEN_CODES[token.name], token.position, min(reader.position, length),
+                          token.attribute)
+            token = self.getNextToken()
+        return buffer
+
+    def reportError(self, error):
+        if self.maxErrors is None or len(self.errors) < self.maxErrors:
+            self.errors.append(error)
+        else:
+            self.droppedErrors += 1
+    
     def getLexicalErrors(self):
         return self.errors
     
     def hasErrors(self):
-        return len(self.errors) > 0
+        return len(self.errors) > 0 or self.droppedErrors > 0
+    
+    def errorCount(self):
+        return len(self.errors) + self.droppedErrors
+    
+    def lineIndex(self):
+        if self.lines is None:
+            self.lines = LineIndex(self.inputFile.content)
+        return self.lines
+    
+    def location(self, position):
+        # 1-based (line, column) of an offset, e.g. a token's position
+        return self.lineIndex().lineCol(position)
+    
+    def diagnostics(self):
+        lines = self.lineIndex()
+        return [f"{line}:{column}: {error}"
+                for error in self.errors
+                for line, column in (lines.lineCol(error.position),)]
+
+def symbol_table_lines(symbolTable):
+    lines = ["┌───────┬──────────────┬────────────┬─────────┐",
+             "│ Index │   Lexeme     │ Token Type │ Address │",
+             "├───────┼──────────────┼────────────┼─────────┤"]
+    for idx, row in enumerate(symbolTable.rows):
+        lines.append(f"│ {idx:5} │ {row['lexeme']:12} │ {row['type']:10} │ {row['address']:7} │")
+    lines.append("└───────┴──────────────┴────────────┴─────────┘")
+    return lines
 
 def get_user_input():
+    # piped input is read whole; blank lines only end interactive input
+    if not sys.stdin.isatty():
+        return sys.stdin.read()
     print("Please enter your code (enter an empty line to finish):")
     print("=" * 50)
     
@@ -569,12 +852,8 @@ def main():
             print(f"\nNo lexical errors found!")
 
         print("\nSymbol Table:")
-        print("┌───────┬──────────────┬────────────┬─────────┐")
-        print("│ Index │   Lexeme     │ Token Type │ Address │")
-        print("├───────┼──────────────┼────────────┼─────────┤")
-        for idx, row in enumerate(lexicalAnalyzer.symbolTable.rows):
-            print(f"│ {idx:5} │ {row['lexeme']:12} │ {row['type']:10} │ {row['address']:7} │")
-        print("└───────┴──────────────┴────────────┴─────────┘")
+        for line in symbol_table_lines(lexicalAnalyzer.symbolTable):
+            print(line)
         
     except Exception as e:
         print(f"error: {e}")
@@ -0,0 +1,200 @@
+import time
+from collections import Counter
+
+
+# the recognizers LexicalAnalyzer.recognizeToken tries, in order
+RECOGNIZERS = (
+    "commentToken", "opParenthesToken", "clpParenthesToken", "opBracketToken",
+    "clBracketToken", "opCurlyBracketToken", "clCurlyBracketToken", "semicolonToken",
+    "commaToken", "colonToken", "relOpToken", "arithOpToken", "assignOpToken",
+    "numberToken", "idAndKeywordToken",
+)
+
+
+class ScannerStats:
+    # counters filled by instrument(); one object may collect several
+    # analyzers, and merge() adds up objects from other processes
+    def __init__(self):
+        self.attempts = Counter()   # recognizer -> calls
+        self.hits = Counter()       # recognizer -> tokens returned
+        self.consumed = Counter()   # recognizer -> characters in its tokens
+        self.dropped = 0            # characters failed recognizers kept, as on "1.x"
+        self.charsRead = 0          # getNextChar calls
+        self.charsRetracted = 0     # characters given back by retract
+        self.tokens = Counter()     # token name -> count
+        self.errors = 0             # reported, kept or not
+        self.keywordLookups = 0
+        self.symbolLookups = 0      # installID and addKeyword calls
+        self.symbolInserts = 0      # rows added to a symbol table
+        self.phases = Counter()     # phase -> seconds
+        self.analyzers = 0
+
+    def merge(self, other):
+        for name in ("attempts", "hits", "consumed", "tokens", "phases"):
+            getattr(self, name).update(getattr(other, name))
+        for name in ("dropped", "charsRead", "charsRetracted", "errors", "keywordLookups",
+                     "symbolLookups", "symbolInserts", "analyzers"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def asDict(self):
+        return {name: dict(value) if isinstance(value, Counter) else value
+                for name, value in vars(self).items()}
+
+    def prometheus(self, prefix="lexer"):
+        # text exposition format, one HELP/TYPE block per metric
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{_labels(labels)} {value}")
+
+        metric("recognizer_attempts_total", "counter", "Recognizer calls in getNextToken.",
+               [({"recognizer": name}, self.attempts[name]) for name in sorted(self.attempts)])
+        metric("recognizer_hits_total", "counter", "Tokens returned by each recognizer.",
+               [({"recognizer": name}, self.hits[name]) for name in sorted(self.hits)])
+        metric("recognizer_chars_total", "counter", "Characters in the tokens of each recognizer.",
+               [({"recognizer": name}, self.consumed[name]) for name in sorted(self.consumed)])
+        metric("chars_read_total", "counter", "Characters read one at a time with getNextChar.",
+               [({}, self.charsRead)])
+        metric("chars_retracted_total", "counter", "Characters given back with retract.",
+               [({}, self.charsRetracted)])
+        metric("chars_dropped_total", "counter", "Characters consumed by recognizers that failed.",
+               [({}, self.dropped)])
+        metric("tokens_total", "counter", "Tokens produced, by kind.",
+               [({"kind": name}, self.tokens[name]) for name in sorted(self.tokens)])
+        metric("errors_total", "counter", "Lexical errors reported.", [({}, self.errors)])
+        metric("keyword_lookups_total", "counter", "Keyword set lookups.",
+               [({}, self.keywordLookups)])
+        metric("symbol_lookups_total", "counter", "Symbol table lookups.",
+               [({}, self.symbolLookups)])
+        metric("symbol_inserts_total", "counter", "Symbol table rows added.",
+               [({}, self.symbolInserts)])
+        metric("phase_seconds_total", "counter", "Wall time spent in each phase.",
+               [({"phase": name}, f"{self.phases[name]:.6f}") for name in sorted(self.phases)])
+        metric("analyzers_total", "counter", "Analyzers instrumented.", [({}, self.analyzers)])
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _recognizer(name, method, reader, stats):
+    def counted():
+        start = reader.position
+        token = method()
+        stats.attempts[name] += 1
+        if token is not None:
+            stats.hits[name] += 1
+            stats.consumed[name] += reader.position - start
+        elif reader.position != start:
+            stats.dropped += reader.position - start
+        return token
+    return counted
+
+
+def instrument(analyzer, stats=None):
+    # Puts counting wrappers on this analyzer, its reader and its symbol
+    # table as instance attributes. The classes are left alone, so code
+    # that never calls instrument() runs exactly as before at no cost.
+    if stats is None:
+        stats = ScannerStats()
+    stats.analyzers += 1
+    analyzer.stats = stats
+    reader = analyzer.inputFile
+    for name in RECOGNIZERS:
+        setattr(analyzer, name, _recognizer(name, getattr(analyzer, name), reader, stats))
+
+    getNextChar = reader.getNextChar
+    retract = reader.retract
+
+    def countedGetNextChar():
+        stats.charsRead += 1
+        return getNextChar()
+
+    def countedRetract(backwardSteps=1):
+        before = reader.position
+        retract(backwardSteps)
+        stats.charsRetracted += before - reader.position
+
+    reader.getNextChar = countedGetNextChar
+    reader.retract = countedRetract
+
+    table = analyzer.symbolTable
+    keyword = table.keyword
+    installID = table.installID
+    addKeyword = table.addKeyword
+    append = table.append
+
+    def countedKeyword(lexeme):
+        stats.keywordLookups += 1
+        return keyword(lexeme)
+
+    def countedInstallID(lexeme):
+        stats.symbolLookups += 1
+        return installID(lexeme)
+
+    def countedAddKeyword(word):
+        stats.symbolLookups += 1
+        return addKeyword(word)
+
+    def countedAppend(lexeme, type):
+        stats.symbolInserts += 1
+        return append(lexeme, type)
+
+    table.keyword = countedKeyword
+    table.installID = countedInstallID
+    table.addKeyword = countedAddKeyword
+    table.append = countedAppend
+
+    getNextToken = analyzer.getNextToken
+    tokenBuffer = analyzer.tokenBuffer
+    reportError = analyzer.reportError
+    lineIndex = analyzer.lineIndex
+
+    def countedGetNextToken():
+        start = time.perf_counter()
+        token = getNextToken()
+        stats.phases["scan"] += time.perf_counter() - start
+        if token is not None:
+            stats.tokens[token.name] += 1
+        return token
+
+    def countedTokenBuffer():
+        # the generic tokenBuffer calls getNextToken; time it once, here
+        analyzer.getNextToken = getNextToken
+        start = time.perf_counter()
+        try:
+            buffer = tokenBuffer()
+        finally:
+            stats.phases["scan"] += time.perf_counter() - start
+            analyzer.getNextToken = countedGetNextToken
+        kinds = Counter(buffer.kinds)
+        for kind, count in kinds.items():
+            stats.tokens[buffer.kindNames[kind]] += count
+        return buffer
+
+    def countedReportError(error):
+        stats.errors += 1
+        return reportError(error)
+
+    def countedLineIndex():
+        if analyzer.lines is not None:
+            return analyzer.lines
+        start = time.perf_counter()
+        lines = lineIndex()
+        stats.phases["lineIndex"] += time.perf_counter() - start
+        return lines
+
+    analyzer.getNextToken = countedGetNextToken
+    analyzer.tokenBuffer = countedTokenBuffer
+    analyzer.reportError = countedReportError
+    analyzer.lineIndex = countedLineIndex
+    return stats
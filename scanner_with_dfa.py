@@ -0,0 +1,290 @@
+import codecs
+import os
+
+from char_classes import (BLANK_RUN, C_BANG, C_COLON, C_COMMA, C_DIGIT, C_DOT, C_E, C_EQ,
+                          C_GT, C_LBRACKET, C_LCURLY, C_LETTER, C_LPAREN, C_LT, C_MINUS,
+                          C_PLUS, C_RBRACKET, C_RCURLY, C_RPAREN, C_SEMICOLON, C_SLASH,
+                          C_STAR, C_WS, C_NL, CLASS_COUNT, INVALID_RUN, WORD_RUN, classify)
+from scanner import TOKEN_KINDS, LexicalAnalyzer, LexicalError, Token
+from token_buffer import TokenBuffer
+
+
+(K_COMMENT, K_OPPARENTHES, K_CLPARENTHES, K_OPBRACKET, K_CLBRACKET,
+ K_OPCURLY, K_CLCURLY, K_SEMICOLON, K_COMMA, K_COLON, K_RELOP, K_ARITHOP,
+ K_ASSIGNOP, K_NUM, K_ID, K_KEYWORD, K_UNKNOWN) = range(len(TOKEN_KINDS))
+
+# states
+(S_START, S_SLASH, S_COMMENT, S_COMMENT_END, S_OPPARENTHES, S_CLPARENTHES,
+ S_OPBRACKET, S_CLBRACKET, S_OPCURLY, S_CLCURLY, S_SEMICOLON, S_COMMA, S_COLON,
+ S_GT, S_LT, S_EQ, S_BANG, S_RELOP, S_ARITHOP, S_ID, S_INT, S_DOT, S_FRAC,
+ S_EXP, S_EXP_SIGN, S_EXP_DIGITS, S_UNKNOWN) = range(27)
+STATE_COUNT = 27
+
+# negative actions reproduce how numberToken gives up half way: the digits
+# read so far are dropped and the chain resumes at the '.' or the 'e'
+A_DROP_DOT = -1
+A_RESTART_ID_AT_E = -2
+A_RESTART_ID_AT_SIGN = -3
+
+NEED_MORE = -1
+
+CHUNK_SIZE = 1 << 16
+
+
+def _buildTables():
+    delta = [[-1] * CLASS_COUNT for _ in range(STATE_COUNT)]
+
+    def on(state, classes, target):
+        for cls in classes:
+            delta[state][cls] = target
+
+    start = delta[S_START]
+    for cls in range(CLASS_COUNT):
+        start[cls] = S_UNKNOWN
+    start[C_WS] = start[C_NL] = -1
+    on(S_START, [C_SLASH], S_SLASH)
+    on(S_START, [C_LPAREN], S_OPPARENTHES)
+    on(S_START, [C_RPAREN], S_CLPARENTHES)
+    on(S_START, [C_LBRACKET], S_OPBRACKET)
+    on(S_START, [C_RBRACKET], S_CLBRACKET)
+    on(S_START, [C_LCURLY], S_OPCURLY)
+    on(S_START, [C_RCURLY], S_CLCURLY)
+    on(S_START, [C_SEMICOLON], S_SEMICOLON)
+    on(S_START, [C_COMMA], S_COMMA)
+    on(S_START, [C_COLON], S_COLON)
+    on(S_START, [C_GT], S_GT)
+    on(S_START, [C_LT], S_LT)
+    on(S_START, [C_EQ], S_EQ)
+    on(S_START, [C_BANG], S_BANG)
+    on(S_START, [C_PLUS, C_MINUS, C_STAR], S_ARITHOP)
+    on(S_START, [C_LETTER, C_E], S_ID)
+    on(S_START, [C_DIGIT], S_INT)
+
+    on(S_SLASH, [C_SLASH], S_COMMENT)
+    on(S_COMMENT, [cls for cls in range(CLASS_COUNT) if cls != C_NL], S_COMMENT)
+    on(S_COMMENT, [C_NL], S_COMMENT_END)
+    on(S_GT, [C_EQ], S_RELOP)
+    on(S_LT, [C_EQ], S_RELOP)
+    on(S_EQ, [C_EQ], S_RELOP)
+    on(S_BANG, [C_EQ], S_RELOP)
+    on(S_ID, [C_LETTER, C_E, C_DIGIT], S_ID)
+    on(S_INT, [C_DIGIT], S_INT)
+    on(S_INT, [C_DOT], S_DOT)
+    on(S_INT, [C_E], S_EXP)
+    on(S_DOT, [C_DIGIT], S_FRAC)
+    on(S_FRAC, [C_DIGIT], S_FRAC)
+    on(S_FRAC, [C_E], S_EXP)
+    on(S_EXP, [C_DIGIT], S_EXP_DIGITS)
+    on(S_EXP, [C_PLUS, C_MINUS], S_EXP_SIGN)
+    on(S_EXP_SIGN, [C_DIGIT], S_EXP_DIGITS)
+    on(S_EXP_DIGITS, [C_DIGIT], S_EXP_DIGITS)
+
+    stop = [K_UNKNOWN] * STATE_COUNT
+    stop[S_SLASH] = K_ARITHOP
+    stop[S_COMMENT] = stop[S_COMMENT_END] = K_COMMENT
+    stop[S_OPPARENTHES] = K_OPPARENTHES
+    stop[S_CLPARENTHES] = K_CLPARENTHES
+    stop[S_OPBRACKET] = K_OPBRACKET
+    stop[S_CLBRACKET] = K_CLBRACKET
+    stop[S_OPCURLY] = K_OPCURLY
+    stop[S_CLCURLY] = K_CLCURLY
+    stop[S_SEMICOLON] = K_SEMICOLON
+    stop[S_COMMA] = K_COMMA
+    stop[S_COLON] = K_COLON
+    stop[S_GT] = stop[S_LT] = stop[S_RELOP] = K_RELOP
+    stop[S_EQ] = K_ASSIGNOP
+    stop[S_ARITHOP] = K_ARITHOP
+    stop[S_ID] = K_ID
+    stop[S_INT] = stop[S_FRAC] = stop[S_EXP_DIGITS] = K_NUM
+    stop[S_DOT] = A_DROP_DOT
+    stop[S_EXP] = A_RESTART_ID_AT_E
+    stop[S_EXP_SIGN] = A_RESTART_ID_AT_SIGN
+
+    # numberToken accepts whatever it has read when the input runs out
+    atEOF = list(stop)
+    atEOF[S_DOT] = atEOF[S_EXP] = atEOF[S_EXP_SIGN] = K_NUM
+    return delta, stop, atEOF
+
+
+DELTA, STOP_ACTIONS, EOF_ACTIONS = _buildTables()
+
+
+def scanToken(text, pos, final=True, classes=None, coalesce=False):
+    # returns (kind, start, end) for the next token at or after pos, None
+    # at the end of the input, or NEED_MORE when final is False and the
+    # token could still continue past the end of text. classes is
+    # classify(text); callers scanning repeatedly should pass it in.
+    # coalesce extends an unknown token over the invalid characters after it
+    if classes is None:
+        classes = classify(text)
+    n = len(classes)
+    pos = BLANK_RUN.match(classes, pos).end()
+    if pos >= n:
+        return None if final else NEED_MORE
+    if C_LETTER <= classes[pos] <= C_E:
+        end = WORD_RUN.match(classes, pos + 1).end()
+        if end < n or final:
+            return K_ID, pos, end
+        return NEED_MORE
+
+    delta = DELTA
+    start = pos
+    state = S_START
+    while True:
+        if pos < n:
+            target = delta[state][classes[pos]]
+            if target >= 0:
+                state = target
+                pos += 1
+                continue
+            action = STOP_ACTIONS[state]
+        elif final:
+            action = EOF_ACTIONS[state]
+        else:
+            return NEED_MORE
+
+        if action >= 0:
+            if action == K_UNKNOWN and coalesce:
+                return _invalidRun(classes, start, pos, final)
+            return action, start, pos
+        if action == A_DROP_DOT:
+            if coalesce:
+                return _invalidRun(classes, pos - 1, pos, final)
+            return K_UNKNOWN, pos - 1, pos
+        start = pos - 1 if action == A_RESTART_ID_AT_E else pos - 2
+        state = S_ID
+        pos = start + 1
+
+
+def _invalidRun(classes, start, end, final):
+    end = INVALID_RUN.match(classes, end).end()
+    if end == len(classes) and not final:
+        return NEED_MORE
+    return K_UNKNOWN, start, end
+
+
+class DFALexicalAnalyzer(LexicalAnalyzer):
+    # scans the class bytes of the program text, so it needs the text in
+    # memory rather than a MmapFileReader
+    def __init__(self, user_code, keywords=None, recover=False, maxErrors=None):
+        super().__init__(user_code, keywords, recover, maxErrors)
+        if self.inputFile.classes is None:
+            raise TypeError(f"{type(self).__name__} needs the program text, not a mapped file")
+
+    @classmethod
+    def fromFile(cls, path):
+        # decoded as the mapped reader does, invalid UTF-8 included
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            return cls(f.read())
+
+    def resolve(self, kind, lexeme, position=None):
+        # applies the symbol table and error side effects of a scanned
+        # token and returns its final (kind, attribute)
+        if kind == K_ID:
+            keyword = self.symbolTable.keyword(lexeme)
+            if keyword is not None:
+                self.symbolTable.addKeyword(keyword)
+                return K_KEYWORD, keyword
+            table = self.symbolTable
+            return K_ID, table.lexemes[table.installID(lexeme)]
+        if kind == K_COMMENT:
+            return K_COMMENT, lexeme.strip()
+        if kind == K_UNKNOWN:
+            self.reportError(LexicalError(lexeme, position))
+        return kind, lexeme
+
+    def makeToken(self, kind, lexeme, position=None):
+        kind, attribute = self.resolve(kind, lexeme, position)
+        return Token(TOKEN_KINDS[kind], attribute, position)
+
+    def getNextToken(self):
+        reader = self.inputFile
+        text = reader.content
+        result = scanToken(text, reader.position, True, reader.classes, self.recover)
+        if result is None:
+            reader.position = len(text)
+            return None
+        kind, start, end = result
+        reader.position = end
+        return self.makeToken(kind, text[start:end], start)
+
+    def tokenBuffer(self):
+        # lexes the rest of the input straight into a TokenBuffer
+        reader = self.inputFile
+        text = reader.content
+        buffer = TokenBuffer(TOKEN_KINDS, "I" if len(text) < 1 << 32 else "Q")
+        append = buffer.append
+        resolve = self.resolve
+        classes = reader.classes
+        coalesce = self.recover
+        pos = reader.position
+        while True:
+            result = scanToken(text, pos, True, classes, coalesce)
+            if result is None:
+                break
+            kind, start, pos = result
+            kind, attribute = resolve(kind, text[start:pos], start)
+            append(kind, start, pos, attribute)
+        reader.position = len(text)
+        return buffer
+
+
+def readChunks(source, chunkSize=CHUNK_SIZE):
+    # source is a path or a text/binary stream; bytes are decoded as UTF-8
+    # incrementally so multi-byte characters may straddle chunks, with
+    # invalid bytes replaced by U+FFFD as in every other entry point
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as stream:
+            yield from readChunks(stream, chunkSize)
+        return
+
+    decoder = None
+    while True:
+        chunk = source.read(chunkSize)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def iter_tokens(source, chunkSize=CHUNK_SIZE, symbolTable=None, errors=None, keywords=None,
+                recover=False, maxErrors=None):
+    analyzer = DFALexicalAnalyzer("", keywords, recover, maxErrors)
+    if symbolTable is not None:
+        analyzer.symbolTable = symbolTable
+    if errors is not None:
+        analyzer.errors = errors
+
+    chunks = readChunks(source, chunkSize)
+    buffer = ""
+    classes = b""
+    base = 0
+    pos = 0
+    final = False
+    while True:
+        result = scanToken(buffer, pos, final, classes, recover)
+        if result == NEED_MORE:
+            # the token may straddle the chunk boundary: keep its prefix
+            # and rescan it once the next chunk has been appended
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+            else:
+                buffer = buffer[pos:] + chunk
+                classes = classes[pos:] + classify(chunk)
+                base += pos
+                pos = 0
+            continue
+        if result is None:
+            return
+        kind, start, end = result
+        pos = end
+        yield analyzer.makeToken(kind, buffer[start:end], base + start)
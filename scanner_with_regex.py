@@ -1,7 +1,15 @@
 import re
+import sys
 
+from char_classes import (C_BANG, C_COLON, C_COMMA, C_DIGIT, C_DOT, C_E, C_EQ, C_GT, C_LBRACKET,
+                          C_LCURLY, C_LETTER, C_LPAREN, C_LT, C_MINUS, C_NL, C_OTHER, C_PLUS,
+                          C_RBRACKET, C_RCURLY, C_RPAREN, C_SEMICOLON, C_SLASH, C_STAR, C_WS)
+from scanner import DEFAULT_KEYWORDS, TOKEN_CODES, TOKEN_KINDS, KeywordSet
+from scanner_with_dfa import DFALexicalAnalyzer
+from token_buffer import TokenBuffer
 
-keywords = {'if', 'while', 'for'}
+
+keywords = DEFAULT_KEYWORDS
 
 
 token_specification = [
@@ -17,50 +25,242 @@ token_specification = [
 ]
 
 
-tok_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification)
+# how lexer() prints each kind; kinds missing here produce no token
+token_formats = {
+    'NUM': 'num',
+    'KEYWORD': 'keyword',
+    'ID': 'id',
+    'RELOP': 'relop',
+    'ASSIGN': 'op',
+    'OP': 'op',
+    'COMMENT': 'comment',
+}
+
+
+class Lexer:
+    # Compiles a token specification once. Keywords get their own
+    # alternative in front of the identifier rule, so telling them apart
+    # needs no lexeme string. Scans return (kind, start, end) with integer
+    # kind codes indexing self.kinds.
+    def __init__(self, specification=token_specification, keywords=keywords,
+                 identifier='ID', skip=('NEWLINE', 'SKIP'), mismatch='MISMATCH', recover=False):
+        if not isinstance(keywords, KeywordSet):
+            keywords = KeywordSet(keywords or ())
+        self.keywords = keywords
+        specification = list(specification)
+        names = [name for name, _ in specification]
+        if keywords and identifier in names:
+            words = '|'.join(re.escape(word) for word in sorted(keywords, key=len, reverse=True))
+            specification.insert(names.index(identifier), ('KEYWORD', rf'(?:{words})(?!\w)'))
+        if recover and mismatch in names:
+            # one mismatch swallows the characters after it until some
+            # other rule could match again
+            others = '|'.join(f'(?:{pattern})' for name, pattern in specification if name != mismatch)
+            specification = [(name, rf'(?:{pattern})(?:(?!{others}).)*' if name == mismatch else pattern)
+                             for name, pattern in specification]
+        self.kinds = [name for name, _ in specification]
+        self.codes = {name: code for code, name in enumerate(self.kinds)}
+        self.pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in specification))
+
+        # lastindex -> kind code; groups nested inside a rule never close
+        # last, so only the named groups need entries
+        self.kind_of_group = [-1] * (self.pattern.groups + 1)
+        for name, group in self.pattern.groupindex.items():
+            self.kind_of_group[group] = self.codes[name]
+        self.skip = frozenset(self.codes[name] for name in skip if name in self.codes)
+        self.mismatch = self.codes.get(mismatch)
+
+    def scan(self, code):
+        kind_of = self.kind_of_group
+        skip = self.skip
+        tokens = []
+        append = tokens.append
+        for mo in self.pattern.finditer(code):
+            kind = kind_of[mo.lastindex]
+            if kind not in skip:
+                append((kind, *mo.span()))
+        return tokens
+
+    def tokenize(self, code):
+        # columnar result with the lexemes as attributes
+        buffer = TokenBuffer(self.kinds, 'I' if len(code) < 1 << 32 else 'Q')
+        keyword = self.codes.get('KEYWORD')
+        canonical = self.keywords.get
+        for kind, start, end in self.scan(code):
+            lexeme = code[start:end]
+            if kind == keyword:
+                lexeme = canonical(lexeme)
+            buffer.append(kind, start, end, lexeme)
+        return buffer
+
+    def format(self, code, kind, start, end):
+        label = token_formats.get(self.kinds[kind])
+        if label is None:
+            return None
+        return f'{label}({code[start:end]})'
+
+
+_shared_lexers = {}
+
+
+def shared_lexer(recover=False):
+    # compiled on first use, so importing this module compiles no regex
+    scanner = _shared_lexers.get(recover)
+    if scanner is None:
+        scanner = _shared_lexers[recover] = Lexer(recover=recover)
+    return scanner
+
+
+def __getattr__(name):
+    # the old module globals, now built when first asked for
+    if name == 'tok_regex':
+        return '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in token_specification)
+    if name == 'default_lexer':
+        return shared_lexer()
+    if name == 'recovering_lexer':
+        return shared_lexer(recover=True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-symbol_table = set()
 
-def lexer(code):
+def lexer(code, recover=False, max_errors=None, symbol_table=None):
+    # recover reports each run of unmatched characters once; past
+    # max_errors reports, the rest are counted into one summary line.
+    # Identifiers are added to symbol_table when one is passed.
+    scanner = shared_lexer(recover)
+    kinds = scanner.kinds
     tokens = []
-    for mo in re.finditer(tok_regex, code):
-        kind = mo.lastgroup
-        value = mo.group()
-        if kind == 'NUM':
-            tokens.append(f'num({value})')
-        elif kind == 'ID':
-            if value in keywords:
-                tokens.append(f'keyword({value})')
-            else:
-                tokens.append(f'id({value})')
-                symbol_table.add(value)
-        elif kind == 'RELOP':
-            tokens.append(f'relop({value})')
-        elif kind == 'ASSIGN':
-            tokens.append(f'op({value})')
-        elif kind == 'OP':
-            tokens.append(f'op({value})')
-        elif kind == 'COMMENT':
-            tokens.append(f'comment({value})')
-        elif kind == 'NEWLINE' or kind == 'SKIP':
+    errors = 0
+    for kind, start, end in scanner.scan(code):
+        if kind == scanner.mismatch:
+            if max_errors is None or errors < max_errors:
+                print(f"lexical error: {code[start:end]}")
+            errors += 1
             continue
-        elif kind == 'MISMATCH':
-            print(f"lexical error: {value}")
+        if symbol_table is not None and kinds[kind] == 'ID':
+            symbol_table.add(code[start:end])
+        tokens.append(scanner.format(code, kind, start, end))
+    if max_errors is not None and errors > max_errors:
+        print(f"lexical error: ... {errors - max_errors} more")
     return tokens
 
 
+def _classes(*classes):
+    return '[' + ''.join(f'\\x{cls:02x}' for cls in classes) + ']'
+
+
+def class_specification(coalesce=False):
+    # Rules over the class text of an input: classify() output read as
+    # latin-1, one character per class code. Matching classes instead of
+    # characters gives exactly the tokens of LexicalAnalyzer, quirks
+    # included. coalesce extends unknown tokens as recovery mode does.
+    digit = _classes(C_DIGIT)
+    word = _classes(C_LETTER, C_E, C_DIGIT)
+    e = _classes(C_E)
+    sign = _classes(C_PLUS, C_MINUS)
+    dot = _classes(C_DOT)
+    slash = _classes(C_SLASH)
+    eq = _classes(C_EQ)
+    number = f'{digit}+(?:{dot}{digit}+)?'
+    tail = f'{_classes(C_OTHER, C_DOT)}*' if coalesce else ''
+    return [
+        ('blank', f'{_classes(C_WS, C_NL)}+'),
+        ('comment', f'{slash}{slash}[^\\x{C_NL:02x}]*{_classes(C_NL)}?'),
+        # numberToken drops the digits it has read when a '.' or an 'e'
+        # does not continue the number; the scan resumes at that character
+        ('dropped', f'{number}(?={e}(?!{sign}?{digit}|{sign}?\\Z))|{digit}+(?={dot}(?!{digit}|\\Z))'),
+        ('num', f'{digit}+{dot}\\Z|{number}(?:{e}(?:{sign}?{digit}+|{sign}?\\Z))?'),
+        ('opParenthes', _classes(C_LPAREN)),
+        ('clParenthes', _classes(C_RPAREN)),
+        ('opBracket', _classes(C_LBRACKET)),
+        ('clBracket', _classes(C_RBRACKET)),
+        ('opCurlyBracket', _classes(C_LCURLY)),
+        ('clCurlyBracket', _classes(C_RCURLY)),
+        ('semicolon', _classes(C_SEMICOLON)),
+        ('comma', _classes(C_COMMA)),
+        ('colon', _classes(C_COLON)),
+        ('relOp', f'{_classes(C_LT, C_GT, C_EQ, C_BANG)}{eq}|{_classes(C_LT, C_GT)}'),
+        ('assignOp', eq),
+        ('arithOp', _classes(C_PLUS, C_MINUS, C_STAR, C_SLASH)),
+        ('id', f'{_classes(C_LETTER, C_E)}{word}*'),
+        ('unknown', f'{_classes(C_OTHER, C_DOT, C_BANG)}{tail}'),
+    ]
+
+
+_class_lexers = {}
+
+
+def class_lexer(coalesce=False):
+    # compiled on first use, like shared_lexer
+    scanner = _class_lexers.get(coalesce)
+    if scanner is None:
+        scanner = _class_lexers[coalesce] = Lexer(class_specification(coalesce), keywords=(),
+                                                  identifier='id', skip=('blank', 'dropped'),
+                                                  mismatch='unknown')
+    return scanner
+
+
+class RegexLexicalAnalyzer(DFALexicalAnalyzer):
+    # the tokens of LexicalAnalyzer found by one compiled regex over the
+    # class text
+    def __init__(self, user_code, keywords=None, recover=False, maxErrors=None):
+        super().__init__(user_code, keywords, recover, maxErrors)
+        self.classText = self.inputFile.classes.decode('latin-1')
+        scanner = class_lexer(recover)
+        self.pattern = scanner.pattern
+        # match.lastindex -> TOKEN_KINDS code, -1 for skipped text
+        self.kindOfGroup = [TOKEN_CODES.get(scanner.kinds[kind], -1) if kind >= 0 else -1
+                            for kind in scanner.kind_of_group]
+
+    def getNextToken(self):
+        reader = self.inputFile
+        text = reader.content
+        match = self.pattern.match
+        kindOfGroup = self.kindOfGroup
+        pos = reader.position
+        while True:
+            mo = match(self.classText, pos)
+            if mo is None:
+                reader.position = len(text)
+                return None
+            start, pos = mo.span()
+            kind = kindOfGroup[mo.lastindex]
+            if kind >= 0:
+                reader.position = pos
+                return self.makeToken(kind, text[start:pos], start)
+
+    def tokenBuffer(self):
+        reader = self.inputFile
+        text = reader.content
+        buffer = TokenBuffer(TOKEN_KINDS, 'I' if len(text) < 1 << 32 else 'Q')
+        append = buffer.append
+        resolve = self.resolve
+        kindOfGroup = self.kindOfGroup
+        for mo in self.pattern.finditer(self.classText, reader.position):
+            kind = kindOfGroup[mo.lastindex]
+            if kind >= 0:
+                start, end = mo.span()
+                kind, attribute = resolve(kind, text[start:end], start)
+                append(kind, start, end, attribute)
+        reader.position = len(text)
+        return buffer
+
 
 if __name__ == '__main__':
-    print("Enter your code (press Enter twice to finish):")
-    lines = []
-    while True:
-        line = input()
-        if line.strip() == "":
-            break
-        lines.append(line)
-    code = "\n".join(lines)
-
-    result = lexer(code)
+    if sys.stdin.isatty():
+        print("Enter your code (press Enter twice to finish):")
+        lines = []
+        while True:
+            line = input()
+            if line.strip() == "":
+                break
+            lines.append(line)
+        code = "\n".join(lines)
+    else:
+        # piped input is read whole, blank lines included
+        code = sys.stdin.read()
+
+    symbol_table = set()
+    result = lexer(code, symbol_table=symbol_table)
 
     print("\nTokens Output:")
     for token in result:
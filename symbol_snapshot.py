@@ -0,0 +1,238 @@
+import mmap
+import struct
+import sys
+from array import array
+from zlib import crc32
+
+from binary_io import atomic_writer, column_bytes, column_from_bytes
+from scanner import SymbolRows, SymbolTable
+
+
+# A symbol table snapshot is one little-endian file, every section
+# starting on an 8-byte boundary:
+#   header
+#   type names      u16 length + utf-8 each
+#   offsets         u32 x (rows + 1), lexeme i is blob[offsets[i]:offsets[i + 1]]
+#   types           u8 x rows, indexes into the type names
+#   buckets         u32 x bucket count, open addressing on crc32, address + 1
+#   blob            the lexemes, utf-8 with surrogatepass
+# MappedSymbolTable maps it read-only, so opening it parses nothing and
+# every process mapping the file shares its pages.
+
+SNAPSHOT_MAGIC = b"SYMTAB\0\0"
+# bump when the layout changes
+SNAPSHOT_VERSION = 1
+# magic, version, type count, row count, bucket count, blob size
+_HEADER = struct.Struct("<8sHHIIQ4x")
+_NAME_LENGTH = struct.Struct("<H")
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _bucketCount(rows):
+    # a power of two at least twice the rows, so probes stay short
+    count = 8
+    while count < 2 * rows:
+        count *= 2
+    return count
+
+
+def save_snapshot(table, path):
+    encoded = [lexeme.encode("utf-8", "surrogatepass") for lexeme in table.lexemes]
+    typeNames = sorted(set(table.types))
+    typeCode = {name: code for code, name in enumerate(typeNames)}
+    if len(typeNames) > 256:
+        raise ValueError("a snapshot holds at most 256 symbol types")
+    if sum(map(len, encoded)) >= 1 << 32:
+        raise ValueError("a snapshot holds less than 4 GiB of lexemes")
+    offsets = array("I", [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    types = array("B", [typeCode[name] for name in table.types])
+
+    buckets = array("I", [0]) * _bucketCount(len(encoded))
+    mask = len(buckets) - 1
+    seen = set()
+    for address, data in enumerate(encoded):
+        # rows merged twice keep their first address, as SymbolTable.index does
+        if data in seen:
+            continue
+        seen.add(data)
+        slot = crc32(data) & mask
+        while buckets[slot]:
+            slot = (slot + 1) & mask
+        buckets[slot] = address + 1
+
+    names = b"".join(_NAME_LENGTH.pack(len(name.encode("utf-8"))) + name.encode("utf-8")
+                     for name in typeNames)
+    with atomic_writer(path, ".symtab-") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(typeNames), len(encoded),
+                             len(buckets), total))
+        for section in (names, column_bytes(offsets), column_bytes(types), column_bytes(buckets)):
+            f.write(section)
+            f.write(b"\0" * _padding(len(section)))
+        for data in encoded:
+            f.write(data)
+
+
+def _column(map, typecode, offset, count):
+    # zero-copy on little-endian machines, a byte-swapped copy elsewhere
+    size = array(typecode).itemsize * count
+    if sys.byteorder == "little":
+        return memoryview(map)[offset:offset + size].cast(typecode)
+    return column_from_bytes(typecode, map[offset:offset + size])
+
+
+class _MappedLexemes:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.rowCount
+
+    def __getitem__(self, address):
+        if not -self.table.rowCount <= address < self.table.rowCount:
+            raise IndexError("symbol address out of range")
+        return self.table.lexeme(address % self.table.rowCount)
+
+
+class _MappedTypes:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.rowCount
+
+    def __getitem__(self, address):
+        return self.table.typeNames[self.table.typeCodes[address]]
+
+
+class _MappedIndex:
+    # the lexeme -> address lookups of SymbolTable.index
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, lexeme, default=None):
+        address = self.table.address(lexeme)
+        return default if address is None else address
+
+    def __getitem__(self, lexeme):
+        address = self.table.address(lexeme)
+        if address is None:
+            raise KeyError(lexeme)
+        return address
+
+    def __contains__(self, lexeme):
+        return self.table.address(lexeme) is not None
+
+    def __len__(self):
+        return self.table.rowCount
+
+
+class MappedSymbolTable:
+    # read-only SymbolTable over a snapshot: lexemes, types, rows, index
+    # and getTokenName answer from the mapped file, decoding only the rows
+    # asked for
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path}: empty symbol table snapshot")
+        if len(self.map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: truncated symbol table snapshot")
+        magic, version, typeCount, rows, bucketCount, blobSize = _HEADER.unpack_from(self.map)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {SNAPSHOT_VERSION} symbol table snapshot")
+        position = _HEADER.size
+        self.typeNames = []
+        for _ in range(typeCount):
+            (length,) = _NAME_LENGTH.unpack_from(self.map, position)
+            position += _NAME_LENGTH.size
+            self.typeNames.append(self.map[position:position + length].decode("utf-8"))
+            position += length
+        position += _padding(position - _HEADER.size)
+        typesAt = position + 4 * (rows + 1) + _padding(4 * (rows + 1))
+        bucketsAt = typesAt + rows + _padding(rows)
+        self.blobStart = bucketsAt + 4 * bucketCount + _padding(4 * bucketCount)
+        if self.blobStart + blobSize > len(self.map):
+            self.close()
+            raise ValueError(f"{path}: truncated symbol table snapshot")
+        self.rowCount = rows
+        self.offsets = _column(self.map, "I", position, rows + 1)
+        self.typeCodes = _column(self.map, "B", typesAt, rows)
+        self.buckets = _column(self.map, "I", bucketsAt, bucketCount)
+        self.mask = bucketCount - 1
+        self.lexemes = _MappedLexemes(self)
+        self.types = _MappedTypes(self)
+        self.index = _MappedIndex(self)
+
+    def __len__(self):
+        return self.rowCount
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self):
+        return SymbolRows(self)
+
+    def lexeme(self, address):
+        start = self.blobStart + self.offsets[address]
+        end = self.blobStart + self.offsets[address + 1]
+        return sys.intern(self.map[start:end].decode("utf-8", "surrogatepass"))
+
+    def address(self, lexeme):
+        data = lexeme.encode("utf-8", "surrogatepass")
+        buckets = self.buckets
+        offsets = self.offsets
+        blobStart = self.blobStart
+        slot = crc32(data) & self.mask
+        while True:
+            entry = buckets[slot]
+            if not entry:
+                return None
+            address = entry - 1
+            start = blobStart + offsets[address]
+            end = blobStart + offsets[address + 1]
+            if end - start == len(data) and self.map[start:end] == data:
+                return address
+            slot = (slot + 1) & self.mask
+
+    def getTokenName(self, lexeme):
+        address = self.address(lexeme)
+        if address is None:
+            return None
+        return self.types[address]
+
+    def toSymbolTable(self, keywords=None):
+        # a writable copy, e.g. to go on lexing into it
+        table = SymbolTable(keywords)
+        for address in range(self.rowCount):
+            table.append(self.lexeme(address), self.types[address])
+        return table
+
+    def close(self):
+        # the column views must go before the map they point into
+        for name in ("offsets", "typeCodes", "buckets"):
+            column = getattr(self, name, None)
+            if isinstance(column, memoryview):
+                column.release()
+        if getattr(self, "map", None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+def load_snapshot(path):
+    return MappedSymbolTable(path)
@@ -0,0 +1,85 @@
+import io
+import os
+from array import array
+
+import pytest
+
+from binary_io import atomic_writer, column_bytes, column_from_bytes
+from corpus import generate
+from firstFollow import grammar
+from grammar_cache import cached_analysis
+from lexgen import generate_lexer
+from scanner_with_dfa import DFALexicalAnalyzer
+from symbol_snapshot import load_snapshot, save_snapshot
+from token_buffer import TokenBuffer
+
+
+def test_atomic_writer_replaces(tmp_path):
+    path = str(tmp_path / "sub" / "file.bin")
+    with atomic_writer(path) as f:
+        f.write(b"old")
+    with atomic_writer(path) as f:
+        f.write(b"new")
+    assert open(path, "rb").read() == b"new"
+    assert os.listdir(tmp_path / "sub") == ["file.bin"]
+
+
+def test_atomic_writer_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / "file.bin")
+    with atomic_writer(path) as f:
+        f.write(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_writer(path) as f:
+            f.write(b"half")
+            raise RuntimeError
+    assert open(path, "rb").read() == b"old"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+@pytest.mark.parametrize("typecode", ["B", "H", "I", "Q"])
+def test_columns_round_trip(typecode):
+    column = array(typecode, range(0, 250, 7))
+    data = column_bytes(column)
+    assert data == b"".join(value.to_bytes(column.itemsize, "little") for value in column)
+    assert column_from_bytes(typecode, data) == column
+
+
+def test_token_buffer_round_trip():
+    buffer = DFALexicalAnalyzer(generate("mixed", 5_000)).tokenBuffer()
+    stream = io.BytesIO()
+    buffer.write(stream)
+    stream.seek(0)
+    loaded = TokenBuffer.read(stream)
+    assert [(t.name, t.attribute, t.position) for t in loaded] == \
+        [(t.name, t.attribute, t.position) for t in buffer]
+
+
+def test_snapshot_round_trip(tmp_path):
+    analyzer = DFALexicalAnalyzer(generate("mixed", 100_000))
+    analyzer.tokenBuffer()
+    table = analyzer.symbolTable
+    table.installID("caf\udce9")
+    # enough rows for multi-row offsets and collisions in the buckets
+    assert len(table.lexemes) > 500
+    assert {"keyword", "id"} <= set(table.types)
+    path = str(tmp_path / "symtab.bin")
+    save_snapshot(table, path)
+    with load_snapshot(path) as mapped:
+        assert [mapped.lexemes[i] for i in range(len(mapped))] == table.lexemes
+        assert [mapped.types[i] for i in range(len(mapped))] == table.types
+        assert all(mapped.index[lexeme] == address for lexeme, address in table.index.items())
+        assert mapped.index.get("missing") is None
+        assert mapped.getTokenName("while") == "keyword"
+        assert mapped.getTokenName("caf\udce9") == "id"
+        copy = mapped.toSymbolTable()
+    assert copy.index == table.index
+
+
+def test_caches_written_atomically(tmp_path):
+    cached_analysis(grammar, cache_dir=str(tmp_path / "ff"))
+    generate_lexer(cache_dir=str(tmp_path / "lexgen"))
+    for name in ("ff", "lexgen"):
+        entries = os.listdir(tmp_path / name)
+        assert len(entries) == 1 and not entries[0].startswith(".")
+    warm = cached_analysis(grammar, cache_dir=str(tmp_path / "ff"))
+    assert warm.first_sets()["E"] == {"(", "id"}
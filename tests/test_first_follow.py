@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from firstFollow import (compute_first, compute_first_naive, compute_follow,
+                         compute_follow_naive, grammar)
+
+
+def random_grammar(seed, nonterminals=12, terminals=5):
+    rnd = random.Random(seed)
+    names = [f"N{i}" for i in range(nonterminals)]
+    symbols = names + [f"t{i}" for i in range(terminals)]
+    return {name: [" ".join(rnd.choice(symbols) for _ in range(rnd.randrange(4))) or "ε"
+                   for _ in range(rnd.randrange(1, 4))]
+            for name in names}
+
+
+@pytest.mark.parametrize("source", [grammar] + [random_grammar(seed) for seed in range(30)])
+def test_solver_matches_naive(source):
+    start = next(iter(source))
+    first = compute_first(source)
+    assert first == compute_first_naive(source)
+    assert compute_follow(source, first, start) == compute_follow_naive(source, first, start)
+
+
+def test_stats_count_work():
+    first_stats, follow_stats = {}, {}
+    first = compute_first(grammar, first_stats)
+    compute_follow(grammar, first, "E", follow_stats)
+    # one component per nonterminal here, each edge relaxed once
+    assert "sweeps" not in first_stats and "sweeps" not in follow_stats
+    assert first_stats["components"] == follow_stats["components"] == len(grammar)
+    assert first_stats["production_visits"] >= sum(map(len, grammar.values()))
+    naive_stats = {}
+    compute_first_naive(grammar, naive_stats)
+    assert naive_stats["sweeps"] > 1
+    assert naive_stats["production_visits"] == naive_stats["sweeps"] * sum(map(len, grammar.values()))
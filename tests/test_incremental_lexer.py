@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+import incremental_lexer
+from corpus import generate
+from incremental_lexer import IncrementalLexer
+from scanner_with_dfa import DFALexicalAnalyzer
+
+
+def _tokens(tokens):
+    return [(token.name, token.attribute, token.position) for token in tokens]
+
+
+def _relexed(text):
+    return _tokens(iter(DFALexicalAnalyzer(text).getNextToken, None))
+
+
+# fragments that split or join tokens, lines and comments
+FRAGMENTS = ["", "\n", "\n\n", "x", "e", "1", "1.", "2e+", "=", "==", "!", "/", "//", " ",
+             "while", "$", "é", "; y = 3.5;\n", "// note\nz"]
+
+
+def _randomEdit(rng, length):
+    start = rng.randint(0, length)
+    end = min(length, start + rng.choice([0, 0, 1, 2, 5, 40]))
+    text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 3)))
+    return start, end, text
+
+
+def assert_edit(lexer, start, end, newText):
+    text = lexer.text
+    old = _tokens(lexer.tokens())
+    first, oldStop, newStop = lexer.apply_edit(start, end, newText)
+    text = text[:start] + newText + text[end:]
+    new = _tokens(lexer.tokens())
+    assert lexer.text == text
+    assert len(lexer) == len(text)
+    assert new == _relexed(text)
+    assert lexer.tokenCount == len(new)
+
+    # outside the returned range the stream is unchanged, past it shifted
+    # by the change in length
+    shift = len(newText) - (end - start)
+    assert 0 <= first <= oldStop <= len(old) and first <= newStop <= len(new)
+    assert new[:first] == old[:first]
+    assert new[newStop:] == [(name, attribute, position + shift)
+                             for name, attribute, position in old[oldStop:]]
+    return first, oldStop, newStop
+
+
+@pytest.mark.parametrize("blockLines", [1, 3, 256])
+@pytest.mark.parametrize("seed", range(6))
+def test_random_edits_match_full_relex(monkeypatch, seed, blockLines):
+    # small blocks make edits span, split and merge blocks
+    monkeypatch.setattr(incremental_lexer, "BLOCK_LINES", blockLines)
+    rng = random.Random(seed)
+    lexer = IncrementalLexer(generate("mixed", 3_000, seed=seed))
+    assert _tokens(lexer.tokens()) == _relexed(lexer.text)
+    for _ in range(60):
+        assert_edit(lexer, *_randomEdit(rng, len(lexer)))
+
+
+def test_changed_range():
+    lexer = IncrementalLexer("a = 1;\nb = 2;\nc = 3;\n")
+    # 1 -> 42 replaces the third token only
+    assert assert_edit(lexer, 4, 5, "42") == (2, 3, 3)
+    # joining two lines moves tokens without changing them
+    assert assert_edit(lexer, 7, 8, "") == (4, 4, 4)
+    # "b" and "x" make one identifier in place of "b" and the blank
+    assert assert_edit(lexer, 8, 9, "x") == (4, 5, 5)
+    # opening a comment swallows the rest of its line
+    assert assert_edit(lexer, 0, 0, "//") == (0, 8, 1)
+    # an edit that changes no token
+    assert assert_edit(lexer, len(lexer), len(lexer), "  ") == (5, 5, 5)
+
+
+def test_edit_outside_buffer():
+    lexer = IncrementalLexer("a = 1;")
+    with pytest.raises(ValueError):
+        lexer.apply_edit(3, 7, "")
+    with pytest.raises(ValueError):
+        lexer.apply_edit(4, 2, "")
+
+
+@pytest.mark.parametrize("blockLines", [1, 256])
+def test_reference_counts_drop_with_replaced_blocks(monkeypatch, blockLines):
+    monkeypatch.setattr(incremental_lexer, "BLOCK_LINES", blockLines)
+    lexer = IncrementalLexer("x = x + y;\nwhile (x) y = x;\nz = 1;\n")
+    assert lexer.referenceCount("x") == 4
+    assert lexer.referenceCount("y") == 2
+    assert lexer.referenceCount("z") == 1
+
+    # replacing the middle line releases its ids
+    start = lexer.text.index("while")
+    lexer.apply_edit(start, lexer.text.index("\n", start), "y = 2;")
+    assert lexer.referenceCount("x") == 2
+    assert lexer.referenceCount("y") == 2
+
+    # deleting everything releases every id, the symbol table keeps them
+    lexer.apply_edit(0, len(lexer), "")
+    assert [lexer.referenceCount(name) for name in ("x", "y", "z")] == [0, 0, 0]
+    assert {"x", "y", "z"} <= set(lexer.symbolTable.index)
+    assert lexer.referenceCount("never seen") == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_reference_counts_after_random_edits(monkeypatch, seed):
+    monkeypatch.setattr(incremental_lexer, "BLOCK_LINES", 2)
+    rng = random.Random(seed)
+    lexer = IncrementalLexer(generate("identifier", 2_000, seed=seed))
+    for _ in range(40):
+        lexer.apply_edit(*_randomEdit(rng, len(lexer)))
+    counts = {}
+    for name, attribute, _ in _tokens(lexer.tokens()):
+        if name == "id":
+            counts[attribute] = counts.get(attribute, 0) + 1
+    assert all(lexer.referenceCount(lexeme) == counts.get(lexeme, 0)
+               for lexeme in lexer.symbolTable.index)
@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from corpus import generate
+from lexer_cli import main, read_token_file
+from scanner_with_dfa import DFALexicalAnalyzer
+
+
+SOURCES = {
+    "a.txt": "while (x1 >= 2) {\r\n  y = y * 1.5; // halve\n}\n",
+    "b.txt": generate("mixed", 5_000, seed=4),
+    "sub/c.txt": "int café = 3;\nz = café $ 1;",
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name, text in SOURCES.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(text.encode("utf-8"))
+    return tmp_path
+
+
+def _expected(text):
+    # (kind, attribute, start, end) rows as the dfa backend lexes text
+    buffer = DFALexicalAnalyzer(text).tokenBuffer()
+    return [(buffer.kindName(i), buffer.attribute(i), buffer.starts[i], buffer.ends[i])
+            for i in range(len(buffer))]
+
+
+def _lineColumn(text, offset):
+    start = text.rfind("\n", 0, offset) + 1
+    return text.count("\n", 0, offset) + 1, offset - start + 1
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_jsonl_files(tree):
+    out = tree / "out.jsonl"
+    paths = [str(tree / name) for name in ("a.txt", "b.txt")]
+    assert main(paths + ["-e", "dfa", "-o", str(out)]) == 0
+    records = _records(out)
+    for path in paths:
+        text = SOURCES[path[len(str(tree)) + 1:]]
+        expected = [{"file": path, "kind": kind, "attribute": attribute, "start": start,
+                     "end": end, "line": line, "column": column}
+                    for kind, attribute, start, end in _expected(text)
+                    for line, column in (_lineColumn(text, start),)]
+        assert [record for record in records if record["file"] == path] == expected
+    # inputs in the order given
+    assert [record["file"] for record in records] == sorted(record["file"] for record in records)
+
+
+def test_binary_globs_round_trip(tree):
+    out = tree / "out.bin"
+    assert main([str(tree / "*.txt"), str(tree / "**" / "c.txt"), "-f", "binary", "-e", "dfa",
+                 "-o", str(out)]) == 1
+    with open(out, "rb") as f:
+        files = list(read_token_file(f))
+    assert [path for path, _ in files] == [str(tree / name)
+                                           for name in ("a.txt", "b.txt", "sub/c.txt")]
+    for path, buffer in files:
+        text = SOURCES[path[len(str(tree)) + 1:]]
+        assert [(buffer.kindName(i), buffer.attribute(i), buffer.starts[i], buffer.ends[i])
+                for i in range(len(buffer))] == _expected(text)
+
+
+def test_read_token_file_truncated(tree):
+    out = tree / "out.bin"
+    main([str(tree / "a.txt"), "-f", "binary", "-o", str(out)])
+    data = out.read_bytes()
+    with pytest.raises(ValueError):
+        list(read_token_file(io.BytesIO(data[:-3])))
+
+
+def test_stdin(monkeypatch, capfd):
+    # an invalid UTF-8 byte becomes U+FFFD, as with files
+    text = b"x = 1;\ny = 2 $;\n\xff\n"
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(text)))
+    assert main(["-e", "dfa"]) == 1
+    out, err = capfd.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    decoded = text.decode("utf-8", "replace")
+    assert [(record["kind"], record["attribute"], record["start"], record["end"])
+            for record in records] == [tuple(row) for row in _expected(decoded)]
+    assert {record["file"] for record in records} == {"<stdin>"}
+    assert err.splitlines() == ["<stdin>:2:7: Lexical error: Unknown character '$'",
+                                "<stdin>:3:1: Lexical error: Unknown character '\ufffd'"]
+
+
+def test_errors_and_symbol_table(tree, capfd):
+    out = tree / "out.jsonl"
+    assert main([str(tree / "sub" / "c.txt"), "-o", str(out), "--symbol-table"]) == 1
+    stdout, stderr = capfd.readouterr()
+    assert stderr == f"{tree / 'sub' / 'c.txt'}:2:10: Lexical error: Unknown character '$'\n"
+    assert stdout.startswith("Symbol Table:\n")
+    assert "café" in stdout
+
+
+def test_jobs_match_single_process(tree):
+    single, parallel = tree / "single.jsonl", tree / "parallel.jsonl"
+    main([str(tree / "*.txt"), "-o", str(single)])
+    main([str(tree / "*.txt"), "-j", "2", "-o", str(parallel)])
+    assert single.read_bytes() == parallel.read_bytes()
+
+
+def test_missing_input(tree):
+    with pytest.raises(SystemExit) as raised:
+        main([str(tree / "*.missing")])
+    assert raised.value.code == 2
+
+
+def test_import_skips_argparse():
+    # argparse is only needed once main runs
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, lexer_cli; print('argparse' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True,
+                            text=True, check=True)
+    assert result.stdout == "False\n"
@@ -0,0 +1,121 @@
+import pytest
+
+import lexers
+from corpus import CORPORA, generate, write_corpus
+from lexers import BACKENDS, choose_backend, make_lexer, open_lexer
+from scanner import MmapFileReader
+
+# every backend is checked against the chain scanner, the reference
+REFERENCE = "chain"
+OTHERS = [backend for backend in BACKENDS if backend != REFERENCE]
+SIZE = 50_000
+SEEDS = (0, 1)
+
+
+def _rows(buffer):
+    return [(buffer.kindName(i), buffer.attribute(i), buffer.starts[i], buffer.ends[i])
+            for i in range(len(buffer))]
+
+
+def _lexed(analyzer, stream):
+    if stream:
+        tokens = [(token.name, token.attribute, token.position)
+                  for token in iter(analyzer.getNextToken, None)]
+    else:
+        tokens = _rows(analyzer.tokenBuffer())
+    table = analyzer.symbolTable
+    return (tokens, [(error.position, str(error)) for error in analyzer.errors],
+            analyzer.droppedErrors, table.lexemes, table.types)
+
+
+def _firstDifference(found, expected):
+    for index, (row, wanted) in enumerate(zip(found, expected)):
+        if row != wanted:
+            return f"token {index} is {row}, expected {wanted}"
+    return f"{len(found)} tokens, expected {len(expected)}"
+
+
+def assert_same_output(text, backend, recover=False, maxErrors=None, stream=False):
+    found = _lexed(BACKENDS[backend](text, recover=recover, maxErrors=maxErrors), stream)
+    expected = _lexed(BACKENDS[REFERENCE](text, recover=recover, maxErrors=maxErrors), stream)
+    assert found[0] == expected[0], f"{backend}: {_firstDifference(found[0], expected[0])}"
+    assert found[1:] == expected[1:], f"{backend}: errors or symbol table differ"
+
+
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("kind", list(CORPORA))
+@pytest.mark.parametrize("backend", OTHERS)
+def test_corpus_conformance(backend, kind, seed, recover):
+    assert_same_output(generate(kind, SIZE, seed), backend, recover)
+
+
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("backend", OTHERS)
+def test_get_next_token_conformance(backend, recover):
+    assert_same_output(generate("mixed", 20_000), backend, recover, stream=True)
+    assert_same_output(generate("garbage", 5_000), backend, recover, stream=True)
+
+
+SNIPPETS = [
+    "",
+    "1.x 1e 1e+ 1.5e-3 2.e5 .5 x1.y",
+    "a<=b>=c==d!=e<f>g=h!i",
+    "// only a comment",
+    "x = 1; // comment\r\ny = 2;",
+    "int\tfloat bool for if else while return iff _x",
+    "a = $ # @ ~ ` \\ ' \" ?",
+    "é = ß1 + ٣; 𝟘 ≥ 2",
+]
+
+
+@pytest.mark.parametrize("maxErrors", [None, 1])
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("text", SNIPPETS)
+@pytest.mark.parametrize("backend", OTHERS)
+def test_snippet_conformance(backend, text, recover, maxErrors):
+    assert_same_output(text, backend, recover, maxErrors)
+    assert_same_output(text, backend, recover, maxErrors, stream=True)
+
+
+@pytest.mark.parametrize("kind", ["mixed", "comment", "numeric", "whitespace"])
+def test_mapped_chain_matches_text(tmp_path, kind):
+    # ASCII corpora, so byte and character offsets agree
+    path = str(tmp_path / kind)
+    write_corpus(path, kind, SIZE)
+    mapped = open_lexer(path, "chain", mapped=True)
+    try:
+        assert _rows(mapped.tokenBuffer()) == _rows(open_lexer(path, "dfa").tokenBuffer())
+    finally:
+        mapped.close()
+
+
+def test_choose_backend():
+    assert choose_backend(generate("comment", 100_000)) == "regex"
+    for kind in ("mixed", "identifier", "numeric", "minified", "garbage"):
+        assert choose_backend(generate(kind, 100_000)) == "dfa"
+    assert choose_backend("") == "dfa"
+    assert choose_backend(generate("comment", 100_000), mapped=True) == "chain"
+
+
+def test_make_lexer_rejects_mapped_text_backends(tmp_path, monkeypatch):
+    path = str(tmp_path / "input.src")
+    write_corpus(path, "mixed", 1_000)
+    readers = []
+
+    class Reader(MmapFileReader):
+        def __init__(self, path):
+            super().__init__(path)
+            readers.append(self)
+
+    monkeypatch.setattr(lexers, "MmapFileReader", Reader)
+    for backend in ("dfa", "regex"):
+        with pytest.raises(ValueError):
+            open_lexer(path, backend, mapped=True)
+    # the rejected readers released their mapping and file
+    assert len(readers) == 2
+    assert all(reader.map.closed and reader.file.closed for reader in readers)
+    analyzer = open_lexer(path, mapped=True)
+    assert type(analyzer) is BACKENDS["chain"]
+    analyzer.close()
+    assert type(make_lexer("x = 1;")) is BACKENDS["dfa"]
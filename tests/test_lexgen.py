@@ -0,0 +1,107 @@
+import os
+import re
+import runpy
+
+import pytest
+
+import lexgen
+from corpus import CORPORA, generate
+from lexgen import (build_tables, cached_tables, generate_lexer, load_tables, save_tables,
+                    spec_hash, to_source, with_keywords)
+from scanner_with_regex import Lexer, keywords, token_specification
+
+
+@pytest.fixture(scope="module")
+def lexers(tmp_path_factory):
+    return generate_lexer(cache_dir=str(tmp_path_factory.mktemp("lexgen"))), Lexer()
+
+
+def assert_same_tokens(generated, reference, code):
+    assert generated.scan(code) == reference.scan(code)
+    buffer, expected = generated.tokenize(code), reference.tokenize(code)
+    assert [(buffer.kindName(i), buffer.attribute(i)) for i in range(len(buffer))] == \
+        [(expected.kindName(i), expected.attribute(i)) for i in range(len(expected))]
+
+
+@pytest.mark.parametrize("kind", sorted(CORPORA))
+def test_corpora_match_regex_lexer(lexers, kind):
+    assert_same_tokens(*lexers, generate(kind, 30_000, seed=5))
+
+
+SNIPPETS = {
+    "empty": "",
+    "longest relop": "a==b<=c<d>=e!=f>g=h",
+    "numbers": "1 1.5 1. .5 12.34.56 007",
+    "keywords": "if ifx while_ whilewhile return else1 _if",
+    "unicode identifiers": "café _naïve x² Δt",
+    "unicode digits": "٣٤ x٣ 1.٥",
+    "invalid characters": "a $ @ # ~ ` \\ ! ?",
+    "comments": "// note\nx // tail\n//\n/ /",
+    "whitespace": " \t\r\n\x0b\x0c x",
+    "surrogates": "a\udc80b \udcff",
+}
+
+
+@pytest.mark.parametrize("code", list(SNIPPETS.values()), ids=list(SNIPPETS))
+def test_snippets_match_regex_lexer(lexers, code):
+    assert_same_tokens(*lexers, code)
+
+
+def test_source_round_trip(lexers, tmp_path):
+    generated, reference = lexers
+    path = tmp_path / "generated_lexer.py"
+    path.write_text(to_source(generated.tables), encoding="utf-8")
+    lexer = runpy.run_path(str(path))["lexer"]
+    assert tuple(lexer.tables) == tuple(generated.tables)
+    assert sorted(lexer.keywords) == sorted(keywords)
+    code = generate("mixed", 10_000, seed=2)
+    assert lexer.scan(code) == reference.scan(code)
+
+
+def test_table_file_round_trip(lexers, tmp_path):
+    tables = lexers[0].tables
+    specification = with_keywords(token_specification, keywords)
+    key = spec_hash(specification)
+    path = str(tmp_path / "tables.lxt")
+    save_tables(path, tables, key)
+    assert load_tables(path, key) == tables
+    assert load_tables(path) == tables
+    assert load_tables(path, spec_hash(token_specification)) is None
+    assert load_tables(str(tmp_path / "missing.lxt")) is None
+
+    with open(path, "rb") as f:
+        data = f.read()
+    for broken in (data[:10], b"NOTLEXGN" + data[8:], data[:len(data) // 2]):
+        with open(path, "wb") as f:
+            f.write(broken)
+        assert load_tables(path, key) is None
+
+
+def test_cached_tables_reused(tmp_path, monkeypatch):
+    specification = [("NUM", r"\d+"), ("ID", r"[a-z]+"), ("SKIP", r" +")]
+    tables = cached_tables(specification, str(tmp_path))
+    assert os.listdir(tmp_path) == [spec_hash(specification).hex() + ".lxt"]
+
+    def rebuild(specification):
+        raise AssertionError("tables rebuilt despite the cache")
+    monkeypatch.setattr("lexgen.build_tables", rebuild)
+    assert cached_tables(specification, str(tmp_path)) == tables
+
+
+@pytest.mark.parametrize("pattern", ["a*", "^a", "(?=a)", "a*?", "[b-a]", "(a", "a)", r"\p"])
+def test_rejected_patterns(pattern):
+    with pytest.raises(ValueError):
+        build_tables([("RULE", pattern)])
+
+
+def test_categories_match_re(monkeypatch):
+    monkeypatch.setattr(lexgen, "_CATEGORIES", {})
+    samples = [chr(code) for code in range(0, lexgen.MAX_CODE + 1, 97)] + list("٣²\u3000\x1c_")
+    for letter in "dws":
+        ranges = lexgen._category(letter)
+        assert all(hi < lo for (_, hi), (lo, _) in zip(ranges, ranges[1:]))
+        pattern = re.compile(rf"\{letter}")
+        assert [any(lo <= ord(ch) <= hi for lo, hi in ranges) for ch in samples] == \
+            [pattern.match(ch) is not None for ch in samples]
+    # only the ranges stay cached
+    assert sorted(lexgen._CATEGORIES) == ["d", "s", "w"]
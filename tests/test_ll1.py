@@ -0,0 +1,89 @@
+import pytest
+
+from firstFollow import GrammarAnalysis, grammar
+from ll1 import LL1Table, ParseError, analyzer_tokens
+from scanner_with_dfa import DFALexicalAnalyzer
+
+
+def _parse(table, source):
+    return table.parse(analyzer_tokens(DFALexicalAnalyzer(source)))
+
+
+@pytest.fixture(scope="module")
+def table():
+    return LL1Table(grammar)
+
+
+def test_table(table):
+    assert table.isLL1()
+    assert table.describeConflicts() == []
+    assert table.start_symbol == "E"
+    assert sorted(table.terminals) == sorted(["+", "*", "(", ")", "id", "$"])
+    assert table.production_text == ["T E'", "+ T E'", "ε", "F T'", "* F T'", "ε", "( E )", "id"]
+    assert table.entry("E", "id") == table.entry("E", "(") == 0
+    assert table.entry("E'", "+") == 1
+    # the empty productions are chosen on FOLLOW
+    assert table.entry("E'", ")") == table.entry("E'", "$") == 2
+    assert table.entry("T'", "+") == 5
+    assert table.entry("F", "(") == 6 and table.entry("F", "id") == 7
+    assert table.entry("E", "+") is None
+    assert table.entry("F", "$") is None
+
+
+def test_table_from_analysis(table):
+    analysis = GrammarAnalysis(grammar)
+    analysis.solve_follow("E")
+    assert LL1Table(grammar, analysis=analysis).table == table.table
+
+
+def test_parse(table):
+    # the leftmost derivation, comments skipped
+    assert _parse(table, "x + y * z") == [0, 3, 7, 5, 1, 3, 7, 4, 7, 5, 2]
+    assert _parse(table, "// note\nx // again") == [0, 3, 7, 5, 2]
+    assert _parse(table, "(a + b) * ((c))")[:4] == [0, 3, 6, 0]
+
+
+def test_parse_long_expression(table):
+    # non-recursive, so nesting depth is not bounded by the Python stack
+    depth = 5_000
+    derivation = _parse(table, "(" * depth + "x" + ")" * depth)
+    assert derivation.count(6) == depth and derivation.count(7) == 1
+
+
+@pytest.mark.parametrize("source, message, position", [
+    ("x + * y", "unexpected arithOp(*) while parsing T", 4),
+    ("x )", "expected '$' but found clParenthes())", 2),
+    ("x $ y", "unexpected token unknown($)", 2),
+    ("x = y", "unexpected token assignOp(=)", 2),
+])
+def test_parse_error(table, source, message, position):
+    with pytest.raises(ParseError) as raised:
+        _parse(table, source)
+    assert str(raised.value) == message
+    assert raised.value.token.position == position
+
+
+@pytest.mark.parametrize("source, message", [
+    ("x + ", "unexpected end of input while parsing T"),
+    ("(x", "expected ')' but found end of input"),
+    ("", "unexpected end of input while parsing E"),
+])
+def test_parse_error_at_end(table, source, message):
+    with pytest.raises(ParseError) as raised:
+        _parse(table, source)
+    assert str(raised.value) == message
+    assert raised.value.token is None
+
+
+def test_conflicts():
+    # both S productions start with a
+    table = LL1Table({"S": ["a A", "a B"], "A": ["b"], "B": ["c"]})
+    assert not table.isLL1()
+    assert table.describeConflicts() == ["conflict at [S, a]: S -> a A | S -> a B"]
+    assert table.entry("S", "a") == 0
+
+
+def test_conflicts_through_follow():
+    # A may be empty and FOLLOW(A) holds the b that also starts A -> b
+    table = LL1Table({"S": ["A b"], "A": ["b", "ε"]})
+    assert table.describeConflicts() == ["conflict at [A, b]: A -> b | A -> ε"]
@@ -0,0 +1,97 @@
+import pytest
+
+from corpus import write_corpus
+from lexers import open_lexer
+from scanner import LexicalAnalyzer, MmapFileReader
+from scanner_with_dfa import DFALexicalAnalyzer
+from scanner_with_regex import RegexLexicalAnalyzer
+
+
+def _file(tmp_path, data):
+    path = tmp_path / "input.src"
+    path.write_bytes(data)
+    return str(path)
+
+
+def _tokens(analyzer):
+    tokens = []
+    for token in iter(analyzer.getNextToken, None):
+        tokens.append((token.name, token.attribute, token.position))
+        assert len(tokens) < 1000, "the lexer does not advance"
+    return tokens
+
+
+@pytest.mark.parametrize("data", [
+    b"x\x80y",
+    "temp = 5\xb0;".encode("latin-1"),
+    b"a \xa9\xa0 b",
+    b"\xc3\xa9\x80\x80z",
+    b"\xe2\x82 \xf0\x9f\x98 q",
+    b"\x80",
+    b"1.5\xbf2",
+    b"a\xc0\x80\xe0\x80b\xed\xa0\x80",
+])
+def test_stray_continuation_bytes_advance(tmp_path, data):
+    path = _file(tmp_path, data)
+    analyzer = LexicalAnalyzer.fromFile(path)
+    try:
+        tokens = _tokens(analyzer)
+    finally:
+        analyzer.close()
+    positions = [position for _, _, position in tokens]
+    assert positions == sorted(set(positions))
+    assert "".join(attribute for name, attribute, _ in tokens if name != "comment") == \
+        "".join(data.decode("utf-8", "replace").split())
+
+
+def test_retract_undoes_characters_as_read(tmp_path):
+    data = b"a\x80\xc3\xa9\xc3\x80\x80\xe2\x82\xac\xe2\x82b\xf0\x9f\x98\x80\xbf\xff "
+    reader = MmapFileReader(_file(tmp_path, data))
+    try:
+        starts = []
+        while True:
+            starts.append(reader.position)
+            if reader.getNextChar() is None:
+                break
+        for start in reversed(starts):
+            reader.retract(1)
+            assert reader.position == start
+    finally:
+        reader.close()
+
+
+def test_mapped_open_lexer_on_latin1(tmp_path):
+    path = _file(tmp_path, "temp = 5\xb0;".encode("latin-1"))
+    buffer = open_lexer(path, mapped=True).tokenBuffer()
+    assert [(buffer.kindName(i), buffer.attribute(i)) for i in range(len(buffer))] == [
+        ("id", "temp"), ("assignOp", "="), ("num", "5"), ("unknown", "�"), ("semicolon", ";")]
+
+
+@pytest.mark.parametrize("backend", [DFALexicalAnalyzer, RegexLexicalAnalyzer])
+def test_text_backends_from_file(tmp_path, backend):
+    path = _file(tmp_path, "int a = 1; // x\r\nb\xb0".encode("latin-1"))
+    expected = LexicalAnalyzer((tmp_path / "input.src").read_bytes().decode("utf-8", "replace"))
+    assert _tokens(backend.fromFile(path)) == _tokens(expected)
+
+
+@pytest.mark.parametrize("backend", [DFALexicalAnalyzer, RegexLexicalAnalyzer])
+def test_text_backends_reject_mapped_reader(tmp_path, backend):
+    reader = MmapFileReader(_file(tmp_path, b"a = 1;"))
+    try:
+        with pytest.raises(TypeError, match="mapped file"):
+            backend(reader)
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize("recover", [False, True])
+def test_mapped_garbage_corpus(tmp_path, recover):
+    path = str(tmp_path / "garbage.src")
+    write_corpus(path, "garbage", 50_000)
+    data = (tmp_path / "garbage.src").read_bytes()
+    with pytest.raises(UnicodeDecodeError):
+        data.decode("utf-8")
+    mapped = open_lexer(path, "chain", recover=recover, mapped=True).tokenBuffer()
+    text = open_lexer(path, "dfa", recover=recover).tokenBuffer()
+    assert [(mapped.kindName(i), mapped.attribute(i)) for i in range(len(mapped))] == \
+        [(text.kindName(i), text.attribute(i)) for i in range(len(text))]
@@ -0,0 +1,61 @@
+import pytest
+
+from corpus import generate
+from parallel_lexer import lex_text_parallel, split_segments
+from scanner import LexicalAnalyzer
+
+
+def _sequential(source, recover):
+    analyzer = LexicalAnalyzer(source, recover=recover)
+    tokens = [(token.name, token.attribute, token.position)
+              for token in iter(analyzer.getNextToken, None)]
+    return tokens, analyzer.errors, analyzer.symbolTable
+
+
+def assert_split_matches(source, jobs, segments, recover=False):
+    # the stitched stream must be the sequential LexicalAnalyzer output,
+    # with the same errors and symbol table addresses
+    expected, errors, table = _sequential(source, recover)
+    tokens, splitErrors, splitTable = lex_text_parallel(source, jobs, segments, recover)
+    assert [(token.name, token.attribute, token.position) for token in tokens] == expected
+    assert splitErrors == errors
+    assert splitTable.lexemes == table.lexemes
+    assert splitTable.types == table.types
+
+
+EDGE_CASES = {
+    "empty": "",
+    "no newline": "int a = b + 1;",
+    "crlf": "int a = 1;\r\nif (a >= 2) { b = a * 3.5; }\r\n\r\nc = a;\r\n",
+    "comment at end": "x = 1;\ny = x;\n// trailing comment",
+    "comment line at end": "x = 1;\n// trailing comment\n",
+    "number prefixes at cuts": "a = 1.\nb = 1e\nc = 2.5e+\nd = 7e-\ne = 1.x\n",
+    "invalid runs": "a = $$$\n@@\n#b ~ 1;\n\n",
+    "blank lines": "\n\n\na\n\n\n",
+}
+
+
+@pytest.mark.parametrize("recover", [False, True])
+@pytest.mark.parametrize("segments", [1, 2, 3, 7, 100])
+@pytest.mark.parametrize("source", list(EDGE_CASES.values()), ids=list(EDGE_CASES))
+def test_edge_cases(source, segments, recover):
+    assert_split_matches(source, 1, segments, recover)
+
+
+def test_more_segments_than_lines():
+    source = "a = 1;\nb = 2;\nc = a + b;\n"
+    bounds = split_segments(source, 50)
+    assert bounds[0] == 0 and bounds[-1] == len(source)
+    assert all(start < end for start, end in zip(bounds, bounds[1:]))
+    assert len(bounds) - 1 <= source.count("\n")
+    assert_split_matches(source, 1, 50)
+
+
+@pytest.mark.parametrize("recover", [False, True])
+@pytest.mark.parametrize("kind", ["mixed", "numeric", "comment", "garbage", "whitespace"])
+def test_corpora(kind, recover):
+    assert_split_matches(generate(kind, 50_000, seed=3), 1, 7, recover)
+
+
+def test_worker_processes():
+    assert_split_matches(generate("mixed", 200_000), 2, 5)
@@ -0,0 +1,157 @@
+from collections import Counter
+
+from lexers import make_lexer
+from scanner import LexicalAnalyzer
+from scanner_stats import RECOGNIZERS, ScannerStats, instrument
+from scanner_with_dfa import DFALexicalAnalyzer
+
+
+def _attempts(*reached):
+    # each token tries the recognizers in order up to the one that takes it
+    attempts = Counter()
+    for name in reached:
+        attempts.update(RECOGNIZERS[:RECOGNIZERS.index(name) + 1])
+    return dict(attempts)
+
+
+def test_chain_counters():
+    analyzer = LexicalAnalyzer("a = b;")
+    stats = instrument(analyzer)
+    assert [token.name for token in iter(analyzer.getNextToken, None)] == \
+        ["id", "assignOp", "id", "semicolon"]
+    counts = stats.asDict()
+    assert set(counts.pop("phases")) == {"scan"}
+    assert counts == {
+        "attempts": _attempts("idAndKeywordToken", "assignOpToken", "idAndKeywordToken",
+                              "semicolonToken"),
+        "hits": {"idAndKeywordToken": 2, "assignOpToken": 1, "semicolonToken": 1},
+        "consumed": {"idAndKeywordToken": 2, "assignOpToken": 1, "semicolonToken": 1},
+        "dropped": 0,
+        "charsRead": 44,
+        "charsRetracted": 42,
+        "tokens": {"id": 2, "assignOp": 1, "semicolon": 1},
+        "errors": 0,
+        "keywordLookups": 2,
+        "symbolLookups": 2,
+        "symbolInserts": 2,
+        "analyzers": 1,
+    }
+
+
+def test_chain_counts_dropped_characters_and_errors():
+    # numberToken reads "1." and gives up, dropping the 1
+    analyzer = LexicalAnalyzer("if x == 1.x $")
+    stats = instrument(analyzer)
+    for _ in iter(analyzer.getNextToken, None):
+        pass
+    assert stats.dropped == 1
+    assert stats.errors == 2 and len(analyzer.errors) == 2
+    assert stats.tokens == {"keyword": 1, "id": 2, "relOp": 1, "unknown": 2}
+    assert stats.hits == {"idAndKeywordToken": 3, "relOpToken": 1}
+    assert stats.consumed == {"idAndKeywordToken": 4, "relOpToken": 2}
+    assert (stats.keywordLookups, stats.symbolLookups, stats.symbolInserts) == (3, 3, 2)
+
+
+def test_dfa_token_buffer_counters():
+    analyzer = DFALexicalAnalyzer("if x == 1.x $ x")
+    stats = instrument(analyzer)
+    buffer = analyzer.tokenBuffer()
+    assert len(buffer) == 7
+    # the DFA reads no characters through the reader and tries no recognizers
+    assert not stats.attempts and stats.charsRead == 0 and stats.charsRetracted == 0
+    assert stats.tokens == {"keyword": 1, "id": 3, "relOp": 1, "unknown": 2}
+    assert stats.errors == 2
+    # the second x is looked up but already in the table
+    assert (stats.keywordLookups, stats.symbolLookups, stats.symbolInserts) == (4, 4, 2)
+    assert set(stats.phases) == {"scan"}
+
+
+def test_make_lexer_collects_into_shared_stats():
+    stats = ScannerStats()
+    for code in ("a = 1;", "b = a;"):
+        make_lexer(code, "dfa", stats=stats).tokenBuffer()
+    assert stats.analyzers == 2
+    assert stats.tokens == {"id": 3, "assignOp": 2, "num": 1, "semicolon": 2}
+    assert set(stats.phases) == {"setup", "scan"}
+
+
+def test_merge():
+    first, second = ScannerStats(), ScannerStats()
+    first.tokens["id"] = 2
+    first.errors = 1
+    second.tokens.update({"id": 3, "num": 1})
+    second.phases["scan"] = 0.25
+    second.errors = 4
+    assert first.merge(second) is first
+    assert first.tokens == {"id": 5, "num": 1}
+    assert first.phases == {"scan": 0.25}
+    assert first.errors == 5
+
+
+def test_prometheus_format():
+    stats = ScannerStats()
+    stats.attempts.update({"numberToken": 3, "commentToken": 5})
+    stats.hits["numberToken"] = 2
+    stats.consumed["numberToken"] = 7
+    stats.charsRead = 40
+    stats.charsRetracted = 4
+    stats.dropped = 1
+    stats.tokens.update({"num": 2, "id": 1})
+    stats.errors = 1
+    stats.keywordLookups = 1
+    stats.symbolLookups = 1
+    stats.symbolInserts = 1
+    stats.phases["scan"] = 0.5
+    stats.analyzers = 1
+    assert stats.prometheus("lex") == "\n".join([
+        "# HELP lex_recognizer_attempts_total Recognizer calls in getNextToken.",
+        "# TYPE lex_recognizer_attempts_total counter",
+        'lex_recognizer_attempts_total{recognizer="commentToken"} 5',
+        'lex_recognizer_attempts_total{recognizer="numberToken"} 3',
+        "# HELP lex_recognizer_hits_total Tokens returned by each recognizer.",
+        "# TYPE lex_recognizer_hits_total counter",
+        'lex_recognizer_hits_total{recognizer="numberToken"} 2',
+        "# HELP lex_recognizer_chars_total Characters in the tokens of each recognizer.",
+        "# TYPE lex_recognizer_chars_total counter",
+        'lex_recognizer_chars_total{recognizer="numberToken"} 7',
+        "# HELP lex_chars_read_total Characters read one at a time with getNextChar.",
+        "# TYPE lex_chars_read_total counter",
+        "lex_chars_read_total 40",
+        "# HELP lex_chars_retracted_total Characters given back with retract.",
+        "# TYPE lex_chars_retracted_total counter",
+        "lex_chars_retracted_total 4",
+        "# HELP lex_chars_dropped_total Characters consumed by recognizers that failed.",
+        "# TYPE lex_chars_dropped_total counter",
+        "lex_chars_dropped_total 1",
+        "# HELP lex_tokens_total Tokens produced, by kind.",
+        "# TYPE lex_tokens_total counter",
+        'lex_tokens_total{kind="id"} 1',
+        'lex_tokens_total{kind="num"} 2',
+        "# HELP lex_errors_total Lexical errors reported.",
+        "# TYPE lex_errors_total counter",
+        "lex_errors_total 1",
+        "# HELP lex_keyword_lookups_total Keyword set lookups.",
+        "# TYPE lex_keyword_lookups_total counter",
+        "lex_keyword_lookups_total 1",
+        "# HELP lex_symbol_lookups_total Symbol table lookups.",
+        "# TYPE lex_symbol_lookups_total counter",
+        "lex_symbol_lookups_total 1",
+        "# HELP lex_symbol_inserts_total Symbol table rows added.",
+        "# TYPE lex_symbol_inserts_total counter",
+        "lex_symbol_inserts_total 1",
+        "# HELP lex_phase_seconds_total Wall time spent in each phase.",
+        "# TYPE lex_phase_seconds_total counter",
+        'lex_phase_seconds_total{phase="scan"} 0.500000',
+        "# HELP lex_analyzers_total Analyzers instrumented.",
+        "# TYPE lex_analyzers_total counter",
+        "lex_analyzers_total 1",
+    ]) + "\n"
+
+
+def test_prometheus_escapes_labels():
+    stats = ScannerStats()
+    stats.tokens['a"b\\c\nd'] = 1
+    assert 'lexer_tokens_total{kind="a\\"b\\\\c\\nd"} 1\n' in stats.prometheus()
+    # empty counters keep their HELP and TYPE lines
+    assert "# TYPE lexer_recognizer_hits_total counter\n# HELP lexer_recognizer_chars_total" \
+        in stats.prometheus()
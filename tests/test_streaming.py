@@ -0,0 +1,96 @@
+import io
+
+import pytest
+
+from corpus import CORPORA, generate, write_corpus
+from scanner_with_dfa import DFALexicalAnalyzer, iter_tokens
+
+
+def _tokens(tokens):
+    return [(token.name, token.attribute, token.position) for token in tokens]
+
+
+def _expected(text, recover):
+    analyzer = DFALexicalAnalyzer(text, recover=recover)
+    tokens = _tokens(iter(analyzer.getNextToken, None))
+    return tokens, analyzer.errors, analyzer.symbolTable.lexemes
+
+
+def _streamed(source, chunkSize, recover):
+    errors = []
+    tokens = _tokens(iter_tokens(source, chunkSize, errors=errors, recover=recover))
+    return tokens, errors
+
+
+def assert_streams_alike(text, chunkSize, recover, data=None):
+    # data, when given, is the encoded text to stream as bytes
+    tokens, errors, lexemes = _expected(text, recover)
+    source = io.StringIO(text, newline="") if data is None else io.BytesIO(data)
+    streamed, streamedErrors = _streamed(source, chunkSize, recover)
+    assert streamed == tokens
+    assert streamedErrors == errors
+
+
+SNIPPETS = [
+    "a<=b>=c==d!=e<f>g=h!i",
+    "x = 1.5e-3 + 2.e5 * 1e+ - 1. / 7e; 1.x",
+    "// comment one\nx = 1; // two\r\n//three",
+    "a = b // ends without a newline",
+    "x = 12",
+    "x = 1.",
+    "x = 1e",
+    "x = 1.5e-",
+    "while (a >= 10) { b = a * 3.25; }",
+    "é = ß1 + ٣; 𝟘 ≥ 2 — ok",
+    "a = $$ ## @",
+    "",
+]
+
+
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("chunkSize", [1, 2, 3])
+@pytest.mark.parametrize("text", SNIPPETS)
+def test_snippets_across_chunks(text, chunkSize, recover):
+    assert_streams_alike(text, chunkSize, recover)
+    assert_streams_alike(text, chunkSize, recover, text.encode("utf-8"))
+
+
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("chunkSize", [1, 2, 3])
+@pytest.mark.parametrize("kind", [kind for kind in CORPORA if kind != "garbage"])
+def test_corpora_across_chunks(kind, chunkSize, recover):
+    text = generate(kind, 3_000, seed=chunkSize)
+    assert_streams_alike(text, chunkSize, recover)
+    assert_streams_alike(text, chunkSize, recover, text.encode("utf-8"))
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2, 3])
+def test_multibyte_characters_split_between_chunks(chunkSize):
+    text = "é€𝟘 = ß + 1; // ☃\nπ"
+    data = text.encode("utf-8")
+    assert len(data) > len(text)
+    assert_streams_alike(text, chunkSize, False, data)
+
+
+@pytest.mark.parametrize("recover", [False, True], ids=["default", "recover"])
+@pytest.mark.parametrize("chunkSize", [1, 3, 4096])
+def test_garbage_bytes(tmp_path, chunkSize, recover):
+    path = str(tmp_path / "garbage.src")
+    write_corpus(path, "garbage", 5_000)
+    data = open(path, "rb").read()
+    with pytest.raises(UnicodeDecodeError):
+        data.decode("utf-8")
+    text = data.decode("utf-8", "replace")
+    tokens, errors, _ = _expected(text, recover)
+    assert _streamed(path, chunkSize, recover) == (tokens, errors)
+    assert _streamed(io.BytesIO(data), chunkSize, recover) == (tokens, errors)
+
+
+def test_shared_symbol_table():
+    text = generate("mixed", 5_000)
+    analyzer = DFALexicalAnalyzer(text)
+    analyzer.tokenBuffer()
+    table = DFALexicalAnalyzer("").symbolTable
+    list(iter_tokens(io.StringIO(text), 7, symbolTable=table))
+    assert table.lexemes == analyzer.symbolTable.lexemes
+    assert table.types == analyzer.symbolTable.types
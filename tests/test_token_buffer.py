@@ -0,0 +1,57 @@
+import pickle
+
+from scanner import TOKEN_KINDS
+from token_buffer import TokenBuffer
+
+
+def _buffer():
+    buffer = TokenBuffer(TOKEN_KINDS)
+    for position, attribute in enumerate(["a", "b", "a", "c"]):
+        buffer.append(TOKEN_KINDS.index("id"), position, position + 1, attribute)
+    return buffer
+
+
+def _attributes(buffer):
+    return [buffer.attribute(i) for i in range(len(buffer))]
+
+
+def test_slice_append_leaves_parent_alone():
+    parent = _buffer()
+    part = parent[1:3]
+    assert _attributes(part) == ["b", "a"]
+    part.append(TOKEN_KINDS.index("id"), 9, 10, "new")
+    part.append(TOKEN_KINDS.index("id"), 10, 11, "c")
+    assert _attributes(part) == ["b", "a", "new", "c"]
+    assert parent.attributeTable == ["a", "b", "c"]
+    assert "new" not in parent.attributeIndex
+    assert _attributes(parent) == ["a", "b", "a", "c"]
+
+
+def test_slice_extend_leaves_parent_alone():
+    parent = _buffer()
+    part = parent[:2]
+    other = TokenBuffer(TOKEN_KINDS)
+    other.append(TOKEN_KINDS.index("num"), 0, 1, "7")
+    part.extend(other, 100)
+    assert _attributes(part) == ["a", "b", "7"]
+    assert parent.attributeTable == ["a", "b", "c"]
+
+
+def test_parent_append_after_slicing():
+    parent = _buffer()
+    part = parent[::2]
+    parent.append(TOKEN_KINDS.index("id"), 4, 5, "d")
+    part.append(TOKEN_KINDS.index("id"), 5, 6, "e")
+    assert _attributes(parent) == ["a", "b", "a", "c", "d"]
+    assert _attributes(part) == ["a", "a", "e"]
+
+
+def test_slices_share_tables_until_written():
+    parent = _buffer()
+    part = parent[1:]
+    assert part.attributeTable is parent.attributeTable
+    part.append(TOKEN_KINDS.index("id"), 4, 5, "b")
+    assert part.attributeTable is parent.attributeTable
+    loaded = pickle.loads(pickle.dumps(part))
+    loaded.append(TOKEN_KINDS.index("id"), 6, 7, "z")
+    assert _attributes(loaded) == ["b", "a", "c", "b", "z"]
@@ -0,0 +1,178 @@
+import struct
+from array import array
+
+from binary_io import column_bytes, column_from_bytes
+from scanner import Token
+
+
+TOKEN_BUFFER_MAGIC = b"TOKBUF\0\0"
+# bump when the serialized layout changes
+TOKEN_BUFFER_VERSION = 1
+# magic, version, offset typecode, kind count, token count, attribute count
+_HEADER = struct.Struct("<8sHcxIQI")
+_LENGTH = struct.Struct("<I")
+
+
+def _readExactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("truncated token buffer")
+    return data
+
+
+def _writeColumn(stream, column):
+    stream.write(column_bytes(column))
+
+
+def _readColumn(stream, typecode, count):
+    return column_from_bytes(typecode, _readExactly(stream, array(typecode).itemsize * count))
+
+
+class TokenBuffer:
+    # columnar token store: one small integer per column per token, with
+    # attributes interned into a table shared by all equal lexemes
+    def __init__(self, kindNames, offsetType="I"):
+        self.kindNames = kindNames
+        self.kinds = array("H")
+        self.starts = array(offsetType)
+        self.ends = array(offsetType)
+        self.attributes = array("I")
+        self.attributeTable = []
+        self.attributeIndex = {}
+        # set on slices, which borrow their parent's tables until they add
+        # an attribute of their own
+        self.sharedTables = False
+
+    def intern(self, attribute):
+        index = self.attributeIndex.get(attribute)
+        if index is None:
+            if self.sharedTables:
+                self.attributeTable = list(self.attributeTable)
+                self.attributeIndex = dict(self.attributeIndex)
+                self.sharedTables = False
+            index = len(self.attributeTable)
+            self.attributeIndex[attribute] = index
+            self.attributeTable.append(attribute)
+        return index
+
+    def append(self, kind, start, end, attribute):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.attributes.append(self.intern(attribute))
+
+    def extend(self, other, offset=0):
+        # appends another buffer over the same kinds, shifting its offsets
+        remap = [self.intern(attribute) for attribute in other.attributeTable]
+        self.kinds.extend(other.kinds)
+        if offset:
+            self.starts.extend([start + offset for start in other.starts])
+            self.ends.extend([end + offset for end in other.ends])
+        else:
+            self.starts.extend(other.starts)
+            self.ends.extend(other.ends)
+        self.attributes.extend([remap[index] for index in other.attributes])
+
+    def kindName(self, index):
+        return self.kindNames[self.kinds[index]]
+
+    def attribute(self, index):
+        return self.attributeTable[self.attributes[index]]
+
+    def token(self, index):
+        return Token(self.kindNames[self.kinds[index]],
+                     self.attributeTable[self.attributes[index]],
+                     self.starts[index])
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # slices share the kind and attribute tables with their parent,
+            # copy-on-write: the parent only ever adds entries at the end,
+            # which the slice never refers to
+            part = TokenBuffer(self.kindNames, self.starts.typecode)
+            part.kinds = self.kinds[index]
+            part.starts = self.starts[index]
+            part.ends = self.ends[index]
+            part.attributes = self.attributes[index]
+            part.attributeTable = self.attributeTable
+            part.attributeIndex = self.attributeIndex
+            part.sharedTables = True
+            return part
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        return self.token(index)
+
+    def __iter__(self):
+        kindNames = self.kindNames
+        attributeTable = self.attributeTable
+        for kind, attribute, start in zip(self.kinds, self.attributes, self.starts):
+            yield Token(kindNames[kind], attributeTable[attribute], start)
+
+    def __getstate__(self):
+        # the attribute index is rebuilt on load instead of being pickled
+        state = self.__dict__.copy()
+        del state["attributeIndex"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attributeIndex = {attribute: index
+                               for index, attribute in enumerate(self.attributeTable)}
+        self.sharedTables = False
+
+    def write(self, stream):
+        # one self-delimiting frame on a binary stream; frames can follow
+        # each other and read() takes them back one at a time
+        stream.write(_HEADER.pack(TOKEN_BUFFER_MAGIC, TOKEN_BUFFER_VERSION,
+                                  self.starts.typecode.encode("ascii"), len(self.kindNames),
+                                  len(self.kinds), len(self.attributeTable)))
+        for name in self.kindNames:
+            encoded = name.encode("utf-8")
+            stream.write(_LENGTH.pack(len(encoded)))
+            stream.write(encoded)
+        for column in (self.kinds, self.starts, self.ends, self.attributes):
+            _writeColumn(stream, column)
+        encoded = [attribute.encode("utf-8", "surrogatepass") for attribute in self.attributeTable]
+        _writeColumn(stream, array("I", map(len, encoded)))
+        stream.write(b"".join(encoded))
+
+    @classmethod
+    def read(cls, stream):
+        # the next frame of stream, or None at its end
+        header = stream.read(_HEADER.size)
+        if not header:
+            return None
+        if len(header) != _HEADER.size:
+            raise ValueError("truncated token buffer")
+        magic, version, offsetType, kindCount, count, attributeCount = _HEADER.unpack(header)
+        if magic != TOKEN_BUFFER_MAGIC or version != TOKEN_BUFFER_VERSION:
+            raise ValueError("not a token buffer of a supported version")
+
+        kindNames = []
+        for _ in range(kindCount):
+            (length,) = _LENGTH.unpack(_readExactly(stream, _LENGTH.size))
+            kindNames.append(_readExactly(stream, length).decode("utf-8"))
+        buffer = cls(tuple(kindNames), offsetType.decode("ascii"))
+        buffer.kinds = _readColumn(stream, "H", count)
+        buffer.starts = _readColumn(stream, buffer.starts.typecode, count)
+        buffer.ends = _readColumn(stream, buffer.ends.typecode, count)
+        buffer.attributes = _readColumn(stream, "I", count)
+
+        lengths = _readColumn(stream, "I", attributeCount)
+        blob = memoryview(_readExactly(stream, sum(lengths)))
+        table = buffer.attributeTable
+        offset = 0
+        for length in lengths:
+            table.append(str(blob[offset:offset + length], "utf-8", "surrogatepass"))
+            offset += length
+        buffer.attributeIndex = {attribute: index for index, attribute in enumerate(table)}
+        return buffer
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column)
+                   for column in (self.kinds, self.starts, self.ends, self.attributes))